@@ -1,76 +1,139 @@
-import json
+from urllib.parse import parse_qs
 from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer, AsyncJsonWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.gis.geos import Point
+from client import event_log, presence
+from client.groups import (
+    active_order_ids, close_order, legacy_group, leave_order, notify_order, notify_user, order_group, user_group,
+)
 from client.models import Order
+from client.outbox import OutboxMixin
+from config import codec
+from users.authentication import invalidate_user, invalidate_users
+from client.order_state import (
+    ACTIVE_STATUSES, STABLE, IN_PROGRESS, SUCCESS, CANCEL_CLIENT, CANCEL_WORKER, transition, refresh_state,
+)
 from django.contrib.auth import get_user_model
 import redis.asyncio as aioredis
 User = get_user_model()
 
 
-class UserOrderConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        user = self.scope.get("user", None)
-
-        if not user or isinstance(user, AnonymousUser):
-            await self.close()
+class PresenceMixin:
+    """Ulanishlar sonini Redis'da yuritish; is_online bazaga flush_presence orqali yoziladi"""
+    presence_counted = False
+
+    async def mark_online(self):
+        await sync_to_async(presence.connected)(self.user.id)
+        self.presence_counted = True
+
+    async def mark_offline(self):
+        if self.presence_counted:
+            self.presence_counted = False
+            await sync_to_async(presence.disconnected)(self.user.id)
+
+
+class OrderEventsMixin:
+    """
+    Foydalanuvchi va order guruhlari, missed-event replay va order hodisalarini ilovaga yetkazish.
+    Consumer ``self.user``, ``emit(stream, data)`` va ``emit_now(stream, data)`` ni ta'minlashi kerak.
+    """
+
+    async def join_event_groups(self, role):
+        self.groups_joined = [user_group(self.user.id)]
+        if getattr(settings, "CHANNELS_LEGACY_GROUPS", True):
+            self.groups_joined.append(legacy_group(role, self.user.id))
+
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+
+        # Ulanish uzilgan paytda qo'shilgan orderlar guruhlariga qayta qo'shilish
+        self.order_ids = await database_sync_to_async(active_order_ids)(self.user.id)
+        for order_id in self.order_ids:
+            await self.channel_layer.group_add(order_group(order_id), self.channel_name)
+
+    async def leave_event_groups(self):
+        for group in getattr(self, "groups_joined", []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        for order_id in getattr(self, "order_ids", set()):
+            await self.channel_layer.group_discard(order_group(order_id), self.channel_name)
+
+    async def replay_missed_events(self):
+        """
+        ``?last_event_id=`` berilsa, undan keyingi hodisalar qayta yuboriladi.
+        Guruhlarga qo'shilgandan keyin o'qiladi, shuning uchun hech narsa tushib qolmaydi;
+        ikki marta kelganlari ``forward_event`` da tashlab yuboriladi.
+        """
+        self.replayed_up_to = None
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        last_event_id = (query.get("last_event_id") or [None])[0]
+        if not event_log.is_valid_id(last_event_id):
             return
 
-        path = self.scope["path"]  # example: /ws/orders/ or /ws/clients/
-        user_role = getattr(user, "role", None)
-        # print(user_role)
-
-        if path.startswith("/ws/worker/") and user_role == "worker":
-            self.room_group_name = f"worker_{user.id}"
-            # print(" Worker qo‘shildi:", self.room_group_name)   # <<< shu yerga qo‘shasiz
-        elif path.startswith("/ws/clients/") and user_role == "client":
-            self.room_group_name = f"client_{user.id}"
-            # print(" Client qo‘shildi:", self.room_group_name)   # <<< bu yerga ham
-        else:
-            await self.close()
-            return
-
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
-
-    async def disconnect(self, close_code):
-        if hasattr(self, "room_group_name"):
-            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        # Replay navbatdan o'tmaydi (aks holda katta backlog tashlanib, ulanish 4008 bilan yopiladi):
+        # har bir xabar yuborilishini kutib, sahifalab o'qiladi
+        page_size = getattr(settings, "EVENT_LOG_REPLAY_LIMIT", 50)
+        while True:
+            events = await sync_to_async(event_log.read_since)(self.user.id, last_event_id, page_size)
+            for event_id, event in events:
+                await self.emit_now("notification", {**event, "event_id": event_id, "replayed": True})
+                self.replayed_up_to = last_event_id = event_id
+            if len(events) < page_size:
+                break
+
+    async def order_join(self, event):
+        order_id = event["order_id"]
+        if order_id not in self.order_ids:
+            self.order_ids.add(order_id)
+            await self.channel_layer.group_add(order_group(order_id), self.channel_name)
+
+    async def order_leave(self, event):
+        order_id = event["order_id"]
+        if order_id in self.order_ids:
+            self.order_ids.discard(order_id)
+            await self.channel_layer.group_discard(order_group(order_id), self.channel_name)
 
     async def order_update(self, event):
-        await self.send(text_data=json.dumps(event))
+        await self.forward_event(event)
 
     async def send_order_notification(self, event):
-        # print(" Worker consumer event keldi:", event)  # <-- test
-        await self.send(text_data=json.dumps(event))
+        await self.forward_event(event)
 
+    async def myid_session_update(self, event):
+        await self.forward_event(event)
 
-class OrderActionConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        self.room_name = "order_action"
-        self.user = await self.get_user_from_token()
-        if not self.user:
-            await self.close()
-            return
+    async def forward_event(self, event):
+        event_ids = event.pop("event_ids", None)
+        if event_ids:
+            event["event_id"] = event_ids.get(str(self.user.id))
 
+        event_id = event.get("event_id")
+        if event_id and self.replayed_up_to and not event_log.is_after(event_id, self.replayed_up_to):
+            return  # replay paytida allaqachon yuborilgan
 
-        await self.channel_layer.group_add(self.room_name, self.channel_name)
-        await self.accept()
+        await self.emit("notification", event, coalesce_key=self.coalesce_key(event))
 
-    async def disconnect(self, close_code):
-        if hasattr(self, "room_name"):
-            await self.channel_layer.group_discard(self.room_name, self.channel_name)
+    @staticmethod
+    def coalesce_key(event):
+        """
+        Bitta order (va worker) uchun yuborilmagan eski statusni yangisi almashtiradi.
+        Yangi order takliflari birlashtirilmaydi.
+        """
+        if event.get("type") != "order_update":
+            return None
+        worker_id = event.get("worker_id") or (event.get("worker") or {}).get("id")
+        return ("order", event.get("order_id"), worker_id)
 
-    async def receive(self, text_data=None, bytes_data=None):
-        try:
-            data = json.loads(text_data)
-            await self.send(text_data=json.dumps({"debug": "Received request", "data": data}))
 
-        except json.JSONDecodeError:
-            return await self.send_error("Invalid JSON format")
+class OrderActionMixin:
+    """
+    Order ustidagi actionlar (accept, reject, confirm, cancel).
+    Consumer ``self.user`` va ``emit(stream, data)`` ni ta'minlashi kerak.
+    """
 
+    async def handle_action(self, data):
         action = data.get("action")
         order_id = data.get("order_id")
         worker_ids = data.get('worker_ids', [])
@@ -89,28 +152,8 @@ class OrderActionConsumer(AsyncWebsocketConsumer):
         else:
             await self.send_error("Invalid action")
 
-    async def get_user_from_token(self):
-        query_string = self.scope["query_string"].decode()
-        token = dict(x.split("=") for x in query_string.split("&")).get("token")
-        if not token:
-            return None
-
-        try:
-            from rest_framework_simplejwt.tokens import AccessToken
-            access_token = AccessToken(token)
-            return await self.get_user(access_token["user_id"])
-        except Exception:
-            return None
-
-    @database_sync_to_async
-    def get_user(self, user_id):
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
-
     async def send_error(self, message):
-        await self.send(text_data=json.dumps({"error": message}))
+        await self.emit("action", {"error": message})
 
     async def send_update(self, user_ids, order_id, status, worker=None):
         for user_id in user_ids:
@@ -134,10 +177,14 @@ class OrderActionConsumer(AsyncWebsocketConsumer):
 
             # print(f"Sending update to user_{user_id}: {message}")
 
-            await self.channel_layer.group_send(
-                f"client_{user_id}",
-                message
-            )
+            await notify_user(user_id, message)
+
+    async def send_order_update(self, order_id, status, participant_ids):
+        await notify_order(order_id, {
+            "type": "order_update",
+            "order_id": order_id,
+            "status": status,
+        }, participant_ids)
 
     @sync_to_async
     def get_order_with_client(self, order_id):
@@ -159,38 +206,57 @@ class OrderActionConsumer(AsyncWebsocketConsumer):
         order.accepted_workers.add(worker)
 
     @sync_to_async
-    def save_order(self, order):
-        order.save()
+    def transition_order(self, order, status, **fields):
+        return transition(order, status, **fields)
+
+    @sync_to_async
+    def refresh_order_state(self, order):
+        return refresh_state(order)
+
+    @sync_to_async
+    def mark_client_finished(self, order):
+        order.client_is_finished = True
+        Order.objects.filter(pk=order.pk).update(client_is_finished=True)
 
     @sync_to_async
     def save_worker(self, worker):
-        worker.save()
+        worker.save(update_fields=["status"])
+
+    @sync_to_async
+    def release_workers(self, worker_ids):
+        User.objects.filter(id__in=worker_ids).update(status="idle")
+        invalidate_users(worker_ids)
 
     async def accept_order(self, order_id):
         worker = await self.get_worker(self.user.id)
+        if not worker:
+            await self.emit("action", {"error": "Worker not found"})
+            return
 
         order = await self.get_order_with_client(order_id)
         if not order:
-            await self.send(text_data=json.dumps({"error": "Order not found"}))
+            await self.emit("action", {"error": "Order not found"})
             return
 
-        if order.status != "stable" and order.status != "in_progress":
-            await self.send(text_data=json.dumps({"error": "Order is not available"}))
+        if order.status not in ACTIVE_STATUSES:
+            await self.emit("action", {"error": "Order is not available"})
             return
 
         if worker.status != "idle":
-            await self.send(text_data=json.dumps({"error": "Worker is not available"}))
+            await self.emit("action", {"error": "Worker is not available"})
             return
 
+        if order.status == STABLE and not await self.transition_order(order, IN_PROGRESS):
+            # Boshqa worker bizdan oldin qabul qilgan bo'lishi mumkin
+            await self.refresh_order_state(order)
+            if order.status != IN_PROGRESS:
+                await self.emit("action", {"error": "Order is not available"})
+                return
+
         await self.remove_notified_worker(order, worker)
         await self.add_accepted_worker(order, worker)
 
-        if order.status == "stable":
-            order.status = "in_progress"
-
         worker.status = "working"
-
-        await self.save_order(order)
         await self.save_worker(worker)
 
         await self.send_update([order.client.id], order.id,
@@ -198,97 +264,86 @@ class OrderActionConsumer(AsyncWebsocketConsumer):
                                worker,
                                )
 
-        await self.send(text_data=json.dumps({
+        await self.emit("action", {
             "message": "Order accepted",
             "order_status": order.status,
             "worker_status": worker.status
-        }))
+        })
 
     async def reject_order(self, order_id):
         try:
             order = await self.get_order_with_client(order_id)
             if not order:
-                await self.send(text_data=json.dumps({"error": "Order not found"}))
+                await self.emit("action", {"error": "Order not found"})
                 return
         except Exception as e:
-            await self.send(text_data=json.dumps({"error": str(e)}))
+            await self.emit("action", {"error": str(e)})
             return
 
         worker = self.user
         client = order.client
 
-        if not worker:
-            await self.send(text_data=json.dumps({"error": "Worker not found"}))
-            return
-
-        notified_workers = await sync_to_async(lambda: list(order.notified_workers.all()))()
+        notified_ids = await sync_to_async(lambda: set(order.notified_workers.values_list("id", flat=True)))()
 
         # Faqat aynan shu order uchun accepted_workers tekshiramiz
-        is_accepted = await sync_to_async(lambda: worker in order.accepted_workers.all())()
+        is_accepted = await sync_to_async(order.accepted_workers.filter(id=worker.id).exists)()
 
-        if worker not in notified_workers:
-            await self.send(text_data=json.dumps({"error": "Worker was not notified or already responded"}))
+        if worker.id not in notified_ids:
+            await self.emit("action", {"error": "Worker was not notified or already responded"})
             return
 
-        if order.status == "stable" or (order.status == "in_progress" and not is_accepted):
-            await sync_to_async(order.rejected_workers.add)(worker)
-            await sync_to_async(order.notified_workers.remove)(worker)
-            await sync_to_async(order.save)()
+        if order.status == STABLE or (order.status == IN_PROGRESS and not is_accepted):
+            await sync_to_async(order.rejected_workers.add)(worker.id)
+            await sync_to_async(order.notified_workers.remove)(worker.id)
+            await leave_order(order.id, [worker.id])
             await self.send_update([client.id], order.id, "rejected", worker.id)
 
-            await self.send(text_data=json.dumps({"message": "Order rejected"}))
+            await self.emit("action", {"message": "Order rejected"})
         else:
-            await self.send(
-                text_data=json.dumps({"error": "You have already accepted this order, you cannot reject it"}))
+            await self.emit("action", {"error": "You have already accepted this order, you cannot reject it"})
 
     async def confirm_order(self, order_id):
         try:
             order = await self.get_order_with_client(order_id)
             if not order:
-                await self.send(text_data=json.dumps({"error": "Order not found"}))
+                await self.emit("action", {"error": "Order not found"})
                 return
         except Exception as e:
-            await self.send(text_data=json.dumps({"error": str(e)}))
+            await self.emit("action", {"error": str(e)})
             return
 
-        if order.status != "in_progress":
-            await self.send(text_data=json.dumps({"error": "Order is not available for confirmation"}))
+        if order.status != IN_PROGRESS:
+            await self.emit("action", {"error": "Order is not available for confirmation"})
             return
 
-        user = self.user
-        client = order.client
-        accepted_workers = await sync_to_async(lambda: list(order.accepted_workers.all()))()
-        finished_workers = await sync_to_async(lambda: list(order.finished_workers.all()))()
-
-        if user == client:
-            order.client_is_finished = True
-        elif user in accepted_workers:
-            if user not in finished_workers:
-                await sync_to_async(order.finished_workers.add)(user)
+        user_id = self.user.id
+        accepted_ids = await sync_to_async(lambda: set(order.accepted_workers.values_list("id", flat=True)))()
+        finished_ids = await sync_to_async(lambda: set(order.finished_workers.values_list("id", flat=True)))()
+
+        if user_id == order.client_id:
+            await self.mark_client_finished(order)
+        elif user_id in accepted_ids:
+            if user_id not in finished_ids:
+                await sync_to_async(order.finished_workers.add)(user_id)
+                finished_ids.add(user_id)
         else:
-            await self.send(text_data=json.dumps({"error": "You are not part of this order"}))
+            await self.emit("action", {"error": "You are not part of this order"})
             return
 
-        await self.save_order(order)
-
-        finished_workers = await sync_to_async(lambda: list(order.finished_workers.all()))()
-
-        all_workers_finished = set(finished_workers) == set(accepted_workers)
-        if all_workers_finished and order.client_is_finished:
-            order.status = "success"
-            await self.save_order(order)
-            await self.send_update([client.id], order.id, order.status)
-
-            for worker in finished_workers:
-                worker.status = "idle"
-                await self.save_worker(worker)
+        if finished_ids == accepted_ids and order.client_is_finished:
+            if await self.transition_order(order, SUCCESS):
+                await self.send_order_update(order.id, order.status, [order.client_id, *finished_ids])
+                await close_order(order.id)
+                await self.release_workers(list(finished_ids))
+            else:
+                await self.refresh_order_state(order)
 
-        await self.send(text_data=json.dumps({
+        await self.emit("action", {
             "message": "Order confirmed",
             "client_is_finished": order.client_is_finished,
-            "worker_is_finished": [worker.id for worker in finished_workers],
+            "worker_is_finished": list(finished_ids),
             "order_status": order.status
-        }))
+        })
 
     async def cancel_order(self, order_id, worker_ids=None):
         try:
@@ -296,13 +351,13 @@ class OrderActionConsumer(AsyncWebsocketConsumer):
             if not order:
                 return await self.send_error("Order not found")
 
-            if order.status != "in_progress":
+            if order.status != IN_PROGRESS:
                 return await self.send_error("Order is not in cancellable status")
 
             workers = await sync_to_async(list)(order.accepted_workers.all())
             worker_ids_in_order = [w.id for w in workers]
 
-            is_client = self.user == order.client
+            is_client = self.user.id == order.client_id
             current_worker = self.user if self.user.role == "worker" else None
             is_worker = bool(current_worker and current_worker.id in worker_ids_in_order)
 
@@ -322,22 +377,24 @@ class OrderActionConsumer(AsyncWebsocketConsumer):
 
             # print(f"To Cancel List: {[w.id for w in to_cancel]}")
 
-            for worker in to_cancel:
-                await sync_to_async(order.accepted_workers.remove)(worker)
-                worker.status = "idle"
-                await self.save_worker(worker)
+            await sync_to_async(order.accepted_workers.remove)(*to_cancel)
+            await self.release_workers([w.id for w in to_cancel])
+            await leave_order(order.id, [w.id for w in to_cancel])
 
             remaining = await sync_to_async(list)(order.accepted_workers.all())
             if not remaining:
-                order.status = "cancel_worker" if is_worker else "cancel_client"
-                await self.save_order(order)
+                final_status = CANCEL_WORKER if is_worker else CANCEL_CLIENT
+                if await self.transition_order(order, final_status):
+                    await close_order(order.id)
+                else:
+                    await self.refresh_order_state(order)
 
             if is_worker:
                 await self.send_update(
                     [order.client.id],
                     order.id,
                     order.status,
-                    worker_id=current_worker.id
+                    worker=current_worker.id
                 )
             # elif is_client:
             #     await self.send_update(
@@ -358,90 +415,248 @@ class OrderActionConsumer(AsyncWebsocketConsumer):
 
     async def send_result(self, data):
         result = {"message": "Success", **data, "success": True}
-        await self.send(text_data=json.dumps(result))
+        await self.emit("action", result)
         return result
 
 
 REDIS_URL = "redis://redis:6379"
 
 
-class WorkerLocationConsumer(AsyncJsonWebsocketConsumer):
-    redis = None  # Global Redis connection (class-level)
+class CodecMixin:
+    """AsyncJsonWebsocketConsumer uchun config.codec (orjson) bilan JSON"""
 
-    async def connect(self):
-        user = self.scope["user"]
+    @classmethod
+    async def decode_json(cls, text_data):
+        return codec.loads(text_data)
+
+    @classmethod
+    async def encode_json(cls, content):
+        return codec.dumps(content)
 
-        if not user.is_authenticated or getattr(user, "role", None) != "worker":
-            await self.close()
-            return
 
+class WorkerLocationMixin:
+    """
+    Worker joylashuvini Redis snapshot'ga yozish, uzilganda oxirgi nuqtani bazaga saqlash.
+    Consumer ``self.user`` va ``emit(stream, data)`` ni ta'minlashi kerak.
+    """
+    redis = None  # Global Redis connection (class-level)
+
+    async def setup_location(self):
         # Bitta umumiy Redis connection
-        if not WorkerLocationConsumer.redis:
-            WorkerLocationConsumer.redis = await aioredis.from_url(
+        if not WorkerLocationMixin.redis:
+            WorkerLocationMixin.redis = await aioredis.from_url(
                 REDIS_URL,
                 decode_responses=True,
                 encoding="utf-8",
             )
 
-        self.user = user
-        await self.accept()
-        full_name = await sync_to_async(lambda: self.user.full_name)()
-        await self.send_json({"detail": f"Ulandi: {full_name}"})
+        # Scope'dagi user token claimlaridan iborat, snapshot uchun kerakli ustunlar bir marta olinadi
+        self.worker = await self.get_worker_fields(self.user.id)
+        return self.worker is not None
 
-    async def receive_json(self, content, **kwargs):
+    @database_sync_to_async
+    def get_worker_fields(self, user_id):
+        return User.objects.filter(id=user_id).values(
+            "id", "role", "status", "is_worker_active", "job_category_id", "region_id", "city_id", "gender",
+            "full_name",
+        ).first()
+
+    async def update_location(self, content):
         lon = content.get("longitude")
         lat = content.get("latitude")
 
         if lon is None or lat is None:
-            await self.send_json({"error": "Koordinatalar majburiy."})
+            await self.emit("location", {"error": "Koordinatalar majburiy."})
             return
 
         try:
             lon = float(lon)
             lat = float(lat)
         except ValueError:
-            await self.send_json({"error": "Koordinatalar noto‘g‘ri formatda."})
+            await self.emit("location", {"error": "Koordinatalar noto‘g‘ri formatda."})
             return
 
-        # Workerning to‘liq ma’lumotlarini olish (DB dan)
-        user = await sync_to_async(lambda: self.user)()
+        worker = self.worker
         worker_data = {
-            "id": user.id,
-            "role": user.role,
-            "status": user.status,
-            "is_worker_active": getattr(user, "is_worker_active", True),
-            "job_category": getattr(user, "job_category_id", None),
-            "region": user.region,
-            "city": user.city,
-            "gender": user.gender,
+            "id": worker["id"],
+            "role": worker["role"],
+            "status": worker["status"],
+            "is_worker_active": worker["is_worker_active"],
+            "job_category": worker["job_category_id"],
+            "region": worker["region_id"],
+            "city": worker["city_id"],
+            "gender": worker["gender"],
             "latitude": lat,
             "longitude": lon,
         }
 
-        key = f"worker:{user.id}"
-        value = json.dumps(worker_data)
+        key = f"worker:{worker['id']}"
+        value = codec.dumps(worker_data)
 
         # TTL ni o‘chiramiz → qiymat har doim mavjud bo‘ladi (agar update kelmasa ham)
-        await WorkerLocationConsumer.redis.set(key, value)
-        print(f" Redisga yozildi: {key} -> {value}")
+        await WorkerLocationMixin.redis.set(key, value)
 
-        await self.send_json({
+        await self.emit("location", {
             "detail": "Joylashuv Redisda yangilandi!",
             "longitude": lon,
             "latitude": lat
         })
 
-    async def disconnect(self, close_code):
+    async def save_last_location(self):
+        if not getattr(self, "worker", None):
+            return
         key = f"worker:{self.user.id}"
-        data = await WorkerLocationConsumer.redis.get(key)
+        data = await WorkerLocationMixin.redis.get(key)
         if data:
-            coords = json.loads(data)
+            coords = codec.loads(data)
             point = Point(coords["longitude"], coords["latitude"])
             await sync_to_async(self._save_point_to_db)(point)
 
     def _save_point_to_db(self, point):
-        self.user.point = point
-        self.user.save(update_fields=["point"])
+        User.objects.filter(id=self.user.id).update(point=point)
+        invalidate_user(self.user.id)
+
+
+class UserOrderConsumer(OrderEventsMixin, PresenceMixin, OutboxMixin, AsyncWebsocketConsumer):
+    async def connect(self):
+        user = self.scope.get("user", None)
+
+        if not user or isinstance(user, AnonymousUser):
+            await self.close()
+            return
+
+        path = self.scope["path"]  # example: /ws/orders/ or /ws/clients/
+        user_role = getattr(user, "role", None)
+        self.user = user
+
+        if not (
+            (path.startswith("/ws/worker/") and user_role == "worker")
+            or (path.startswith("/ws/clients/") and user_role == "client")
+        ):
+            await self.close()
+            return
+
+        await self.join_event_groups(user_role)
+        await self.accept()
+        self.open_outbox()
+        await self.mark_online()
+        await self.replay_missed_events()
+
+    async def disconnect(self, close_code):
+        await self.close_outbox()
+        await self.mark_offline()
+        await self.leave_event_groups()
+
+
+class OrderActionConsumer(OrderActionMixin, PresenceMixin, OutboxMixin, AsyncWebsocketConsumer):
+    async def connect(self):
+        # Bu socket faqat action qabul qiladi: hodisalar foydalanuvchi va order
+        # guruhlari orqali UserOrderConsumer ga boradi, umumiy guruh kerak emas.
+        self.user = self.scope.get("user")
+        if not self.user or not self.user.is_authenticated:
+            await self.close()
+            return
+
+        await self.accept()
+        self.open_outbox()
+        await self.mark_online()
+
+    async def disconnect(self, close_code):
+        await self.close_outbox()
+        await self.mark_offline()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = codec.loads(text_data)
+            await self.emit("action", {"debug": "Received request", "data": data})
+
+        except codec.DecodeError:
+            return await self.send_error("Invalid JSON format")
+
+        await self.handle_action(data)
+
+
+class WorkerLocationConsumer(WorkerLocationMixin, PresenceMixin, OutboxMixin, CodecMixin,
+                             AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        user = self.scope["user"]
+
+        if not user.is_authenticated or getattr(user, "role", None) != "worker":
+            await self.close()
+            return
+
+        self.user = user
+        if not await self.setup_location():
+            await self.close()
+            return
+
+        await self.accept()
+        self.open_outbox()
+        await self.mark_online()
+        await self.emit("location", {"detail": f"Ulandi: {self.worker['full_name']}"})
+
+    async def receive_json(self, content, **kwargs):
+        await self.update_location(content)
+
+    async def disconnect(self, close_code):
+        await self.close_outbox()
+        await self.mark_offline()
+        await self.save_last_location()
+
+
+class DeviceConsumer(OrderEventsMixin, OrderActionMixin, WorkerLocationMixin, PresenceMixin, OutboxMixin,
+                     CodecMixin, AsyncJsonWebsocketConsumer):
+    """
+    Bitta qurilma uchun bitta socket: ws/worker/, ws/clients/, ws/order-actions/ va ws/location/
+    o'rniga. Barcha xabarlar konvert ichida:
+
+        -> {"stream": "action" | "location", "payload": {...}}
+        <- {"stream": "notification" | "action" | "location", "payload": {...}}
+    """
+    STREAMS = ("action", "location")
+
+    async def connect(self):
+        user = self.scope.get("user", None)
+        role = getattr(user, "role", None)
+
+        if not user or not user.is_authenticated or role not in ("worker", "client"):
+            await self.close()
+            return
+
+        self.user = user
+        self.location_enabled = role == "worker" and await self.setup_location()
+
+        await self.join_event_groups(role)
+        await self.accept()
+        self.open_outbox()
+        await self.mark_online()
+        await self.replay_missed_events()
+
+    async def receive_json(self, content, **kwargs):
+        stream = content.get("stream") if isinstance(content, dict) else None
+        payload = content.get("payload") if isinstance(content, dict) else None
+
+        if stream not in self.STREAMS or not isinstance(payload, dict):
+            await self.emit("error", {"error": "Invalid envelope"})
+            return
+
+        if stream == "action":
+            await self.handle_action(payload)
+        elif self.location_enabled:
+            await self.update_location(payload)
+        else:
+            await self.emit("location", {"error": "Location stream is only available for workers"})
+
+    async def disconnect(self, close_code):
+        await self.close_outbox()
+        await self.mark_offline()
+        await self.leave_event_groups()
+        if getattr(self, "location_enabled", False):
+            await self.save_last_location()
+
+    def wrap(self, stream, data):
+        return {"stream": stream, "payload": data}
+
 
 # REDIS_URL = "redis://redis:6379"
 #
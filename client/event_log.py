@@ -0,0 +1,71 @@
+import re
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from config import codec
+
+STREAM_KEY = "events:user:{}"
+EVENT_ID_RE = re.compile(r"^\d+-\d+$")
+
+
+def _stream_settings():
+    return (
+        getattr(settings, "EVENT_LOG_MAXLEN", 200),
+        getattr(settings, "EVENT_LOG_TTL", 60 * 60 * 24),
+    )
+
+
+def append(user_ids, event):
+    """
+    Hodisani har bir foydalanuvchining Redis Stream'iga yozish (MAXLEN bilan cheklangan).
+    Qaytaradi: {user_id: event_id}
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    maxlen, ttl = _stream_settings()
+    payload = codec.dumps(event)
+    redis = get_redis_connection("default")
+    pipe = redis.pipeline(transaction=False)
+    for user_id in user_ids:
+        key = STREAM_KEY.format(user_id)
+        pipe.xadd(key, {"e": payload}, maxlen=maxlen, approximate=True)
+        pipe.expire(key, ttl)
+    results = pipe.execute()
+
+    return {
+        user_id: event_id.decode() if isinstance(event_id, bytes) else event_id
+        for user_id, event_id in zip(user_ids, results[0::2])
+    }
+
+
+def read_since(user_id, last_event_id, limit=None):
+    """``last_event_id`` dan keyingi hodisalar: [(event_id, event), ...]"""
+    if not is_valid_id(last_event_id):
+        return []
+
+    limit = limit or getattr(settings, "EVENT_LOG_REPLAY_LIMIT", 50)
+    redis = get_redis_connection("default")
+    entries = redis.xrange(STREAM_KEY.format(user_id), min=f"({last_event_id}", max="+", count=limit)
+
+    events = []
+    for event_id, fields in entries:
+        event_id = event_id.decode() if isinstance(event_id, bytes) else event_id
+        try:
+            events.append((event_id, codec.loads(fields[b"e"])))
+        except (KeyError, ValueError):
+            continue
+    return events
+
+
+def is_valid_id(event_id):
+    return bool(event_id) and bool(EVENT_ID_RE.match(event_id))
+
+
+def is_after(event_id, other_id):
+    """Stream ID larini solishtirish ("<ms>-<seq>")"""
+    ms, seq = event_id.split("-")
+    other_ms, other_seq = other_id.split("-")
+    return (int(ms), int(seq)) > (int(other_ms), int(other_seq))
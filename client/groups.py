@@ -0,0 +1,80 @@
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.db.models import Q
+
+from client import event_log
+from client.models import Order
+from client.order_state import ACTIVE_STATUSES
+
+# Eski ilova versiyalari ws/worker/ va ws/clients/ ga ulanib worker_{id} / client_{id}
+# guruhlarini kutadi. CHANNELS_LEGACY_GROUPS=True bo'lsa consumerlar ularga ham qo'shiladi.
+LEGACY_GROUP_PREFIXES = {
+    "worker": "worker",
+    "client": "client",
+}
+
+
+def user_group(user_id):
+    """Bitta foydalanuvchining barcha ulanishlari"""
+    return f"user_{user_id}"
+
+
+def order_group(order_id):
+    """Order ishtirokchilari: client va xabardor qilingan / qabul qilgan workerlar"""
+    return f"order_{order_id}"
+
+
+def legacy_group(role, user_id):
+    return f"{LEGACY_GROUP_PREFIXES[role]}_{user_id}"
+
+
+def active_order_ids(user_id):
+    """Foydalanuvchi ishtirok etayotgan faol orderlar (ulanishda order guruhlariga qayta qo'shilish uchun)"""
+    participant = Q(client_id=user_id) | Q(notified_workers=user_id) | Q(accepted_workers=user_id)
+    return set(
+        Order.objects.filter(participant, status__in=ACTIVE_STATUSES)
+        .values_list("id", flat=True)
+        .distinct()
+    )
+
+
+async def send_to_user(user_id, message):
+    await get_channel_layer().group_send(user_group(user_id), message)
+
+
+async def send_to_order(order_id, message):
+    await get_channel_layer().group_send(order_group(order_id), message)
+
+
+async def notify_user(user_id, message):
+    """
+    Hodisani foydalanuvchining event log'iga yozib, keyin yuborish.
+    Ulanish uzilgan bo'lsa ilova qayta ulanganda ``last_event_id`` orqali uni oladi.
+    """
+    event_ids = await sync_to_async(event_log.append)([user_id], message)
+    await send_to_user(user_id, {**message, "event_id": event_ids[user_id]})
+
+
+async def notify_order(order_id, message, participant_ids):
+    """Order guruhiga hodisa; har bir ishtirokchining log'idagi ID ``event_ids`` da keladi"""
+    event_ids = await sync_to_async(event_log.append)(participant_ids, message)
+    await send_to_order(order_id, {
+        **message,
+        "event_ids": {str(user_id): event_id for user_id, event_id in event_ids.items()},
+    })
+
+
+async def join_order(order_id, user_ids):
+    """Foydalanuvchilarning ulanishlarini order guruhiga qo'shish (consumer order_join handleri orqali)"""
+    for user_id in user_ids:
+        await send_to_user(user_id, {"type": "order_join", "order_id": order_id})
+
+
+async def leave_order(order_id, user_ids):
+    for user_id in user_ids:
+        await send_to_user(user_id, {"type": "order_leave", "order_id": order_id})
+
+
+async def close_order(order_id):
+    """Order yakunlanganda barcha ishtirokchilar guruhdan chiqadi"""
+    await send_to_order(order_id, {"type": "order_leave", "order_id": order_id})
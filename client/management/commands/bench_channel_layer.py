@@ -0,0 +1,160 @@
+import asyncio
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+def order_update_message():
+    """notify_order yuboradigan order_update (ishtirokchilar event_ids bilan)"""
+    return {
+        "type": "order_update",
+        "order_id": 48213,
+        "status": "in_progress",
+        "event_ids": {str(user_id): "1760860000001-0" for user_id in range(500, 503)},
+    }
+
+
+def order_notification_message():
+    """notify_user yuboradigan send_order_notification (OrderSerializer ma'lumoti bilan)"""
+    return {
+        "type": "send_order_notification",
+        "event_id": "1760860000000-0",
+        "order": {
+            "id": 48213, "job_category": 7, "job_id": [31, 32, 35],
+            "desc": "Oshxona jo'mragini almashtirish", "price": "250000",
+            "full_desc": "Jo'mrak oqyapti, yangisini o'rnatish kerak. " * 4,
+            "region": 1, "city": 12, "gender": "Male", "worker_count": 2,
+            "point": "SRID=4326;POINT (69.279759 41.311081)",
+            "images": [{"id": 901 + i, "image": f"/media/client_image/photo_{i}.jpg"} for i in range(3)],
+            "client_info": {"full_name": "Aliyev Vali", "phone": "+998901234567"},
+            "created_at": "2026-10-19", "status": "stable",
+        },
+    }
+
+
+MESSAGES = {
+    "order_update": order_update_message,
+    "notification": order_notification_message,
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = "Channel layer backendlarida group_send fan-out throughput va latency o'lchovi"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backend", nargs="+", default=list(settings.CHANNEL_LAYER_BACKENDS),
+                            choices=list(settings.CHANNEL_LAYER_BACKENDS))
+        parser.add_argument("--hosts", default=",".join(settings.CHANNEL_REDIS_HOSTS),
+                            help="Vergul bilan ajratilgan Redis URL lar (bir nechta — sharded)")
+        parser.add_argument("--message", choices=list(MESSAGES), default="order_update")
+        parser.add_argument("--receivers", type=int, default=200, help="Ulanishlar (kanallar) soni")
+        parser.add_argument("--group-size", type=int, default=3,
+                            help="Bitta guruhdagi kanallar (order: client + workerlar)")
+        parser.add_argument("--messages", type=int, default=2000, help="group_send chaqiruvlari soni")
+        parser.add_argument("--concurrency", type=int, default=50, help="Bir vaqtda group_send lar")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Yetkazilishini kutish (sekund)")
+
+    def handle(self, *args, **options):
+        hosts = [host.strip() for host in options["hosts"].split(",") if host.strip()]
+        self.stdout.write(
+            f"hosts={len(hosts)} receivers={options['receivers']} group_size={options['group_size']} "
+            f"messages={options['messages']} message={options['message']}"
+        )
+        self.stdout.write(
+            f"{'backend':<8}{'send/s':>10}{'deliv/s':>10}{'delivered':>12}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        )
+
+        for backend in options["backend"]:
+            result = asyncio.run(self.run_backend(backend, hosts, options))
+            self.stdout.write(
+                f"{backend:<8}{result['send_rate']:>10.0f}{result['delivery_rate']:>10.0f}"
+                f"{result['delivered']:>7}/{result['expected']:<5}"
+                f"{result['p50']:>8.2f}{result['p95']:>9.2f}{result['p99']:>9.2f}{result['max']:>9.2f}"
+            )
+
+    def build_layer(self, backend, hosts):
+        layer_class = import_string(settings.CHANNEL_LAYER_BACKENDS[backend])
+        # Alohida prefix: o'lchov ishlab turgan tizim kalitlariga tegmaydi va oxirida tozalanadi
+        config = {"hosts": hosts, "prefix": f"bench-{uuid.uuid4().hex[:8]}"}
+        if backend == "core":
+            config["capacity"] = settings.CHANNEL_LAYERS["default"]["CONFIG"].get("capacity", 100)
+        return layer_class(**config)
+
+    async def run_backend(self, backend, hosts, options):
+        layer = self.build_layer(backend, hosts)
+        group_size = options["group_size"]
+        total_messages = options["messages"]
+        payload = MESSAGES[options["message"]]()
+
+        channels = [await layer.new_channel() for _ in range(options["receivers"])]
+        groups = {}
+        for index, channel in enumerate(channels):
+            groups.setdefault(f"order_{index // group_size}", []).append(channel)
+        group_names = list(groups)
+        for name, members in groups.items():
+            for channel in members:
+                await layer.group_add(name, channel)
+
+        expected = sum(len(groups[group_names[i % len(group_names)]]) for i in range(total_messages))
+        latencies = []
+        all_delivered = asyncio.Event()
+
+        async def receive(channel):
+            while True:
+                message = await layer.receive(channel)
+                latencies.append(time.perf_counter() - message["sent_at"])
+                if len(latencies) >= expected:
+                    all_delivered.set()
+
+        receivers = [asyncio.ensure_future(receive(channel)) for channel in channels]
+        # Pub/sub obunalari o'rnatilishi uchun
+        await asyncio.sleep(0.5)
+
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def send(index):
+            async with semaphore:
+                await layer.group_send(group_names[index % len(group_names)],
+                                       {**payload, "sent_at": time.perf_counter()})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(index) for index in range(total_messages)))
+        send_elapsed = time.perf_counter() - started
+
+        try:
+            await asyncio.wait_for(all_delivered.wait(), options["timeout"])
+        except asyncio.TimeoutError:
+            pass
+        delivery_elapsed = time.perf_counter() - started
+
+        for task in receivers:
+            task.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+        for name, members in groups.items():
+            for channel in members:
+                await layer.group_discard(name, channel)
+        await layer.flush()
+
+        latencies_ms = [latency * 1000 for latency in latencies]
+        return {
+            "send_rate": total_messages / send_elapsed,
+            "delivery_rate": len(latencies) / delivery_elapsed,
+            "delivered": len(latencies),
+            "expected": expected,
+            "p50": statistics.median(latencies_ms) if latencies_ms else 0.0,
+            "p95": percentile(latencies_ms, 95),
+            "p99": percentile(latencies_ms, 99),
+            "max": max(latencies_ms, default=0.0),
+        }
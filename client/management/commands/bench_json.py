@@ -0,0 +1,89 @@
+import json
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from config import codec
+
+
+def order_notification():
+    """send_order_notification: OrderSerializer(order).data"""
+    return {
+        "type": "send_order_notification",
+        "event_id": "1760860000000-0",
+        "order": {
+            "id": 48213, "job_category": 7, "job_id": [31, 32, 35],
+            "desc": "Oshxona jo'mragini almashtirish", "price": "250000",
+            "full_desc": "Jo'mrak oqyapti, yangisini o'rnatish kerak. Material bor. " * 3,
+            "region": 1, "city": 12, "gender": "Male", "worker_count": 2,
+            "point": "SRID=4326;POINT (69.279759 41.311081)",
+            "images": [{"id": 901 + i, "image": f"/media/client_image/photo_{i}.jpg"} for i in range(3)],
+            "client_info": {"full_name": "Aliyev Vali", "phone": "+998901234567"},
+            "created_at": "2026-10-19", "status": "stable",
+        },
+    }
+
+
+def order_update():
+    return {
+        "type": "order_update", "order_id": 48213, "status": "in_progress", "event_id": "1760860000001-0",
+        "worker": {"id": 512, "full_name": "Karimov Sardor", "phone": "+998971112233",
+                   "image": "/media/avatars/512.jpg"},
+    }
+
+
+def worker_snapshot(worker_id):
+    """WorkerLocationMixin Redis'ga yozadigan worker:{id}"""
+    return {
+        "id": worker_id, "role": "worker", "status": "idle", "is_worker_active": True,
+        "job_category": random.randint(1, 20), "region": 1, "city": random.randint(1, 14),
+        "gender": random.choice(["Male", "Female"]),
+        "latitude": 41.2 + random.random() / 5, "longitude": 69.1 + random.random() / 5,
+    }
+
+
+def catalog(size):
+    """Kategoriya/ish ro'yxati (modeltranslation maydonlari bilan)"""
+    return [
+        {"id": i, "title": f"Ish {i}", "title_uz": f"Ish {i}", "title_ru": f"Работа {i}", "title_en": f"Job {i}",
+         "category": i % 20, "image": f"/media/job/{i}.png", "price": "150000.00"}
+        for i in range(size)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Haqiqiy payload shakllarida stdlib json va config.codec ni solishtirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=2000, help="Har bir o'lchov uchun takrorlar soni")
+        parser.add_argument("--workers", type=int, default=500, help="Redis snapshotlar soni")
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        snapshots = [json.dumps(worker_snapshot(i)).encode() for i in range(options["workers"])]
+
+        cases = [
+            ("order notification dumps", order_notification(), "dumps"),
+            ("order_update dumps", order_update(), "dumps"),
+            ("worker snapshot dumps", worker_snapshot(1), "dumps"),
+            ("catalog x1000 dumps", catalog(1000), "dumps"),
+            (f"worker list x{len(snapshots)} loads", snapshots, "loads"),
+        ]
+
+        self.stdout.write(f"codec backend: {codec.BACKEND}")
+        self.stdout.write(f"{'payload':<32}{'json us':>12}{'codec us':>12}{'speedup':>10}")
+
+        for name, payload, op in cases:
+            if op == "dumps":
+                baseline = lambda: json.dumps(payload)  # noqa: E731
+                fast = lambda: codec.dumps(payload)  # noqa: E731
+                # Ikkala natija bir xil ma'lumotni bildirishi kerak
+                assert json.loads(codec.dumps(payload)) == payload
+            else:
+                baseline = lambda: [json.loads(item) for item in payload]  # noqa: E731
+                fast = lambda: [codec.loads(item) for item in payload]  # noqa: E731
+
+            slow_us = min(timeit.repeat(baseline, number=number, repeat=3)) / number * 1e6
+            fast_us = min(timeit.repeat(fast, number=number, repeat=3)) / number * 1e6
+            self.stdout.write(f"{name:<32}{slow_us:>12.2f}{fast_us:>12.2f}{slow_us / fast_us:>9.1f}x")
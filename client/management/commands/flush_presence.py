@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from client import presence
+
+
+class Command(BaseCommand):
+    help = "Redis'dagi WebSocket presence holatini is_online ustuniga partiyalab yozish"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="To'xtovsiz ishlash")
+        parser.add_argument("--interval", type=float, default=5.0, help="Flushlar orasidagi vaqt (sekund)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--reconcile", action="store_true",
+                            help="Avval barcha is_online flaglarini Redis bilan to'liq solishtirish")
+
+    def handle(self, *args, **options):
+        if options["reconcile"]:
+            updated = presence.reconcile()
+            self.stdout.write(f"reconcile: {updated} rows updated")
+
+        while True:
+            updated, seen = presence.flush(batch_size=options["batch_size"])
+            if seen:
+                self.stdout.write(f"flush: {seen} users changed, {updated} rows updated")
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
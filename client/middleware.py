@@ -1,38 +1,77 @@
-import jwt
+from urllib.parse import parse_qs
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 import logging
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+USER_ROLE_CACHE_KEY = "ws_user_role:{}"
 
-class JWTAuthMiddleware(BaseMiddleware):
-    @database_sync_to_async
-    def get_user(self, token):
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            return User.objects.only("id", "role").get(id=payload["user_id"])  # faqat kerakli ustunlar
-        except jwt.ExpiredSignatureError:
-            logger.warning("JWT token expired.")
-        except jwt.DecodeError:
-            logger.warning("JWT decode error: Invalid token.")
-        except User.DoesNotExist:
+
+def get_token_from_scope(scope):
+    """Tokenni ``Authorization: Bearer`` headeridan yoki ``?token=`` query string'dan olish"""
+    headers = dict(scope.get("headers", []))
+    auth_header = headers.get(b"authorization", b"").decode()
+    if auth_header.startswith("Bearer "):
+        return auth_header.split("Bearer ")[-1]
+
+    query = parse_qs(scope.get("query_string", b"").decode())
+    tokens = query.get("token")
+    return tokens[0] if tokens else None
+
+
+@database_sync_to_async
+def get_user_role(user_id):
+    """
+    ``role`` claimi bo'lmagan eski tokenlar uchun. Natija qisqa TTL bilan keshlanadi,
+    shuning uchun reconnectlar bazaga qayta bormaydi.
+    """
+    ttl = getattr(settings, "WS_USER_ROLE_CACHE_TTL", 60)
+    key = USER_ROLE_CACHE_KEY.format(user_id)
+    role = cache.get(key) if ttl else None
+    if role is None:
+        role = User.objects.filter(id=user_id).values_list("role", flat=True).first()
+        if role is not None and ttl:
+            cache.set(key, role, ttl)
+    return role
+
+
+async def authenticate_scope(scope):
+    """
+    WebSocket handshake uchun umumiy autentifikatsiya.
+    ``user_id`` va ``role`` token ichida bo'lsa bazaga umuman murojaat qilinmaydi.
+    """
+    raw_token = get_token_from_scope(scope)
+    if not raw_token:
+        return AnonymousUser()
+
+    try:
+        token = AccessToken(raw_token)
+    except TokenError as exc:
+        logger.warning("JWT rejected: %s", exc)
+        return AnonymousUser()
+
+    if "role" not in token:
+        role = await get_user_role(token[api_settings.USER_ID_CLAIM])
+        if role is None:
             logger.warning("User not found with given token.")
-        return None
+            return AnonymousUser()
+        token["role"] = role
 
-    async def __call__(self, scope, receive, send):
-        headers = dict(scope["headers"])
-        auth_header = headers.get(b"authorization", b"").decode()
+    return TokenUser(token)
 
-        if auth_header.startswith("Bearer "):
-            token = auth_header.split("Bearer ")[-1]
-            user = await self.get_user(token)
-            scope["user"] = user if user else AnonymousUser()
-        else:
-            scope["user"] = AnonymousUser()
 
+class JWTAuthMiddleware(BaseMiddleware):
+    async def __call__(self, scope, receive, send):
+        scope["user"] = await authenticate_scope(scope)
         return await super().__call__(scope, receive, send)
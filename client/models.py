@@ -47,6 +47,8 @@ class Order(models.Model):
         choices=STATUS_CHOICES,
         default='stable'
     )
+    # Har bir holat o'zgarishida oshadi (client.order_state.transition)
+    version = models.PositiveIntegerField(default=0)
     point = gis_models.PointField(srid=4326, default=Point(69.279759, 41.311081) )
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -0,0 +1,75 @@
+import logging
+
+from django.db.models import F
+from django.dispatch import Signal
+
+from client.models import Order
+
+logger = logging.getLogger(__name__)
+
+STABLE = "stable"
+IN_PROGRESS = "in_progress"
+SUCCESS = "success"
+CANCEL_CLIENT = "cancel_client"
+CANCEL_WORKER = "cancel_worker"
+
+# Order holatlari orasidagi ruxsat etilgan o'tishlar
+ALLOWED_TRANSITIONS = {
+    STABLE: {IN_PROGRESS},
+    IN_PROGRESS: {SUCCESS, CANCEL_CLIENT, CANCEL_WORKER},
+}
+
+ACTIVE_STATUSES = (STABLE, IN_PROGRESS)
+FINAL_STATUSES = (SUCCESS, CANCEL_CLIENT, CANCEL_WORKER)
+
+# Har bir muvaffaqiyatli o'tishdan keyin yuboriladi (notification va metrikalar uchun).
+# kwargs: order, from_status, to_status
+order_transitioned = Signal()
+
+
+class InvalidTransition(ValueError):
+    """Order holati uchun ruxsat etilmagan o'tish"""
+
+
+def can_transition(from_status, to_status):
+    return to_status in ALLOWED_TRANSITIONS.get(from_status, ())
+
+
+def transition(order, to_status, **fields):
+    """
+    Orderni ``to_status`` holatiga bitta shartli UPDATE bilan o'tkazish:
+
+        UPDATE ... SET status=..., version=version+1 WHERE id=... AND status=... AND version=...
+
+    Faqat ``status``, ``version`` va ``fields`` dagi ustunlar yoziladi.
+    Agar order shu orada boshqa joyda o'zgargan bo'lsa hech narsa yozilmaydi
+    va ``False`` qaytadi — chaqiruvchi ``refresh_state`` bilan yangi holatni olishi mumkin.
+    """
+    from_status = order.status
+    if not can_transition(from_status, to_status):
+        raise InvalidTransition(f"Order {order.pk}: {from_status} -> {to_status} ruxsat etilmagan")
+
+    updated = Order.objects.filter(
+        pk=order.pk,
+        status=from_status,
+        version=order.version,
+    ).update(status=to_status, version=F("version") + 1, **fields)
+
+    if not updated:
+        logger.info("Order %s transition %s -> %s lost the race (version=%s)",
+                    order.pk, from_status, to_status, order.version)
+        return False
+
+    order.status = to_status
+    order.version += 1
+    for name, value in fields.items():
+        setattr(order, name, value)
+
+    order_transitioned.send(sender=Order, order=order, from_status=from_status, to_status=to_status)
+    return True
+
+
+def refresh_state(order):
+    """Orderning holat ustunlarini bazadan qayta o'qish"""
+    order.refresh_from_db(fields=["status", "version", "client_is_finished"])
+    return order
@@ -0,0 +1,202 @@
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+
+from django.conf import settings
+
+from config import codec, metrics
+
+logger = logging.getLogger(__name__)
+
+# Sekin mijoz uchun close kodi (ilova buni ko'rib last_event_id bilan qayta ulanadi)
+SLOW_CONSUMER_CLOSE_CODE = 4008
+
+_depth_total = 0
+
+
+@metrics.register_collector
+def _collect():
+    return {"ws_outbox_depth": _depth_total, "ws_outbox_connections": len(Outbox.open)}
+
+
+def _change_depth(delta):
+    global _depth_total
+    _depth_total += delta
+
+
+class Outbox:
+    """
+    Bitta ulanish uchun chegaralangan chiquvchi navbat va bitta yozuvchi task.
+
+    - ``coalesce_key`` bir xil bo'lgan xabarlardan faqat oxirgisi qoladi
+      (masalan, bitta order uchun eng so'nggi status).
+    - Navbat to'lsa eng eski xabar tashlanadi. Log'ga yozilgan hodisalar
+      qayta ulanishda ``last_event_id`` orqali tiklanadi.
+    - ``overflow_window`` sekund ichidagi tashlashlar ``max_overflows`` ga yetsa ``on_slow`` chaqiriladi
+      (ulanishni yopish); hisob har oynada yangidan boshlanadi, uzoq yashovchi band ulanish yopilmaydi.
+    - Yuborish tezligi token bucket bilan cheklanadi, shunda bitta ulanish
+      daphne buferini cheksiz to'ldira olmaydi va navbat chuqurligi haqiqiy holatni ko'rsatadi.
+    - ``send`` xato bersa (masalan, socket drain paytida yopildi) navbat tozalanadi, yozuvchi task
+      to'xtaydi va ``on_error`` chaqiriladi (ulanishni yopish) — navbat egasiz o'smaydi.
+
+    Cheklov: "sekin mijoz" faqat xabar tezligi bo'yicha aniqlanadi (navbatga kelish > ``rate``).
+    ASGI ``send`` transport yozish buferini ko'rsatmaydi va daphne uni o'zi buferlaydi, shuning uchun
+    tarmog'i sekin, lekin kam xabar oladigan mijoz bu yerda ko'rinmaydi.
+    """
+    open = set()
+
+    def __init__(self, send, on_slow, max_size=None, max_overflows=None, rate=None, burst=None,
+                 overflow_window=None, on_error=None):
+        self._send = send
+        self._on_slow = on_slow
+        self._on_error = on_error
+        self.max_size = max_size or getattr(settings, "WS_OUTBOX_MAX_SIZE", 100)
+        self.max_overflows = max_overflows or getattr(settings, "WS_OUTBOX_MAX_OVERFLOWS", 50)
+        self.rate = rate if rate is not None else getattr(settings, "WS_OUTBOX_RATE", 50)
+        self.burst = burst or getattr(settings, "WS_OUTBOX_BURST", 20)
+        self.overflow_window = overflow_window or getattr(settings, "WS_OUTBOX_OVERFLOW_WINDOW", 10)
+
+        self._queue = OrderedDict()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._tokens = self.burst
+        self._refilled_at = None
+        self.overflows = 0
+        self._overflow_window_start = None
+        self.slow = False
+        self.stopped = False
+
+    def start(self):
+        if self._task is None:
+            self._refilled_at = asyncio.get_running_loop().time()
+            self._task = asyncio.ensure_future(self._run())
+            Outbox.open.add(self)
+
+    def _discard(self):
+        self.stopped = True
+        Outbox.open.discard(self)
+        _change_depth(-len(self._queue))
+        self._queue.clear()
+
+    async def stop(self):
+        self._discard()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, text, coalesce_key=None):
+        if self.slow or self.stopped:
+            return
+
+        if coalesce_key is not None and coalesce_key in self._queue:
+            # Eski status hali yuborilmagan: uni yangisi bilan almashtiramiz
+            del self._queue[coalesce_key]
+            _change_depth(-1)
+            metrics.incr("ws_outbox_coalesced")
+        elif len(self._queue) >= self.max_size:
+            self._queue.popitem(last=False)
+            _change_depth(-1)
+            self._count_overflow()
+            metrics.incr("ws_outbox_dropped")
+            if self.overflows >= self.max_overflows:
+                self.slow = True
+                metrics.incr("ws_slow_consumer_disconnects")
+                logger.warning("Slow WebSocket consumer: %s messages dropped, closing", self.overflows)
+                self._on_slow()
+                return
+
+        key = coalesce_key if coalesce_key is not None else ("seq", next(self._seq))
+        self._queue[key] = text
+        _change_depth(1)
+        self._wakeup.set()
+
+    def _count_overflow(self):
+        now = asyncio.get_running_loop().time()
+        if self._overflow_window_start is None or now - self._overflow_window_start > self.overflow_window:
+            self._overflow_window_start = now
+            self.overflows = 0
+        self.overflows += 1
+
+    async def _take_token(self):
+        if not self.rate:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        if self._tokens < 1:
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+            self._tokens = 1
+            self._refilled_at = loop.time()
+        self._tokens -= 1
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue:
+                await self._take_token()
+                if not self._queue:
+                    break
+                _, text = self._queue.popitem(last=False)
+                _change_depth(-1)
+                try:
+                    await self._send(text)
+                except Exception:
+                    metrics.incr("ws_outbox_send_errors")
+                    logger.warning("WebSocket outbox send failed, closing", exc_info=True)
+                    self._discard()
+                    if self._on_error is not None:
+                        self._on_error()
+                    return
+
+
+class OutboxMixin:
+    """
+    Consumer uchun ``emit(stream, data)``: xabar to'g'ridan-to'g'ri ``send`` ga emas,
+    ulanishning chegaralangan navbatiga tushadi. ``wrap`` formatni belgilaydi.
+    """
+    outbox = None
+
+    def open_outbox(self):
+        self.outbox = Outbox(self._write_outbox, self._close_slow_consumer, on_error=self._close_broken)
+        self.outbox.start()
+
+    async def close_outbox(self):
+        if self.outbox is not None:
+            await self.outbox.stop()
+
+    async def _write_outbox(self, text):
+        await self.send(text_data=text)
+
+    def _close_slow_consumer(self):
+        asyncio.ensure_future(self.close(code=SLOW_CONSUMER_CLOSE_CODE))
+
+    def _close_broken(self):
+        asyncio.ensure_future(self.close())
+
+    def wrap(self, stream, data):
+        return data
+
+    async def emit(self, stream, data, coalesce_key=None):
+        text = self.encode_outbox(self.wrap(stream, data))
+        if self.outbox is None:
+            await self.send(text_data=text)
+        else:
+            self.outbox.put(text, coalesce_key)
+
+    async def emit_now(self, stream, data):
+        """Navbat, coalescing va tashlash siyosatidan tashqarida yuborish (masalan, reconnect'dagi replay)"""
+        await self.send(text_data=self.encode_outbox(self.wrap(stream, data)))
+
+    def encode_outbox(self, data):
+        return codec.dumps(data)
@@ -0,0 +1,200 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django_redis import get_redis_connection
+
+from users.authentication import invalidate_users
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Har bir daphne jarayonining o'z hash'i: user_id -> shu jarayondagi ochiq WebSocket ulanishlari soni.
+# Jarayonlar ``PROCESSES_KEY`` zset'ida heartbeat vaqti bilan turadi; heartbeat PRESENCE_PROCESS_TTL
+# ichida yangilanmasa (jarayon qulagan, o'ldirilgan) uning hisoblagichlari hisobga olinmaydi va
+# ``reap_dead`` ularni tozalaydi — disconnect ishlamagan ulanishlar foydalanuvchini "onlayn" qoldirmaydi.
+CONNECTIONS_KEY = "presence:connections:{}"
+PROCESSES_KEY = "presence:processes"
+# Holati o'zgargan foydalanuvchilar; flush() ularni bazaga yozadi
+DIRTY_KEY = "presence:dirty"
+
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_CONNECT = """
+local n = redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+if n == 1 then redis.call('SADD', KEYS[2], ARGV[1]) end
+return n
+"""
+
+_DISCONNECT = """
+local n = redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+if n <= 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('SADD', KEYS[2], ARGV[1])
+end
+return n
+"""
+
+_heartbeat_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+def _process_ttl():
+    return getattr(settings, "PRESENCE_PROCESS_TTL", 30)
+
+
+def heartbeat():
+    """Shu jarayon tirikligini belgilash"""
+    redis = get_redis_connection("default")
+    pipe = redis.pipeline(transaction=False)
+    pipe.zadd(PROCESSES_KEY, {PROCESS_ID: time.time()})
+    # Reaper ishlamasa ham hash abadiy qolmasin
+    pipe.expire(CONNECTIONS_KEY.format(PROCESS_ID), _process_ttl() * 10)
+    pipe.execute()
+
+
+def _heartbeat_loop():
+    while True:
+        try:
+            heartbeat()
+        except Exception:
+            logger.exception("Presence heartbeat failed")
+        time.sleep(_process_ttl() / 3)
+
+
+def _ensure_heartbeat():
+    global _heartbeat_thread
+    if _heartbeat_thread is not None:
+        return
+    with _heartbeat_lock:
+        if _heartbeat_thread is None:
+            heartbeat()
+            _heartbeat_thread = threading.Thread(target=_heartbeat_loop, name="presence-heartbeat", daemon=True)
+            _heartbeat_thread.start()
+
+
+def connected(user_id):
+    """Ulanish ochildi. Shu jarayondagi foydalanuvchi ulanishlari soni qaytadi."""
+    _ensure_heartbeat()
+    redis = get_redis_connection("default")
+    return redis.eval(_CONNECT, 2, CONNECTIONS_KEY.format(PROCESS_ID), DIRTY_KEY, user_id)
+
+
+def disconnected(user_id):
+    redis = get_redis_connection("default")
+    return redis.eval(_DISCONNECT, 2, CONNECTIONS_KEY.format(PROCESS_ID), DIRTY_KEY, user_id)
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def live_processes(redis=None):
+    redis = redis or get_redis_connection("default")
+    return [_decode(p) for p in redis.zrangebyscore(PROCESSES_KEY, time.time() - _process_ttl(), "+inf")]
+
+
+def online_user_ids(user_ids):
+    """Berilgan ID lardan hozir onlayn bo'lganlari (tirik jarayonlar bo'yicha HMGET, bazaga murojaatsiz)"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return set()
+
+    redis = get_redis_connection("default")
+    pipe = redis.pipeline(transaction=False)
+    for process_id in live_processes(redis):
+        pipe.hmget(CONNECTIONS_KEY.format(process_id), user_ids)
+
+    online = set()
+    for counts in pipe.execute():
+        online.update(user_id for user_id, count in zip(user_ids, counts) if count and int(count) > 0)
+    return online
+
+
+def is_online(user_id):
+    return user_id in online_user_ids([user_id])
+
+
+def reap_dead():
+    """
+    Heartbeat'i to'xtagan jarayonlarning hisoblagichlarini o'chirish; ularning foydalanuvchilari
+    ``dirty`` ga qo'shiladi, keyingi flush ularni (boshqa ulanishi bo'lmasa) oflayn qiladi.
+    Qaytaradi: tozalangan jarayonlar soni
+    """
+    redis = get_redis_connection("default")
+    dead = [_decode(p) for p in redis.zrangebyscore(PROCESSES_KEY, "-inf", f"({time.time() - _process_ttl()}")]
+    for process_id in dead:
+        key = CONNECTIONS_KEY.format(process_id)
+        user_ids = redis.hkeys(key)
+        if user_ids:
+            redis.sadd(DIRTY_KEY, *user_ids)
+        redis.delete(key)
+        redis.zrem(PROCESSES_KEY, process_id)
+        logger.warning("Presence: dead process %s reaped (%s users)", process_id, len(user_ids))
+    return len(dead)
+
+
+def flush(batch_size=1000):
+    """
+    O'zgargan ``is_online`` flaglarini bazaga yozish: har bir partiya uchun ikki UPDATE
+    (onlayn va oflayn), faqat qiymati haqiqatan farq qiladigan qatorlar yangilanadi.
+    Qaytaradi: (yangilangan qatorlar, ko'rib chiqilgan foydalanuvchilar)
+    """
+    redis = get_redis_connection("default")
+    reap_dead()
+    updated = seen = 0
+
+    while True:
+        raw_ids = redis.spop(DIRTY_KEY, batch_size)
+        if not raw_ids:
+            break
+
+        user_ids = [int(user_id) for user_id in raw_ids]
+        seen += len(user_ids)
+        try:
+            online = online_user_ids(user_ids)
+            offline = set(user_ids) - online
+            updated += User.objects.filter(id__in=online, is_online=False).update(is_online=True)
+            updated += User.objects.filter(id__in=offline, is_online=True).update(is_online=False)
+            invalidate_users(user_ids)
+        except Exception:
+            # Keyingi flush'da qayta urinish uchun qaytarib qo'yamiz
+            redis.sadd(DIRTY_KEY, *raw_ids)
+            raise
+
+        if len(raw_ids) < batch_size:
+            break
+
+    return updated, seen
+
+
+def reconcile():
+    """
+    To'liq solishtirish: tirik jarayonlar hisoblagichlari bo'yicha barcha ``is_online`` flaglarini to'g'rilash.
+    Deploy yoki jarayon qulagandan keyin ishlatiladi.
+    """
+    reap_dead()
+    redis = get_redis_connection("default")
+    online = set()
+    for process_id in live_processes(redis):
+        counts = redis.hgetall(CONNECTIONS_KEY.format(process_id))
+        online.update(int(user_id) for user_id, count in counts.items() if int(count) > 0)
+    going_online = list(User.objects.filter(id__in=online, is_online=False).values_list("id", flat=True))
+    going_offline = list(User.objects.filter(is_online=True).exclude(id__in=online).values_list("id", flat=True))
+    updated = User.objects.filter(id__in=going_online).update(is_online=True)
+    updated += User.objects.filter(id__in=going_offline).update(is_online=False)
+    invalidate_users(going_online + going_offline)
+    return updated
+
+
+def reset():
+    """Barcha hisoblagichlarni tozalash (hamma daphne jarayonlari to'xtatilgan paytda)"""
+    redis = get_redis_connection("default")
+    keys = [CONNECTIONS_KEY.format(_decode(p)) for p in redis.zrange(PROCESSES_KEY, 0, -1)]
+    redis.delete(PROCESSES_KEY, DIRTY_KEY, *keys)
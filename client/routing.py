@@ -1,9 +1,11 @@
 from django.urls import re_path
-from client.consumers import UserOrderConsumer, OrderActionConsumer, WorkerLocationConsumer
+from client.consumers import UserOrderConsumer, OrderActionConsumer, WorkerLocationConsumer, DeviceConsumer
 
 websocket_urlpatterns = [
     re_path(r'ws/worker/$', UserOrderConsumer.as_asgi()),
     re_path(r'ws/clients/$', UserOrderConsumer.as_asgi()),
     re_path(r'ws/order-actions/$', OrderActionConsumer.as_asgi()),
     re_path(r"ws/location/$", WorkerLocationConsumer.as_asgi()),
+    # Bitta multiplexed socket (yangi ilova versiyalari uchun)
+    re_path(r"ws/device/$", DeviceConsumer.as_asgi()),
 ]
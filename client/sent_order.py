@@ -1,18 +1,22 @@
 import threading
 import asyncio
 from asgiref.sync import async_to_sync, sync_to_async
-from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from client.groups import join_order, leave_order, notify_user
 from client.models import Order
 from client.serializer import OrderSerializer
 from client.service import WorkerService
+from config.idempotency import idempotent
 
+User = get_user_model()
 
 class SendOrderToSelectedWorkersView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent()
     def post(self, request, *args, **kwargs):
         order_id = request.data.get("order_id")
         worker_ids = request.data.get("worker_ids", [])
@@ -45,15 +49,12 @@ class SendOrderToSelectedWorkersView(APIView):
         if not selected_workers.exists():
             return Response({"detail": "Hech qanday worker topilmadi!"}, status=400)
 
-        # WebSocket channel layer
-        channel_layer = get_channel_layer()
-
         # Har bir worker uchun xabar yuborish
         for worker in selected_workers:
             try:
                 # WebSocket orqali real-time xabar
-                async_to_sync(channel_layer.group_send)(
-                    f"worker_{worker.id}",
+                async_to_sync(notify_user)(
+                    worker.id,
                     {
                         "type": "send_order_notification",
                         "order": OrderSerializer(order).data
@@ -62,6 +63,7 @@ class SendOrderToSelectedWorkersView(APIView):
 
                 # Worker'ni orderga bog‘lash
                 order.notified_workers.add(worker)
+                async_to_sync(join_order)(order.id, [worker.id])
 
                 # Worker timeout mexanizmini ishga tushirish
                 threading.Thread(
@@ -73,8 +75,6 @@ class SendOrderToSelectedWorkersView(APIView):
             except Exception as e:
                 print(f"[Xatolik] Worker {worker.id} ga xabar yuborishda muammo: {e}")
 
-        order.save()
-
         return Response({
             "detail": f"{len(selected_workers)} ta workerga xabar yuborildi!",
             "workers": [w.id for w in selected_workers],
@@ -96,13 +96,11 @@ async def auto_remove_worker(order, worker, timeout=60):
         print(f" Worker {worker.id} timeout — notified_workers dan o‘chirildi.")
 
         worker.status = 'idle'
-        await sync_to_async(worker.save)()
+        await sync_to_async(worker.save)(update_fields=["status"])
+        await leave_order(order.id, [worker.id])
 
-        # Agar boshqa active worker qolmagan bo‘lsa
-        has_workers = await sync_to_async(order.notified_workers.exists)()
-        if not has_workers:
-            order.status = 'stable'
-            await sync_to_async(order.save)()
+        # Order holati bu yerda o'zgarmaydi: stable order stable bo'lib qoladi,
+        # in_progress orderni faqat client.order_state orqali yakunlash mumkin.
 
 # async def auto_remove_worker(order, worker, timeout=60):
 #     """
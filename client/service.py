@@ -1,11 +1,13 @@
 # app/utils/redis_location_service.py
 
-import json
 from math import radians, sin, cos, sqrt, atan2
 from django.conf import settings
 from asgiref.sync import sync_to_async, async_to_sync
 from django_redis import get_redis_connection
 
+from client import presence
+from config import codec
+
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Yer sharida ikki nuqta orasidagi masofa (km) — Haversine formulasi bilan"""
@@ -43,6 +45,11 @@ class WorkerService:
 
         workers_data = await sync_to_async(self._get_all_workers)()
 
+        if getattr(settings, "DISPATCH_SKIP_OFFLINE_WORKERS", False):
+            # Socketi ochiq bo'lmagan workerlar taklifni real vaqtda ololmaydi
+            online = await sync_to_async(presence.online_user_ids)([w.get("id") for w in workers_data])
+            workers_data = [w for w in workers_data if w.get("id") in online]
+
         for radius in range(1, max_radius_km + 1):
             nearby_workers = []
 
@@ -78,14 +85,17 @@ class WorkerService:
     def _get_all_workers(self):
         """Redis'dan barcha workerlarni JSON holatda olish"""
         workers = []
-        for key in self.redis.scan_iter("worker:*"):
-            data = self.redis.get(key)
+        keys = list(self.redis.scan_iter("worker:*", count=1000))
+        if not keys:
+            return workers
+
+        # Har bir kalit uchun alohida GET o'rniga bitta MGET
+        for data in self.redis.mget(keys):
             if not data:
                 continue
             try:
-                worker = json.loads(data)
-                workers.append(worker)
-            except json.JSONDecodeError:
+                workers.append(codec.loads(data))
+            except codec.DecodeError:
                 continue
         return workers
 
@@ -96,5 +106,5 @@ def get_user_location(user_id):
     key = f"user_location_{user_id}"
     value = redis_conn.get(key)
     if value:
-        return json.loads(value)
+        return codec.loads(value)
     return None
@@ -2,7 +2,8 @@ from django.urls import path
 
 from .sent_order import SendOrderToSelectedWorkersView
 from .views import ClientDetailView, ClientNewsDetailView, OrderCreateView, FilteredWorkerListView, \
-    ClientOrderHistoryListView, ClientCancelStatsView, AcceptedWorkersView, GetUserLocationAPIView
+    ClientOrderHistoryListView, ClientCancelStatsView, AcceptedWorkersView, GetUserLocationAPIView, \
+    OnlineUsersView
 
 from .views import (
     newsclient_list,
@@ -45,6 +46,7 @@ urlpatterns = [
     path("orders/<int:order_id>/accepted-workers/", AcceptedWorkersView.as_view(), name="accepted-workers"),
 
     path("worker-test-location/<int:user_id>/", GetUserLocationAPIView.as_view()),
+    path("online-users/", OnlineUsersView.as_view(), name="online-users"),
 
 
 ]
@@ -1,3 +1,4 @@
+from asgiref.sync import async_to_sync
 from django.db.models import Case, When, IntegerField
 
 from users.models import AbstractUser
@@ -13,13 +14,16 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, BasePermission
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from config.idempotency import idempotent
+from users.tokens import RoleRefreshToken
 from .serializer import (ClientRegistrationSerializer, ClientLoginSerializer, ClientPasswordChangeSerializer,
                          ClientDetailSerializer)
 
 from django.contrib.auth import get_user_model
 from job.models import Job, CategoryJob
 from job.serializer import CategoryJobSerializer, JobSerializer
+from .groups import join_order
+from .presence import online_user_ids
 from .service import WorkerService, get_user_location
 
 User = get_user_model()
@@ -36,8 +40,10 @@ class OrderCreateView(generics.CreateAPIView):
     def perform_create(self, serializer):
         """Order yaratish va filterlangan workerlarni qaytarish"""
         self.order = serializer.save(client=self.request.user)
+        async_to_sync(join_order)(self.order.id, [self.request.user.id])
         self.eligible_workers = WorkerService.get_eligible_workers(self.order)
 
+    @idempotent()
     def create(self, request, *args, **kwargs):
         """Overriding to return custom response"""
         response = super().create(request, *args, **kwargs)
@@ -89,8 +95,7 @@ class ClientRegistrationView(generics.CreateAPIView):
         # Default tarif biriktirish
         self.assign_default_tarif(client)
 
-        refresh = RefreshToken.for_user(client)
-        refresh['role'] = client.role
+        refresh = RoleRefreshToken.for_user(client)
 
         return Response({
             "refresh": str(refresh),
@@ -118,8 +123,7 @@ class ClientLoginView(generics.GenericAPIView):
 
         tarif_info = self.get_or_assign_tarif(client)
 
-        refresh = RefreshToken.for_user(client)
-        refresh['role'] = client.role
+        refresh = RoleRefreshToken.for_user(client)
 
         return Response({
             "refresh": str(refresh),
@@ -362,3 +366,21 @@ class GetUserLocationAPIView(APIView):
         if data:
             return Response({"location": data})
         return Response({"detail": "Location not found"}, status=404)
+
+
+class OnlineUsersView(APIView):
+    """?ids=1,2,3 — qaysilari hozir onlayn (Redis'dan, bazaga murojaatsiz)"""
+    permission_classes = [IsAuthenticated]
+    MAX_IDS = 500
+
+    def get(self, request):
+        raw_ids = request.query_params.get("ids", "")
+        try:
+            user_ids = [int(user_id) for user_id in raw_ids.split(",") if user_id.strip()]
+        except ValueError:
+            return Response({"detail": "ids faqat raqamlardan iborat bo'lishi kerak"}, status=400)
+
+        if len(user_ids) > self.MAX_IDS:
+            return Response({"detail": f"Ko'pi bilan {self.MAX_IDS} ta id"}, status=400)
+
+        return Response({"online": sorted(online_user_ids(user_ids))})
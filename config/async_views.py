@@ -0,0 +1,56 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework import generics
+from rest_framework.views import APIView
+
+from users.authentication import resolve_user
+
+
+class AsyncDispatchMixin:
+    """
+    ``async def`` handlerli DRF view'lar uchun dispatch (DRF 3.15 faqat sync dispatch beradi).
+    Autentifikatsiya, permission va throttle (DB/Redis) thread'da bajariladi, handler esa
+    event loop'da — tashqi provider javobini kutish thread pool'dan joy egallamaydi.
+    Handlerda ``serializer.is_valid`` ham ``sync_to_async`` orqali chaqiriladi: keyin qo'shilgan
+    bazaga murojaat qiluvchi validator ``SynchronousOnlyOperation`` bermasin.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Handler event loop'da DB'ga sync murojaat qila olmaydi: lazy user shu thread'da yuklanadi
+        resolve_user(request.user)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # options() va http_method_not_allowed sync qoladi
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncAPIView(AsyncDispatchMixin, APIView):
+    pass
+
+
+class AsyncGenericAPIView(AsyncDispatchMixin, generics.GenericAPIView):
+    pass
@@ -0,0 +1,41 @@
+"""
+Umumiy JSON kodek: orjson o'rnatilgan bo'lsa u, aks holda standart ``json``.
+Consumerlar, DRF renderer/parser va Redis snapshotlar shu yerdan foydalanadi.
+"""
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+# Decimal, lazy tarjimalar, datetime va h.k. — DRF bilan bir xil natija berishi uchun
+_default = JSONEncoder().default
+
+if orjson:
+    # datetime DRF formatida (millisekund, "Z") qolishi uchun DRF encoderiga qoldiriladi
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumpb(obj):
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=_default, option=_OPTIONS).decode()
+
+    loads = orjson.loads
+    DecodeError = orjson.JSONDecodeError
+else:
+    _encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(obj):
+        return _encoder.encode(obj)
+
+    def dumpb(obj):
+        return _encoder.encode(obj).encode()
+
+    loads = json.loads
+    DecodeError = json.JSONDecodeError
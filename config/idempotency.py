@@ -0,0 +1,194 @@
+"""
+``Idempotency-Key`` header: mobil tarmoq uzilib so'rov qayta yuborilsa, birinchi javob Redis'dan
+qaytariladi — ATMOS chaqiruvlari, matching va DB yozuvlari qayta bajarilmaydi.
+
+    class CreatePaymentTransactionView(AsyncGenericAPIView):
+        @idempotent()
+        async def post(self, request): ...
+
+Holatlar (kalit: ``idem:<view>:<user>:<key>``):
+- yo'q — so'rov bajariladi, oldin ``pending`` yozuvi SET NX bilan olinadi;
+- ``pending`` — shu kalit bilan so'rov bajarilmoqda: natija kutiladi, bo'lmasa 409. Async handler
+  IDEMPOTENCY_WAIT gacha kutadi (event loop band bo'lmaydi); sync handler request thread'ini band
+  qilmaslik uchun ko'pi bilan IDEMPOTENCY_SYNC_WAIT (0 — darhol 409);
+- ``done`` — saqlangan javob qaytariladi (``Idempotent-Replayed: true``).
+Boshqa body bilan qayta ishlatilgan kalit — 422. 5xx javob va exception saqlanmaydi (qayta urinish mumkin).
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_redis import get_redis_connection
+from rest_framework import status
+from rest_framework.response import Response
+
+from config import codec, metrics
+
+HEADER = "Idempotency-Key"
+KEY = "idem:{scope}:{user_id}:{key}"
+MAX_KEY_LENGTH = 128
+POLL_INTERVAL = 0.05
+
+
+def _settings():
+    return (
+        getattr(settings, "IDEMPOTENCY_TTL", 60 * 60 * 24),
+        getattr(settings, "IDEMPOTENCY_LOCK_TTL", 60),
+        getattr(settings, "IDEMPOTENCY_WAIT", 10),
+    )
+
+
+def _sync_wait():
+    _, _, wait = _settings()
+    return min(getattr(settings, "IDEMPOTENCY_SYNC_WAIT", 0.5), wait)
+
+
+def fingerprint(request):
+    data = request.data.dict() if hasattr(request.data, "dict") else request.data
+    body = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method}:{request.path}:{body}".encode()).hexdigest()
+
+
+def _redis_key(scope, request, key):
+    return KEY.format(scope=scope, user_id=getattr(request.user, "id", None) or "anon", key=key)
+
+
+def begin(redis_key, fp):
+    """``pending`` yozuvini olish. Qaytaradi: None (biz bajaramiz) yoki mavjud yozuv"""
+    _, lock_ttl, _ = _settings()
+    redis = get_redis_connection("default")
+    if redis.set(redis_key, codec.dumps({"state": "pending", "fp": fp}), nx=True, ex=lock_ttl):
+        return None
+    raw = redis.get(redis_key)
+    # Orada yozuv o'chgan bo'lsa (egasi xato bilan tugadi) — qayta urinib ko'ramiz
+    return codec.loads(raw) if raw else begin(redis_key, fp)
+
+
+def finish(redis_key, fp, response):
+    redis = get_redis_connection("default")
+    if response.status_code >= 500 or not hasattr(response, "data"):
+        redis.delete(redis_key)
+        return
+    ttl, _, _ = _settings()
+    redis.set(redis_key, codec.dumps({
+        "state": "done",
+        "fp": fp,
+        "status": response.status_code,
+        "data": response.data,
+    }), ex=ttl)
+
+
+def abort(redis_key):
+    get_redis_connection("default").delete(redis_key)
+
+
+def peek(redis_key):
+    raw = get_redis_connection("default").get(redis_key)
+    return codec.loads(raw) if raw else None
+
+
+def replay(entry, fp):
+    """Mavjud yozuv bo'yicha javob; ``None`` — hali bajarilmoqda"""
+    if entry["fp"] != fp:
+        metrics.incr("idempotency_conflicts")
+        return Response(
+            {"detail": "Idempotency-Key boshqa so'rov bilan ishlatilgan"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if entry["state"] != "done":
+        return None
+    metrics.incr("idempotency_replayed")
+    return Response(entry["data"], status=entry["status"], headers={"Idempotent-Replayed": "true"})
+
+
+def in_progress():
+    metrics.incr("idempotency_in_progress")
+    return Response(
+        {"detail": "Shu Idempotency-Key bilan so'rov hali bajarilmoqda"},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def _key(request):
+    key = request.headers.get(HEADER)
+    if key and len(key) <= MAX_KEY_LENGTH:
+        return key
+    return None
+
+
+def idempotent(scope=None):
+    """DRF view handleri (``post`` / ``create``) uchun; sync va async handlerlar qo'llab-quvvatlanadi"""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(self, request, *args, **kwargs):
+                key = _key(request)
+                if not key:
+                    return await func(self, request, *args, **kwargs)
+
+                redis_key = _redis_key(scope or type(self).__name__, request, key)
+                fp = fingerprint(request)
+                entry = await sync_to_async(begin)(redis_key, fp)
+                if entry is not None:
+                    _, _, wait = _settings()
+                    deadline = time.monotonic() + wait
+                    while True:
+                        response = replay(entry, fp)
+                        if response is not None:
+                            return response
+                        if time.monotonic() >= deadline:
+                            return in_progress()
+                        await asyncio.sleep(POLL_INTERVAL)
+                        entry = await sync_to_async(peek)(redis_key)
+                        if entry is None:
+                            return in_progress()
+
+                try:
+                    response = await func(self, request, *args, **kwargs)
+                except BaseException:
+                    await sync_to_async(abort)(redis_key)
+                    raise
+                await sync_to_async(finish)(redis_key, fp, response)
+                return response
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            key = _key(request)
+            if not key:
+                return func(self, request, *args, **kwargs)
+
+            redis_key = _redis_key(scope or type(self).__name__, request, key)
+            fp = fingerprint(request)
+            entry = begin(redis_key, fp)
+            if entry is not None:
+                deadline = time.monotonic() + _sync_wait()
+                while True:
+                    response = replay(entry, fp)
+                    if response is not None:
+                        return response
+                    if time.monotonic() >= deadline:
+                        return in_progress()
+                    time.sleep(POLL_INTERVAL)
+                    entry = peek(redis_key)
+                    if entry is None:
+                        return in_progress()
+
+            try:
+                response = func(self, request, *args, **kwargs)
+            except BaseException:
+                abort(redis_key)
+                raise
+            finish(redis_key, fp, response)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,34 @@
+import threading
+from collections import defaultdict
+
+# Jarayon ichidagi oddiy metrikalar: counter va gauge'lar.
+# /metrics/ (faqat staff) orqali JSON ko'rinishida o'qiladi.
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_collectors = []
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def register_collector(func):
+    """``func() -> dict`` snapshot olinayotganda chaqiriladi (masalan, holatni o'qish uchun)"""
+    _collectors.append(func)
+    return func
+
+
+def snapshot():
+    with _lock:
+        data = {"counters": dict(_counters), "gauges": dict(_gauges)}
+    for collector in _collectors:
+        data["gauges"].update(collector())
+    return data
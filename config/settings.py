@@ -1,10 +1,13 @@
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.translation import gettext_lazy as _
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv()
 SECRET_KEY = 'django-insecure-sfxtedi$dh=#e!n=#nwmi35^(26o0(z556j5-7d+^%e#n3t6$z'
 DEBUG = True
 ALLOWED_HOSTS = ["mardex.digitallaboratory.uz", "olx.digitallaboratory.uz", "127.0.0.1", "localhost", "95.46.96.68"]
@@ -42,7 +45,18 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Token claimlari (user_id, role) bilan; user bazadan faqat kerak bo'lganda, Redis keshi orqali
+        'users.authentication.ClaimsJWTAuthentication',
+    ),
+    # orjson (config/codec.py) asosidagi JSON; browsable API va form parserlar o'zgarishsiz
+    'DEFAULT_RENDERER_CLASSES': (
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'config.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
 }
 
@@ -175,6 +189,10 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': False,
 }
 
+# REST so'rovlarida user (parol hash'isiz) Redis'da shuncha sekund saqlanadi va har so'rovda is_active
+# shundan tekshiriladi (users/authentication.py); save() da tozalanadi. 0 — har so'rovda bazadan
+AUTH_USER_CACHE_TTL = 60
+
 FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50 MB (baytlarda)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50 MB
 
@@ -189,32 +207,128 @@ CACHES = {
 }
 
 
+# Channel layer uchun Redis hostlari, vergul bilan: "redis://redis:6379,redis://redis-2:6379".
+# Bir nechta host berilsa channels_redis kanal va guruhlarni ular orasida shard qiladi.
+CHANNEL_REDIS_HOSTS = [
+    host.strip() for host in os.environ.get("CHANNEL_REDIS_HOSTS", "redis://redis:6379").split(",") if host.strip()
+]
+
+# core — RedisChannelLayer (ro'yxatlar, capacity/expiry bilan)
+# pubsub — RedisPubSubChannelLayer (Redis PUBLISH/SUBSCRIBE, navbatsiz)
+CHANNEL_LAYER_BACKEND = os.environ.get("CHANNEL_LAYER_BACKEND", "core")
+CHANNEL_LAYER_BACKENDS = {
+    "core": "channels_redis.core.RedisChannelLayer",
+    "pubsub": "channels_redis.pubsub.RedisPubSubChannelLayer",
+}
+
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "BACKEND": CHANNEL_LAYER_BACKENDS[CHANNEL_LAYER_BACKEND],
         "CONFIG": {
-            "hosts": [("redis", 6379)],  # Redis server ishlayotgan manzil va port
+            "hosts": CHANNEL_REDIS_HOSTS,
         },
     },
 }
+if CHANNEL_LAYER_BACKEND == "core":
+    CHANNEL_LAYERS["default"]["CONFIG"]["capacity"] = int(os.environ.get("CHANNEL_LAYER_CAPACITY", 100))
+
+# Eski ilova versiyalari uchun worker_{id} / client_{id} guruhlari ham saqlanadi.
+# Barcha ilovalar user_{id} / order_{id} guruhlariga o'tgach False qilinadi.
+CHANNELS_LEGACY_GROUPS = True
+
+# role claimi bo'lmagan eski tokenlar uchun WebSocket handshake'da role keshi (sekund, 0 — o'chirilgan)
+WS_USER_ROLE_CACHE_TTL = 60
+
+# Har bir foydalanuvchi uchun order hodisalari logi (Redis Stream), reconnect'da replay qilinadi
+EVENT_LOG_MAXLEN = 200
+EVENT_LOG_TTL = 60 * 60 * 24
+EVENT_LOG_REPLAY_LIMIT = 50  # replay sahifasi (WS_OUTBOX_MAX_SIZE dan kichik); backlog sahifalab yuboriladi
+
+# Har bir WebSocket ulanishining chiquvchi navbati (client/outbox.py)
+WS_OUTBOX_MAX_SIZE = 100  # navbatdagi xabarlar soni
+WS_OUTBOX_MAX_OVERFLOWS = 50  # WS_OUTBOX_OVERFLOW_WINDOW ichida shuncha xabar tashlansa ulanish yopiladi (4008)
+WS_OUTBOX_OVERFLOW_WINDOW = 10  # sekund
+WS_OUTBOX_RATE = 50  # sekundiga xabar (0 — cheklanmagan)
+WS_OUTBOX_BURST = 20
+
+# Daphne jarayoni heartbeat'i shu muddatda yangilanmasa uning presence hisoblagichlari o'chiriladi (sekund)
+PRESENCE_PROCESS_TTL = 30
+
+# Dispatch'da WebSocket ulanishi yo'q workerlarni o'tkazib yuborish (client/presence.py)
+DISPATCH_SKIP_OFFLINE_WORKERS = False
+
+# Idempotency-Key (config/idempotency.py): javob saqlanish muddati, bajarilayotgan so'rov lock'i
+# (eng sekin handlerdan uzun bo'lishi kerak) va dublikat so'rov natijani kutadigan vaqt, sekund
+IDEMPOTENCY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TTL = 60
+IDEMPOTENCY_WAIT = 10
+# Sync handlerlarda kutish worker thread'ini band qiladi — qisqa, keyin 409
+IDEMPOTENCY_SYNC_WAIT = 0.5
 
 # workerlarni topishda km ni sozlash
 NEAREST_WORKER_MIN_RADIUS_KM = 1
 NEAREST_WORKER_MAX_RADIUS_KM = 30
 NEAREST_WORKER_MAX_RESULTS = 20
 
-load_dotenv()
 
 MYID_BASE_URL = os.environ.get("MYID_BASE_URL")
 MYID_CLIENT_ID = os.environ.get("MYID_CLIENT_ID")
 MYID_CLIENT_SECRET = os.environ.get("MYID_CLIENT_SECRET")
 MYID_CLIENT_HASH_ID = os.getenv("MYID_CLIENT_HASH_ID")
 MYID_CLIENT_HASH = os.getenv("MYID_CLIENT_HASH")
+# MyID tokeni Redis'da; muddati tugashidan shuncha sekund oldin fonda yangilanadi (users/myid_helper.py)
+MYID_TOKEN_REFRESH_AHEAD = 300
+# MyID sessiya statusini watch_myid_sessions so'raydi: interval MIN dan MAX gacha ikki barobar oshadi (sekund)
+MYID_SESSION_TTL = 600
+MYID_SESSION_POLL_MIN = 2
+MYID_SESSION_POLL_MAX = 15
 
 ATMOS_BASE_URL = os.environ.get("ATMOS_BASE_URL")
 ATMOS_CONSUMER_KEY = os.environ.get("ATMOS_CONSUMER_KEY")
 ATMOS_CONSUMER_SECRET = os.environ.get("ATMOS_CONSUMER_SECRET")
 ATMOS_STORE_ID = os.environ.get("ATMOS_STORE_ID")
+# ATMOS bilan ochiq keep-alive ulanishlar soni (har bir jarayon uchun)
+ATMOS_HTTP_POOL_SIZE = int(os.environ.get("ATMOS_HTTP_POOL_SIZE", 20))
+
+# Tashqi providerlar (users/http.py): timeout (connect, read), retry, bulkhead va circuit breaker.
+# max_concurrent — bir jarayonda providerga bir vaqtdagi so'rovlar; qolganlari darhol 503 oladi,
+# shuning uchun sekin provider daphne thread pool'ini to'ldirib, boshqa endpointlarni to'xtatmaydi.
+OUTBOUND_PROVIDERS = {
+    "atmos": {
+        "pool_size": ATMOS_HTTP_POOL_SIZE,
+        "timeout": (3, 10),
+        "retries": 2,
+        "max_concurrent": ATMOS_HTTP_POOL_SIZE,
+        "failure_threshold": 5,
+        "reset_timeout": 30,
+    },
+    "myid": {
+        "pool_size": 10,
+        "timeout": (3, 10),
+        "retries": 1,
+        "max_concurrent": 10,
+        "failure_threshold": 5,
+        "reset_timeout": 30,
+    },
+}
+# Token muddati tugashidan shuncha sekund oldin fonda yangilanadi
+ATMOS_TOKEN_REFRESH_AHEAD = 300
+# ATMOS callback (users/atmos/callback/) imzosi uchun API kalit; bo'sh bo'lsa barcha callback'lar rad etiladi
+ATMOS_CALLBACK_API_KEY = os.environ.get("ATMOS_CALLBACK_API_KEY")
+
+# To'lov holati: shuncha sekund ichida tekshirilgan bo'lsa polling endpoint lokal javob beradi
+PAYMENT_STATUS_FRESH_SECONDS = 15
+# Shundan eski va ATMOS da tasdiqlanmagan draft/pre_applied to'lovlar "expired" bo'ladi
+PAYMENT_ABANDON_AFTER = 60 * 60 * 24
 
 
 CRYPTO_KEY = "N2s9EF9lZ97yCvMnxlsm2tTQz6GADqSftlQe7T5zOAM="
+# Fernet kalitlari, vergul bilan. Birinchisi — yangi yozuvlar uchun (primary), qolganlari faqat o'qish uchun.
+# Almashtirish: yangi kalitni boshiga qo'shing, `manage.py rotate_crypto_keys` tugagach eskisini olib tashlang.
+CRYPTO_KEYS = [key.strip() for key in os.environ.get("CRYPTO_KEYS", CRYPTO_KEY).split(",") if key.strip()]
+# Shifrlangan qiymatlar bo'yicha qidirish uchun HMAC kaliti (blind index). CRYPTO_KEY dan farq qilishi
+# kerak; o'zgartirilsa barcha *_bidx ustunlari qayta hisoblanishi kerak. Majburiy: repodagi kalit bilan
+# har kim indekslarni offline hisoblay oladi. Default faqat `manage.py test` uchun.
+BLIND_INDEX_KEY = os.environ.get("BLIND_INDEX_KEY") or ("test-blind-index-key" if sys.argv[1:2] == ["test"] else None)
+if not BLIND_INDEX_KEY:
+    raise ImproperlyConfigured("BLIND_INDEX_KEY environment variable is required")
@@ -7,6 +7,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
 from config import settings
+from config.views import MetricsView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -29,6 +30,7 @@ urlpatterns = [
     path('job/', include('job.urls')),
     path('client/', include('client.urls')),
     path('users/', include('users.urls')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
 if settings.DEBUG:  # Faqat DEBUG rejimida ishlaydi
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,13 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config import metrics
+
+
+class MetricsView(APIView):
+    """Shu jarayonning ichki metrikalari (WebSocket navbatlari va h.k.)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
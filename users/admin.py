@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from users.models import Payment, UserCard
+from users.models import AtmosWebhookEvent, Payment, UserCard
 
 
 # from users.models import AbstractUser
@@ -11,20 +11,11 @@ from users.models import Payment, UserCard
 # USER CARD ADMIN
 @admin.register(UserCard)
 class UserCardAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "show_pan", "status", "transaction_id", "created_at")
+    list_display = ("id", "user", "masked_pan", "brand", "status", "transaction_id", "created_at")
     list_filter = ("status", "created_at")
     search_fields = ("user__username", "transaction_id")
     readonly_fields = ("card_id", "transaction_id", "created_at")
 
-    # PAN ni decrypt qilib ko‘rsatish
-    def show_pan(self, obj):
-        try:
-            return obj.get_decrypted_data().get("pan")
-        except:
-            return "Decrypt error"
-
-    show_pan.short_description = "Card PAN"
-
     fieldsets = (
         ("User", {
             "fields": ("user",)
@@ -32,8 +23,12 @@ class UserCardAdmin(admin.ModelAdmin):
         ("Transaction info", {
             "fields": ("transaction_id", "status", "created_at"),
         }),
-        ("Card info (decrypted ko‘rinmaydi)", {
-            "fields": ("card_id", "pan", "expiry", "card_holder", "phone", "card_token"),
+        # pan/expiry/card_holder/phone/card_token atributda decrypt qilingan — admin'da ko'rsatilmaydi
+        ("Card info", {
+            "fields": ("card_id",),
+        }),
+        ("Display", {
+            "fields": ("masked_pan", "last4", "brand", "expiry_month", "expiry_year", "masked_holder", "masked_phone"),
         }),
     )
 
@@ -58,3 +53,12 @@ class PaymentAdmin(admin.ModelAdmin):
             "fields": ("account", "store_id", "terminal_id"),
         }),
     )
+
+
+# ATMOS CALLBACK INBOX
+@admin.register(AtmosWebhookEvent)
+class AtmosWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "transaction_id", "status", "received_at", "processed_at")
+    list_filter = ("status",)
+    search_fields = ("transaction_id",)
+    readonly_fields = ("dedup_key", "transaction_id", "payload", "received_at", "processed_at", "error")
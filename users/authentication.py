@@ -0,0 +1,191 @@
+"""
+REST autentifikatsiyasi: imzolangan access token'dagi ``user_id`` va ``role`` claimlariga ishoniladi.
+
+Har bir so'rovda user Redis keshidan (AUTH_USER_CACHE_TTL; bo'lmasa bazadan) tekshiriladi: o'chirilgan
+yoki ``is_active=False`` user'ning tokeni view user'ga murojaat qilmasa ham rad etiladi.
+GET/HEAD/OPTIONS da ``request.user`` shu keshdagi user bo'ladi (bazaga so'rov yo'q). Yozuvchi
+so'rovlarda ``request.user`` — ``LazyUser``: ``id``/``pk``, ``role``, ``is_authenticated`` token'dan olinadi,
+boshqa atributga murojaat qilinganda user bazadan yuklanadi — keshdagi eski nusxa ``save()`` bilan yangi
+qiymatlarni bosib ketmasin.
+
+Keshda parol hash'idan boshqa hamma ustun saqlanadi — keshdan tiklangan user serializer'da har bir
+maydon uchun alohida so'rov qilmasin. Kesh ishlamasa user bazadan o'qiladi. User saqlanganda yoki
+o'chirilganda kesh tozalanadi; ``QuerySet.update()`` signal yubormaydi — user ustunlarini shu yo'l bilan
+o'zgartiradigan kod ``invalidate_users`` ni o'zi chaqirishi kerak.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_KEY = "auth_user:{}"
+# Keshga yozilmaydigan ustunlar (keshdan tiklangan user'da deferred)
+USER_CACHE_EXCLUDE = ("password",)
+
+
+def _ttl():
+    return getattr(settings, "AUTH_USER_CACHE_TTL", 60)
+
+
+def _cache_fields(User):
+    # from_db qiymatlarni concrete_fields tartibida kutadi
+    return [field for field in User._meta.concrete_fields if field.attname not in USER_CACHE_EXCLUDE]
+
+
+def _from_cache(User, key):
+    try:
+        values = cache.get(key)
+    except Exception:
+        logger.warning("auth user cache read failed", exc_info=True)
+        return None
+    fields = _cache_fields(User)
+    if not isinstance(values, dict) or any(field.attname not in values for field in fields):
+        return None  # yo'q yoki eski formatdagi yozuv
+    return User.from_db(DEFAULT_DB_ALIAS, [field.attname for field in fields],
+                        [values[field.attname] for field in fields])
+
+
+def _to_cache(User, key, user, ttl):
+    try:
+        # get_prep_value: FieldFile o'rniga fayl nomi (instance bilan birga pickle qilinmasin)
+        values = {field.attname: field.get_prep_value(field.value_from_object(user)) for field in _cache_fields(User)}
+        cache.set(key, values, ttl)
+    except Exception:
+        logger.warning("auth user cache write failed", exc_info=True)
+
+
+def load_user(user_id, use_cache=True):
+    User = get_user_model()
+    key = USER_CACHE_KEY.format(user_id)
+    ttl = _ttl()
+    user = _from_cache(User, key) if use_cache and ttl else None
+    if user is None:
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if ttl:
+            _to_cache(User, key, user, ttl)
+
+    if not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return user
+
+
+def invalidate_users(user_ids):
+    keys = [USER_CACHE_KEY.format(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        logger.warning("auth user cache invalidation failed for %s", user_ids, exc_info=True)
+
+
+def invalidate_user(user_id):
+    invalidate_users([user_id])
+
+
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+def connect_signals():
+    post_save.connect(invalidate_user_cache, sender=settings.AUTH_USER_MODEL, dispatch_uid="auth_user_cache_save")
+    post_delete.connect(invalidate_user_cache, sender=settings.AUTH_USER_MODEL, dispatch_uid="auth_user_cache_delete")
+
+
+class LazyUser(SimpleLazyObject):
+    """Token claimlari bilan ishlaydigan user; qolgan atributlar birinchi murojaatda yuklanadi"""
+
+    def __init__(self, user_id, role=None, fresh=False):
+        super().__init__(lambda: load_user(user_id, use_cache=not fresh))
+        self.__dict__["_user_id"] = user_id
+        self.__dict__["_role"] = role
+
+    @property
+    def loaded(self):
+        return self._wrapped is not empty
+
+    # isinstance(request.user, User) va ORM lookup'lari user'ni yuklamaydi
+    @property
+    def __class__(self):
+        return get_user_model()
+
+    @property
+    def _meta(self):
+        return get_user_model()._meta
+
+    @property
+    def pk(self):
+        return self._wrapped.pk if self.loaded else self._user_id
+
+    id = pk
+
+    @property
+    def role(self):
+        # ``role`` claimi bo'lmagan eski tokenlar — user yuklanadi
+        if self.loaded or self._role is None:
+            return self.load().role
+        return self._role
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __bool__(self):
+        return True
+
+    def __getattr__(self, name):
+        # ORM'ning hasattr(value, "resolve_expression") kabi tekshiruvlari user'ni yuklamasin:
+        # modelda (field yoki metod sifatida) yo'q nom yuklanmagan user'da ham yo'q
+        if not self.loaded and name != "_state" and not hasattr(get_user_model(), name):
+            raise AttributeError(name)
+        return super().__getattr__(name)
+
+    def load(self):
+        if not self.loaded:
+            self._setup()
+        return self._wrapped
+
+
+def resolve_user(user):
+    """Lazy user'ni hozir (sync kontekstda) yuklash — async handlerlar uchun"""
+    if type(user) is LazyUser:
+        user.load()
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` — lekin user keshdan, yozuvchi so'rovlarda esa faqat kerak bo'lganda (``LazyUser``)"""
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        # View user'ga murojaat qilmasa ham: o'chirilgan/faolsizlantirilgan user'ning tokeni ishlamaydi
+        cached = load_user(user_id)
+        if request.method in SAFE_METHODS:
+            return cached, validated_token
+        return LazyUser(user_id, validated_token.get("role"), fresh=True), validated_token
@@ -0,0 +1,86 @@
+import re
+
+# BIN (birinchi raqamlar) bo'yicha to'lov tizimi
+_BRANDS = (
+    ("8600", "uzcard"),
+    ("5614", "uzcard"),
+    ("9860", "humo"),
+    ("4", "visa"),
+    ("51", "mastercard"),
+    ("52", "mastercard"),
+    ("53", "mastercard"),
+    ("54", "mastercard"),
+    ("55", "mastercard"),
+    ("220", "mir"),
+    ("62", "unionpay"),
+)
+
+
+def card_brand(pan):
+    pan = re.sub(r"\D", "", pan or "")
+    for prefix, brand in _BRANDS:
+        if pan.startswith(prefix):
+            return brand
+    # Mastercard 2-series: 2221–2720
+    if len(pan) >= 4 and 2221 <= int(pan[:4]) <= 2720:
+        return "mastercard"
+    return ""
+
+
+def mask(value):
+    """****1234 — oxirgi 4 belgidan boshqasi yashiriladi"""
+    value = value or ""
+    return f"{'*' * max(len(value) - 4, 0)}{value[-4:]}"
+
+
+def mask_name(name):
+    """"TEST CARDHOLDER" -> "T*** C***" — har bir so'zdan faqat bosh harf"""
+    return " ".join(f"{word[0]}***" for word in (name or "").split())
+
+
+def parse_expiry(expiry):
+    """ATMOS formati YYMM ("2812") -> (2028, 12); noto'g'ri bo'lsa (None, None)"""
+    expiry = re.sub(r"\D", "", expiry or "")
+    if len(expiry) != 4:
+        return None, None
+    year, month = int(expiry[:2]), int(expiry[2:])
+    if not 1 <= month <= 12:
+        return None, None
+    return 2000 + year, month
+
+
+def format_expiry(year, month):
+    if not year or not month:
+        return ""
+    return f"{year % 100:02d}{month:02d}"
+
+
+def display_fields(card_data):
+    """
+    ATMOS bind-card/confirm javobidan ko'rsatish uchun xavfsiz ustunlar.
+    Ular karta tasdiqlanganda bir marta yoziladi, ro'yxat va javoblar decrypt qilmaydi.
+    """
+    pan = card_data.get("pan") or ""
+    expiry_year, expiry_month = parse_expiry(card_data.get("expiry"))
+    return {
+        "masked_pan": mask(pan),
+        "last4": pan[-4:],
+        "brand": card_brand(pan),
+        "expiry_year": expiry_year,
+        "expiry_month": expiry_month,
+        "masked_holder": mask_name(card_data.get("card_holder")),
+        "masked_phone": mask(card_data.get("phone")),
+    }
+
+
+def display_data(card):
+    """API javobidagi karta ko'rinishi (faqat display ustunlaridan)"""
+    return {
+        "card_id": card.card_id,
+        "masked_card": card.masked_pan,
+        "last4": card.last4,
+        "brand": card.brand,
+        "expiry": format_expiry(card.expiry_year, card.expiry_month),
+        "card_holder": card.masked_holder,
+        "phone": card.masked_phone,
+    }
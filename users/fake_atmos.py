@@ -0,0 +1,177 @@
+"""
+Lokal ATMOS o'rnini bosuvchi HTTP server (aiohttp): /token, /merchant/pay/*, /partner/bind-card/*,
+/partner/remove-card. Kechikish va xatolarni sozlash mumkin, shuning uchun to'lov oqimlarini
+sandbox'siz ishlatib, sekin/ishlamayotgan provider holatini ham sinash mumkin.
+
+    python manage.py fake_atmos --port 8090 --latency-ms 300 --error-rate 0.05
+    ATMOS_BASE_URL=http://127.0.0.1:8090
+
+Sozlamalarni ishlab turgan serverda ham o'zgartirish mumkin: POST /_config {"latency_ms": 1000}
+"""
+import asyncio
+import itertools
+import random
+import secrets
+
+from aiohttp import web
+
+DEFAULT_CONFIG = {
+    "latency_ms": 0,  # har bir javobdan oldin
+    "jitter_ms": 0,  # +- tasodifiy qo'shimcha
+    "error_rate": 0.0,  # shu ulushdagi so'rovlarga HTTP 500
+    "decline_rate": 0.0,  # shu ulushdagi so'rovlarga result.code != OK
+    "hang_rate": 0.0,  # shu ulushdagi so'rovlar hang_ms kutadi (timeout sinovi)
+    "hang_ms": 30000,
+}
+
+
+def ok(**data):
+    return web.json_response({"result": {"code": "OK", "description": "Muvaffaqiyatli"}, **data})
+
+
+class FakeAtmos:
+    def __init__(self, **config):
+        self.config = {**DEFAULT_CONFIG, **{k: v for k, v in config.items() if v is not None}}
+        self._ids = itertools.count(100000)
+        self.tokens = set()
+        self.transactions = {}  # transaction_id -> {"amount", "confirmed", "status"}
+        self.bind_requests = {}  # transaction_id -> card_number/expiry
+        self.stats = {"requests": 0, "errors": 0, "declines": 0, "hangs": 0}
+
+    def app(self):
+        app = web.Application(middlewares=[self.inject])
+        app.router.add_post("/token", self.token)
+        app.router.add_post("/merchant/pay/create", self.pay_create)
+        app.router.add_post("/merchant/pay/pre-apply", self.pay_pre_apply)
+        app.router.add_post("/merchant/pay/apply", self.pay_apply)
+        app.router.add_get("/merchant/pay/status/{transaction_id}", self.pay_status)
+        app.router.add_post("/merchant/pay/reverse", self.pay_reverse)
+        app.router.add_post("/partner/bind-card/init", self.bind_init)
+        app.router.add_post("/partner/bind-card/confirm", self.bind_confirm)
+        app.router.add_post("/partner/remove-card", self.remove_card)
+        app.router.add_post("/_config", self.update_config)
+        app.router.add_get("/_stats", self.get_stats)
+        return app
+
+    @web.middleware
+    async def inject(self, request, handler):
+        if request.path.startswith("/_"):
+            return await handler(request)
+
+        self.stats["requests"] += 1
+        config = self.config
+        delay = config["latency_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+        if random.random() < config["hang_rate"]:
+            self.stats["hangs"] += 1
+            delay = config["hang_ms"]
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if random.random() < config["error_rate"]:
+            self.stats["errors"] += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+
+        if request.path != "/token":
+            auth = request.headers.get("Authorization", "")
+            if not auth.startswith("Bearer ") or auth[7:] not in self.tokens:
+                return web.json_response({"error": "invalid token"}, status=401)
+
+        if request.path != "/token" and random.random() < config["decline_rate"]:
+            self.stats["declines"] += 1
+            return web.json_response({"result": {"code": "STPIMS-ERR-092", "description": "Injected decline"}})
+
+        return await handler(request)
+
+    async def _json(self, request):
+        try:
+            return await request.json()
+        except ValueError:
+            return {}
+
+    async def token(self, request):
+        token = secrets.token_urlsafe(24)
+        self.tokens.add(token)
+        return web.json_response({"access_token": token, "token_type": "Bearer", "expires_in": 3600,
+                                  "scope": "am_application_scope default"})
+
+    async def pay_create(self, request):
+        body = await self._json(request)
+        transaction_id = next(self._ids)
+        self.transactions[transaction_id] = {"amount": body.get("amount"), "confirmed": False, "status": "created"}
+        return ok(transaction_id=transaction_id, store_transaction={"trans_id": transaction_id, "confirmed": False})
+
+    async def pay_pre_apply(self, request):
+        body = await self._json(request)
+        transaction = self.transactions.get(int(body.get("transaction_id") or 0))
+        if transaction is None:
+            return web.json_response({"result": {"code": "STPIMS-ERR-004", "description": "Not found"}})
+        transaction["status"] = "pre_applied"
+        return ok(transaction_id=body.get("transaction_id"))
+
+    async def pay_apply(self, request):
+        body = await self._json(request)
+        transaction = self.transactions.get(int(body.get("transaction_id") or 0))
+        if transaction is None:
+            return web.json_response({"result": {"code": "STPIMS-ERR-004", "description": "Not found"}})
+        transaction.update(confirmed=True, status="confirmed")
+        return ok(store_transaction={"trans_id": body.get("transaction_id"), "confirmed": True,
+                                     "status_code": "0", "status_message": "Success"})
+
+    async def pay_status(self, request):
+        transaction_id = int(request.match_info["transaction_id"])
+        transaction = self.transactions.get(transaction_id)
+        if transaction is None:
+            return web.json_response({"result": {"code": "STPIMS-ERR-004", "description": "Not found"}})
+        return ok(store_transaction={"trans_id": transaction_id, "amount": transaction["amount"],
+                                     "confirmed": transaction["confirmed"], "status_code": transaction["status"]})
+
+    async def pay_reverse(self, request):
+        body = await self._json(request)
+        transaction = self.transactions.get(int(body.get("transaction_id") or 0))
+        if transaction is None:
+            return web.json_response({"result": {"code": "STPIMS-ERR-004", "description": "Not found"}})
+        transaction.update(confirmed=False, status="reversed")
+        return ok(transaction_id=body.get("transaction_id"))
+
+    async def bind_init(self, request):
+        body = await self._json(request)
+        transaction_id = next(self._ids)
+        self.bind_requests[transaction_id] = body
+        return ok(transaction_id=transaction_id, phone="99890*****67")
+
+    async def bind_confirm(self, request):
+        body = await self._json(request)
+        bind = self.bind_requests.pop(int(body.get("transaction_id") or 0), None)
+        if bind is None:
+            return web.json_response({"result": {"code": "STPIMS-ERR-004", "description": "Not found"}})
+        card_number = str(bind.get("card_number") or "8600000000000000")
+        return ok(data={
+            "card_id": next(self._ids),
+            # Haqiqiy ATMOS kabi maskalangan PAN (BIN + oxirgi 4 raqam)
+            "pan": f"{card_number[:6]}******{card_number[-4:]}",
+            "expiry": bind.get("expiry", "2812"),
+            "card_holder": "TEST CARDHOLDER",
+            "phone": "998901234567",
+            "card_token": secrets.token_hex(16),
+        })
+
+    async def remove_card(self, request):
+        body = await self._json(request)
+        return ok(data={"card_id": body.get("id")})
+
+    async def update_config(self, request):
+        body = await self._json(request)
+        self.config.update({k: v for k, v in body.items() if k in DEFAULT_CONFIG})
+        return web.json_response(self.config)
+
+    async def get_stats(self, request):
+        return web.json_response({**self.stats, "transactions": len(self.transactions)})
+
+
+async def start(host="127.0.0.1", port=8090, **config):
+    """Joriy event loop'da serverni ishga tushirish. Qaytaradi: (FakeAtmos, AppRunner)"""
+    fake = FakeAtmos(**config)
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return fake, runner
@@ -0,0 +1,121 @@
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+from users import utils
+
+# Har bir instance'da: {attname: ciphertext} — joriy plaintext'ga mos shifrlangan qiymat
+_TOKENS = "_encrypted_tokens"
+
+
+class Sealed(str):
+    """Bazadagi shifrlangan qiymat (hali decrypt qilinmagan ciphertext)"""
+
+
+def _tokens(instance):
+    return instance.__dict__.setdefault(_TOKENS, {})
+
+
+class EncryptedAttribute(DeferredAttribute):
+    """
+    Atributda plaintext, bazada Fernet ciphertext:
+    - bazadan o'qilgan qiymat birinchi murojaatda bir marta decrypt qilinadi va keshlanadi;
+    - qiymat o'zgarmasa saqlashda qayta shifrlanmaydi (eski ciphertext yoziladi).
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        attname = self.field.attname
+        if attname not in instance.__dict__:
+            # Deferred: refresh_from_db o'rniga xom ciphertext'ni o'qiymiz, aks holda qiymat
+            # "o'zgargan" deb belgilanib keyingi save'da qayta shifrlanadi
+            instance.__dict__[attname] = (
+                type(instance)._base_manager.db_manager(instance._state.db)
+                .filter(pk=instance.pk)
+                .values_list(attname, flat=True)
+                .get()
+            )
+        value = instance.__dict__[attname]
+        if isinstance(value, Sealed):
+            # Backfill qilinmagan qatorda eski kodning qo'shimcha qavatlari bo'lishi mumkin
+            plain = utils.unwrap_value(value)[0] if value else value
+            instance.__dict__[attname] = plain
+            _tokens(instance)[attname] = str(value)
+            return plain
+        return value
+
+    def __set__(self, instance, value):
+        attname = self.field.attname
+        tokens = _tokens(instance)
+        if isinstance(value, Sealed):
+            tokens.pop(attname, None)
+        elif attname in tokens and instance.__dict__.get(attname) == value:
+            # O'sha qiymat qayta berildi — ciphertext o'zgarmaydi
+            return
+        else:
+            tokens.pop(attname, None)
+        instance.__dict__[attname] = value
+
+
+def changed_value(instance, attname):
+    """Saqlashda shifrlanadigan yangi plaintext; o'qilmagan, o'zgarmagan yoki deferred bo'lsa None"""
+    value = instance.__dict__.get(attname)
+    if value is None or value == "" or isinstance(value, Sealed) or attname in _tokens(instance):
+        return None
+    return value
+
+
+class EncryptedTextField(models.TextField):
+    """users.utils Fernet kaliti bilan shifrlanadigan TextField (UserCard karta ma'lumotlari)"""
+
+    descriptor_class = EncryptedAttribute
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Sealed(value)
+
+    def pre_save(self, model_instance, add):
+        value = model_instance.__dict__.get(self.attname)
+        if value is None or value == "" or isinstance(value, Sealed):
+            return value
+        tokens = _tokens(model_instance)
+        if self.attname not in tokens:
+            tokens[self.attname] = utils.encrypt_value(value)
+        return Sealed(tokens[self.attname])
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None or value == "" or isinstance(value, Sealed):
+            return value
+        # bulk_update / update() ga berilgan plaintext
+        return utils.encrypt_value(value)
+
+
+class BlindIndexField(models.CharField):
+    """
+    ``source`` ustunining HMAC blind index'i (users.utils.blind_index). Saqlashda ``source``
+    atributida plaintext bo'lsa qayta hisoblanadi; ciphertext holida (o'qilmagan) yoki deferred
+    bo'lsa eski qiymat qoladi. Qidirish: ``filter(<field>=blind_index(source, value))``.
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault("max_length", 64)
+        kwargs.setdefault("null", True)
+        kwargs.setdefault("blank", True)
+        kwargs.setdefault("editable", False)
+        kwargs.setdefault("db_index", True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["source"] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        if self.source in model_instance.__dict__:
+            value = model_instance.__dict__[self.source]
+            if not isinstance(value, Sealed):
+                setattr(model_instance, self.attname, utils.blind_index(self.source, value))
+        return super().pre_save(model_instance, add)
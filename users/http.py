@@ -0,0 +1,315 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import codec, metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Sozlanmagan provider uchun qiymatlar (settings.OUTBOUND_PROVIDERS bilan ustidan yoziladi)
+DEFAULT_PROVIDER = {
+    "pool_size": 10,
+    "timeout": (3, 10),  # (connect, read) sekund
+    "retries": 1,
+    "backoff_factor": 0.3,
+    "max_concurrent": 10,  # bulkhead: bir vaqtdagi so'rovlar, ortig'i darhol rad etiladi
+    "failure_threshold": 5,  # ketma-ket xatolar, shundan keyin circuit ochiladi
+    "reset_timeout": 30,  # ochiq circuit shuncha sekunddan keyin bitta sinov so'roviga ruxsat beradi
+}
+
+
+class ProviderUnavailable(requests.ConnectionError):
+    """
+    Circuit ochiq yoki bulkhead to'la: so'rov tarmoqqa umuman chiqmadi.
+    ``requests.RequestException`` bo'lgani uchun mavjud ``except`` bloklari uni ham ushlaydi.
+    """
+
+
+class AsyncResponse:
+    """aiohttp javobining ``requests.Response`` ga o'xshash qisqa ko'rinishi"""
+
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return codec.loads(self.content)
+
+
+class CircuitBreaker:
+    """
+    closed -> (failure_threshold ta ketma-ket xato) -> open -> (reset_timeout) -> half_open
+    half_open holatida bitta sinov so'rovi: muvaffaqiyatli bo'lsa closed, aks holda yana open.
+    """
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+    STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def cancel_trial(self):
+        """Ruxsat berilgan sinov so'rovi yuborilmadi (masalan, bulkhead to'la)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit opened after %s failures", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class PooledHTTPClient:
+    """
+    Bitta tashqi provider uchun umumiy keep-alive ulanishlar pool'i.
+
+    - ``request`` — jarayon bo'yicha bitta ``requests.Session`` (thread-safe pool, ``pool_size`` ta ulanish)
+    - ``arequest`` — event loop bo'yicha bitta ``aiohttp.ClientSession`` (``limit_per_host=pool_size``),
+      javob kutilayotganda sync worker thread band bo'lmaydi
+
+    Ikkala yo'l ham umumiy circuit breaker va bulkhead (``max_concurrent``) orqali o'tadi:
+    provider sekinlashsa yoki ishlamasa, so'rovlar timeout kutmasdan ``ProviderUnavailable`` oladi
+    va boshqa endpointlar uchun threadlar bo'sh qoladi.
+    """
+
+    def __init__(self, name, pool_size=10, timeout=(3, 10), retries=1, backoff_factor=0.3,
+                 retry_methods=("GET", "POST"), max_concurrent=None, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.retry_methods = frozenset(retry_methods)
+        self.max_concurrent = max_concurrent or pool_size
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._session = None
+        self._lock = threading.Lock()
+        self._async_sessions = weakref.WeakKeyDictionary()
+
+    # Bulkhead va circuit breaker
+
+    @contextmanager
+    def _guard(self):
+        if not self.breaker.allow():
+            metrics.incr(f"outbound_{self.name}_short_circuited")
+            raise ProviderUnavailable(f"{self.name}: circuit open")
+
+        with self._in_flight_lock:
+            if self.in_flight >= self.max_concurrent:
+                rejected = True
+            else:
+                rejected = False
+                self.in_flight += 1
+        if rejected:
+            metrics.incr(f"outbound_{self.name}_rejected")
+            self.breaker.cancel_trial()
+            raise ProviderUnavailable(f"{self.name}: too many concurrent requests")
+
+        metrics.incr(f"outbound_{self.name}_requests")
+        try:
+            yield
+        finally:
+            with self._in_flight_lock:
+                self.in_flight -= 1
+
+    def _record(self, status_code=None, error=None):
+        if error is not None or (status_code is not None and status_code >= 500):
+            metrics.incr(f"outbound_{self.name}_failures")
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def state(self):
+        return {
+            f"outbound_{self.name}_circuit": CircuitBreaker.STATE_CODES[self.breaker.state],
+            f"outbound_{self.name}_in_flight": self.in_flight,
+            f"outbound_{self.name}_consecutive_failures": self.breaker.failures,
+        }
+
+    # Sync
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=self.retry_methods,
+            raise_on_status=False,
+        )
+        # pool_block=True: pool to'lsa yangi ulanish ochilmaydi, bo'shagani kutiladi
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        with self._guard():
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as exc:
+                self._record(error=exc)
+                raise
+            self._record(response.status_code)
+            return response
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    # Async
+
+    def _client_timeout(self):
+        if isinstance(self.timeout, (tuple, list)):
+            connect, read = self.timeout
+            return aiohttp.ClientTimeout(total=connect + read, sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=self.timeout)
+
+    def _async_session(self):
+        loop = asyncio.get_running_loop()
+        session = self._async_sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=30,
+                ttl_dns_cache=300,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self._client_timeout(),
+                json_serialize=codec.dumps,
+            )
+            self._async_sessions[loop] = session
+        return session
+
+    async def arequest(self, method, url, **kwargs):
+        """
+        ``request`` ning async varianti. Xatolarda ``requests.RequestException`` ko'taradi,
+        shuning uchun chaqiruvchi kod ikkala variantda bir xil xatolarni ushlaydi.
+        """
+        kwargs.pop("timeout", None)
+        with self._guard():
+            try:
+                response = await self._arequest(method, url, **kwargs)
+            except requests.RequestException as exc:
+                self._record(error=exc)
+                raise
+            self._record(response.status_code)
+            return response
+
+    async def _arequest(self, method, url, **kwargs):
+        session = self._async_session()
+        attempts = self.retries + 1 if method.upper() in self.retry_methods else 1
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    content = await response.read()
+                    result = AsyncResponse(response.status, content, dict(response.headers))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                if last:
+                    raise requests.ConnectionError(f"{self.name}: {exc!r}") from exc
+                logger.info("%s %s %s failed (%r), retrying", self.name, method, url, exc)
+            else:
+                if result.status_code not in RETRY_STATUSES or last:
+                    return result
+                logger.info("%s %s %s -> %s, retrying", self.name, method, url, result.status_code)
+
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def apost(self, url, **kwargs):
+        return await self.arequest("POST", url, **kwargs)
+
+    async def aget(self, url, **kwargs):
+        return await self.arequest("GET", url, **kwargs)
+
+    async def aclose(self):
+        """Joriy event loop'dagi async sessiyani yopish (management commandlar oxirida)"""
+        session = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    """``settings.OUTBOUND_PROVIDERS[name]`` bo'yicha jarayon uchun yagona client"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                config = {**DEFAULT_PROVIDER, **getattr(settings, "OUTBOUND_PROVIDERS", {}).get(name, {})}
+                client = _clients[name] = PooledHTTPClient(name, **config)
+    return client
+
+
+@metrics.register_collector
+def _collect():
+    state = {}
+    for client in list(_clients.values()):
+        state.update(client.state())
+    return state
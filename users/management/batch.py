@@ -0,0 +1,76 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+
+class BatchCommand(BaseCommand):
+    """
+    Katta jadvalni ishlab turgan bazada partiyalab qayta yozuvchi buyruqlar (rotate_crypto_keys,
+    backfill_encrypted_fields) uchun umumiy sikl: PK lar server-side cursor bilan o'qiladi, har bir
+    partiya ``process_chunk(model, pks)`` da alohida qisqa tranzaksiyada ishlanadi va throttle qilinadi.
+    ``checkpoint`` kaliti berilsa oxirgi PK keshda saqlanadi — to'xtatilgan buyruq shu joydan davom etadi.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--max-rate", type=float, default=2000,
+                            help="Sekundiga ko'pi bilan shuncha qator (0 — cheklanmagan)")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Har bir partiyadan keyingi pauza (sekund)")
+        parser.add_argument("--restart", action="store_true", help="Checkpoint'ni o'chirib boshidan boshlash")
+
+    def pks_after_checkpoint(self, model, checkpoint, options):
+        if options["restart"]:
+            cache.delete(checkpoint)
+        last_pk = cache.get(checkpoint) or 0
+        return model.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)
+
+    def run_batches(self, model, pks, process_chunk, options, checkpoint=None, action="updated"):
+        """``process_chunk`` o'zgartirilgan qatorlar sonini qaytaradi. Qaytaradi: (ko'rilgan, o'zgartirilgan)"""
+        label = model._meta.label
+        total = pks.count()
+        self.stdout.write(f"{label}: {total} rows to scan")
+
+        chunk_size = options["chunk_size"]
+        started = time.monotonic()
+        scanned = changed = 0
+        chunk = []
+
+        def flush():
+            nonlocal scanned, changed
+            changed += process_chunk(model, chunk)
+            scanned += len(chunk)
+            last_pk = chunk[-1]
+            if checkpoint:
+                cache.set(checkpoint, last_pk, None)
+            chunk.clear()
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{label}: {scanned}/{total} scanned, {changed} {action}, "
+                f"{scanned / elapsed if elapsed else 0:.0f} rows/s, pk={last_pk}"
+            )
+            self.throttle(scanned, elapsed, options)
+
+        for pk in pks.iterator(chunk_size=chunk_size):
+            chunk.append(pk)
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+
+        if checkpoint:
+            cache.delete(checkpoint)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: done — {scanned} scanned, {changed} {action} in {elapsed:.1f}s "
+            f"({scanned / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+        return scanned, changed
+
+    def throttle(self, scanned, elapsed, options):
+        pause = options["sleep"]
+        if options["max_rate"] > 0:
+            pause = max(pause, scanned / options["max_rate"] - elapsed)
+        if pause > 0:
+            time.sleep(pause)
@@ -0,0 +1,124 @@
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Value
+
+from users.cards import display_fields
+from users.fields import Sealed
+from users.management.batch import BatchCommand
+from users.models import Payment, UserCard
+from users.utils import blind_index, encrypt_value, unwrap_value
+
+CHECKPOINT_KEY = "backfill_encrypted_fields:{}"
+
+CARD_FIELDS = ("pan", "expiry", "card_holder", "phone", "card_token")
+CARD_BLIND_INDEXES = {"card_token_bidx": "card_token", "pan_fingerprint": "pan"}
+CARD_DISPLAY_FIELDS = (
+    "masked_pan", "last4", "brand", "expiry_year", "expiry_month", "masked_holder", "masked_phone",
+)
+PAYMENT_FIELDS = ("account", "store_id", "terminal_id")
+PAYMENT_BLIND_INDEXES = {"account_bidx": "account"}
+
+# Shu migratsiyadan keyin ikkala modelning live holati sxemaga mos (Payment'da legacy_* ustunlari ham bor)
+REQUIRED_MIGRATION = ("users", "0015_payment_encrypted_fields")
+
+
+def sealed(value, field):
+    # Sealed — ciphertext o'zgarishsiz yoziladi, get_prep_value qayta shifrlamaydi
+    return Value(Sealed(value) if value else value, output_field=field)
+
+
+class Command(BatchCommand):
+    help = (
+        "0012–0015 migratsiyalaridan keyingi ma'lumot backfill'i (migratsiyalar faqat sxemani o'zgartiradi): "
+        "UserCard — ikki marta shifrlangan qiymatlar bitta qavatga, blind index va display ustunlari; "
+        "Payment — eski django_cryptography ustunlaridan yangi ustunlarga nusxa, bitta qavat va blind index. "
+        "Eski kod ishlab turganda ham xavfsiz; 0016 dan oldin ishga tushirilsa 0016 faqat qolgan qatorlarni ko'chiradi."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--model", action="append", choices=["usercard", "payment"],
+                            help="Faqat shu model; bir necha marta")
+
+    def handle(self, *args, **options):
+        if REQUIRED_MIGRATION not in MigrationLoader(connection).applied_migrations:
+            raise CommandError(f"Avval `migrate users {REQUIRED_MIGRATION[1]}` bajarilishi kerak")
+
+        only = set(options["model"] or [])
+        if not only or "usercard" in only:
+            self.backfill(UserCard, self.card_chunk, options)
+        if not only or "payment" in only:
+            self.backfill(Payment, self.payment_chunk, options)
+
+    def backfill(self, model, process_chunk, options):
+        checkpoint = CHECKPOINT_KEY.format(model._meta.label_lower)
+        pks = self.pks_after_checkpoint(model, checkpoint, options)
+        self.run_batches(model, pks, process_chunk, options, checkpoint=checkpoint)
+
+    def card_chunk(self, model, pks):
+        names = [*CARD_FIELDS, *CARD_BLIND_INDEXES, *CARD_DISPLAY_FIELDS]
+        with transaction.atomic():
+            rows = list(model.objects.select_for_update().filter(pk__in=pks).values("pk", "status", *names))
+            updates = []
+            for row in rows:
+                values, plain = self.normalize(row, CARD_FIELDS, CARD_BLIND_INDEXES)
+                # Ro'yxat va javoblar decrypt qilmasligi uchun tasdiqlangan kartalarning display ustunlari
+                if row["status"] == "verified" and not row["masked_pan"]:
+                    values.update(display_fields(plain))
+                updates.append(values)
+            return self.write(model, rows, updates, names, CARD_FIELDS)
+
+    def payment_chunk(self, model, pks):
+        names = [*PAYMENT_FIELDS, *PAYMENT_BLIND_INDEXES]
+        legacy = model.LEGACY_FIELDS
+        with transaction.atomic():
+            rows = list(
+                model.objects.select_for_update().filter(pk__in=pks).values("pk", *names, *legacy.values())
+            )
+            updates = []
+            for row in rows:
+                if row["account"] is None:
+                    # Hali ko'chirilmagan: eski ustun o'z qavatini o'qishda ochgan, encrypt_value qavatlari qoldi
+                    plain = {name: unwrap_value(row[legacy[name]])[0] for name in PAYMENT_FIELDS}
+                    values = {name: encrypt_value(plain[name]) for name in PAYMENT_FIELDS}
+                    values.update({column: blind_index(source, plain[source])
+                                   for column, source in PAYMENT_BLIND_INDEXES.items()})
+                else:
+                    values = self.normalize(row, PAYMENT_FIELDS, PAYMENT_BLIND_INDEXES)[0]
+                updates.append(values)
+            return self.write(model, rows, updates, names, PAYMENT_FIELDS)
+
+    def normalize(self, row, fields, blind_indexes):
+        """
+        Bitta qatorning shifrlangan ustunlari: field'ning o'z qavatidan ortiq (yoki umuman shifrlanmagan)
+        qiymat bitta qavat bilan qayta yoziladi, blind index plaintext'dan hisoblanadi.
+        Qaytaradi: ({ustun: yangi qiymat}, {field: plaintext})
+        """
+        values, plain = {}, {}
+        for name in fields:
+            plain[name], layers = unwrap_value(row[name])
+            if plain[name] and layers != 1:
+                values[name] = encrypt_value(plain[name])
+        for column, source in blind_indexes.items():
+            index = blind_index(source, plain[source])
+            if index != row[column]:
+                values[column] = index
+        return values, plain
+
+    def write(self, model, rows, updates, names, encrypted):
+        """O'zgargan qatorlarni bitta bulk_update bilan yozish; qolgan ustunlar eski qiymati bilan"""
+        changed = []
+        for row, values in zip(rows, updates):
+            if not values:
+                continue
+            obj = model(pk=row["pk"])
+            for name in names:
+                value = values[name] if name in values else row[name]
+                if name in encrypted:
+                    value = sealed(value, model._meta.get_field(name))
+                setattr(obj, name, value)
+            changed.append(obj)
+        if changed:
+            model.objects.bulk_update(changed, names)
+        return len(changed)
@@ -0,0 +1,185 @@
+import asyncio
+import statistics
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+
+from config import settings as config_settings
+from users import fake_atmos
+from users.service import atmos_http, atmos_tokens
+from users.tokens import RoleRefreshToken
+
+User = get_user_model()
+
+STORE_ID = 7001
+AMOUNT = 10000
+
+STEPS = ("bind_init", "bind_confirm", "pay_create", "pay_pre_apply", "pay_confirm", "pay_info")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Karta ulash va to'lov oqimini soxta ATMOS bilan to'liq ishlatish: har bir qadam va "
+        "end-to-end latency, thread-pool bandligi. Vaqtinchalik foydalanuvchilar oxirida o'chiriladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checkouts", type=int, default=50, help="Checkoutlar (foydalanuvchilar) soni")
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--port", type=int, default=8091, help="Soxta ATMOS porti")
+        parser.add_argument("--latency-ms", type=float, default=200)
+        parser.add_argument("--jitter-ms", type=float, default=50)
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--decline-rate", type=float, default=0.0)
+        parser.add_argument("--keep-users", action="store_true", help="Benchmark foydalanuvchilarini o'chirmaslik")
+
+    def handle(self, *args, **options):
+        base_url = f"http://127.0.0.1:{options['port']}"
+        previous = config_settings.ATMOS_BASE_URL
+        # users.service config.settings modulini o'qiydi, django.conf.settings — boshqa joylar
+        config_settings.ATMOS_BASE_URL = django_settings.ATMOS_BASE_URL = base_url
+        atmos_tokens.invalidate()
+        try:
+            asyncio.run(self.run(options))
+        finally:
+            config_settings.ATMOS_BASE_URL = django_settings.ATMOS_BASE_URL = previous
+            atmos_tokens.invalidate()
+
+    def create_users(self, count):
+        prefix = uuid.uuid4().hex[:6]
+        users = [
+            User.objects.create_user(phone=f"bench-{prefix}-{i}", full_name=f"Bench {i}", role="client")
+            for i in range(count)
+        ]
+        return [(user, str(RoleRefreshToken.for_user(user).access_token)) for user in users]
+
+    def delete_users(self, users):
+        User.objects.filter(id__in=[user.id for user, _ in users]).delete()
+
+    async def run(self, options):
+        fake, runner = await fake_atmos.start(
+            port=options["port"],
+            latency_ms=options["latency_ms"],
+            jitter_ms=options["jitter_ms"],
+            error_rate=options["error_rate"],
+            decline_rate=options["decline_rate"],
+        )
+        users = await sync_to_async(self.create_users)(options["checkouts"])
+
+        threads = []
+        sampling = True
+
+        async def sample_threads():
+            while sampling:
+                threads.append(threading.active_count())
+                await asyncio.sleep(0.005)
+
+        baseline_threads = threading.active_count()
+        sampler = asyncio.ensure_future(sample_threads())
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def limited(index, user, token):
+            async with semaphore:
+                return await self.checkout(index, token)
+
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(limited(i, user, token) for i, (user, token) in enumerate(users)))
+        finally:
+            elapsed = time.perf_counter() - started
+            sampling = False
+            await sampler
+            if not options["keep_users"]:
+                await sync_to_async(self.delete_users)(users)
+            await atmos_http.aclose()
+            await runner.cleanup()
+
+        self.report(results, elapsed, threads, baseline_threads, fake.stats, options)
+
+    async def checkout(self, index, token):
+        client = AsyncClient()
+        headers = {"authorization": f"Bearer {token}", "host": "localhost"}
+        card_number = f"8600{index:012d}"
+        timings = {}
+        total_started = time.perf_counter()
+
+        async def call(step, method, path, body=None):
+            step_started = time.perf_counter()
+            if method == "get":
+                response = await client.get(path, headers=headers)
+            else:
+                response = await client.post(path, body, content_type="application/json", headers=headers)
+            timings[step] = time.perf_counter() - step_started
+            if response.status_code not in (200, 201):
+                raise RuntimeError(f"{step}: HTTP {response.status_code} {response.content[:200]!r}")
+            return response.json()
+
+        try:
+            data = await call("bind_init", "post", "/users/bind-card/init/",
+                              {"card_number": card_number, "expiry": "2812"})
+            await call("bind_confirm", "post", "/users/card/bind/confirm/",
+                       {"transaction_id": data["transaction_id"], "otp": "123456"})
+
+            data = await call("pay_create", "post", "/users/payment/create/",
+                              {"amount": AMOUNT, "account": f"99890{index:07d}", "store_id": str(STORE_ID)})
+            transaction_id = data["transaction_id"]
+
+            await call("pay_pre_apply", "post", "/users/payment/pre-confirm/", {
+                "card_number": card_number, "expiry": "2812", "store_id": STORE_ID,
+                "amount": AMOUNT, "transaction_id": transaction_id,
+            })
+            await call("pay_confirm", "post", "/users/payment/confirm/",
+                       {"transaction_id": transaction_id, "store_id": STORE_ID, "otp": "111111"})
+            await call("pay_info", "get", f"/users/payment/{transaction_id}/info/")
+        except Exception as exc:
+            return {"ok": False, "error": str(exc), "timings": timings}
+
+        return {"ok": True, "total": time.perf_counter() - total_started, "timings": timings}
+
+    def report(self, results, elapsed, threads, baseline_threads, fake_stats, options):
+        succeeded = [result for result in results if result["ok"]]
+        failed = [result for result in results if not result["ok"]]
+
+        self.stdout.write(
+            f"checkouts={len(results)} concurrency={options['concurrency']} "
+            f"atmos_latency={options['latency_ms']}±{options['jitter_ms']}ms "
+            f"error_rate={options['error_rate']} decline_rate={options['decline_rate']}"
+        )
+        self.stdout.write(f"ok={len(succeeded)} failed={len(failed)} in {elapsed:.2f}s "
+                          f"({len(succeeded) / elapsed:.1f} checkouts/s)")
+
+        self.stdout.write(f"{'step':<16}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        for step in STEPS:
+            values = [result["timings"][step] * 1000 for result in results if step in result["timings"]]
+            if values:
+                self.stdout.write(f"{step:<16}{statistics.median(values):>10.1f}"
+                                  f"{percentile(values, 95):>10.1f}{max(values):>10.1f}")
+
+        totals = [result["total"] * 1000 for result in succeeded]
+        if totals:
+            self.stdout.write(f"{'end_to_end':<16}{statistics.median(totals):>10.1f}"
+                              f"{percentile(totals, 95):>10.1f}{max(totals):>10.1f}")
+
+        if threads:
+            busy = [count - baseline_threads for count in threads]
+            self.stdout.write(
+                f"threads: baseline={baseline_threads} peak_extra={max(busy)} "
+                f"mean_extra={statistics.mean(busy):.1f}"
+            )
+        self.stdout.write(f"fake atmos: {fake_stats}")
+
+        for result in failed[:5]:
+            self.stdout.write(self.style.WARNING(result["error"]))
@@ -0,0 +1,30 @@
+from aiohttp import web
+from django.core.management.base import BaseCommand
+
+from users.fake_atmos import FakeAtmos
+
+
+class Command(BaseCommand):
+    help = "Lokal soxta ATMOS serveri (kechikish va xatolarni sozlash bilan)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8090)
+        parser.add_argument("--latency-ms", type=float, default=0)
+        parser.add_argument("--jitter-ms", type=float, default=0)
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--decline-rate", type=float, default=0.0)
+        parser.add_argument("--hang-rate", type=float, default=0.0)
+        parser.add_argument("--hang-ms", type=float, default=30000)
+
+    def handle(self, *args, **options):
+        fake = FakeAtmos(
+            latency_ms=options["latency_ms"],
+            jitter_ms=options["jitter_ms"],
+            error_rate=options["error_rate"],
+            decline_rate=options["decline_rate"],
+            hang_rate=options["hang_rate"],
+            hang_ms=options["hang_ms"],
+        )
+        self.stdout.write(f"Fake ATMOS: http://{options['host']}:{options['port']}  config={fake.config}")
+        web.run_app(fake.app(), host=options["host"], port=options["port"], print=None)
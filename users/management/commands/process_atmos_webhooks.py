@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.webhooks import process_pending
+
+
+class Command(BaseCommand):
+    help = "ATMOS callback inbox'idagi eventlarni Payment statuslariga qo'llash (idempotent, SKIP LOCKED)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument("--interval", type=float, default=1.0, help="Navbat bo'sh bo'lganda kutish (sekund)")
+
+    def handle(self, *args, **options):
+        while True:
+            seen, confirmed = process_pending(batch_size=options["batch_size"])
+            if seen:
+                self.stdout.write(f"events={seen} confirmed={confirmed}")
+                # Navbatda yana event bo'lishi mumkin — kutmasdan davom etamiz
+                if seen == options["batch_size"]:
+                    continue
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
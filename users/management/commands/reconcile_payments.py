@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+
+from users.payments import check_many, pending_payments, record_statuses
+from users.service import atmos_http
+
+
+class Command(BaseCommand):
+    help = "Yakunlanmagan to'lovlarni ATMOS bilan partiyalab solishtirish va statuslarni yangilash"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=10, help="ATMOS ga bir vaqtdagi so'rovlar")
+        parser.add_argument("--min-age", type=int, default=60,
+                            help="Shundan yangi to'lovlarga tegilmaydi (sekund), foydalanuvchi hali checkoutda")
+        parser.add_argument("--recheck-after", type=int, default=300,
+                            help="Bir to'lov qayta tekshirilishidan oldingi minimal vaqt (sekund)")
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument("--interval", type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            checked, changed = asyncio.run(self.reconcile(options))
+            if checked:
+                self.stdout.write(
+                    f"checked={checked} changed={changed} in {time.monotonic() - started:.1f}s"
+                )
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    async def reconcile(self, options):
+        chunk_size = options["chunk_size"]
+        checked = changed = 0
+        try:
+            while True:
+                queryset = pending_payments(options["min_age"], options["recheck_after"])
+                payments = await sync_to_async(list)(queryset[:chunk_size])
+                if not payments:
+                    break
+
+                results = await check_many(payments, options["concurrency"])
+                changed += await sync_to_async(record_statuses)(results)
+                checked += len(payments)
+
+                if len(payments) < chunk_size:
+                    break
+        finally:
+            await atmos_http.aclose()
+        return checked, changed
@@ -0,0 +1,75 @@
+import functools
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Value
+
+from users.fields import EncryptedTextField, Sealed
+from users.management.batch import BatchCommand
+from users.utils import rotate_value
+
+CHECKPOINT_KEY = "rotate_crypto_keys:{}"
+
+
+def encrypted_models():
+    """users ilovasidagi EncryptedTextField ustunli modellar: [(model, [field, ...])]"""
+    result = []
+    for model in apps.get_app_config("users").get_models():
+        fields = [field for field in model._meta.concrete_fields if isinstance(field, EncryptedTextField)]
+        if fields:
+            result.append((model, fields))
+    return result
+
+
+class Command(BatchCommand):
+    help = (
+        "Shifrlangan ustunlarni CRYPTO_KEYS[0] (primary) kalitga o'tkazish. Partiyalab, server-side cursor "
+        "va bulk_update bilan; ishlab turgan bazada throttle qilinadi. To'xtatilsa checkpoint'dan davom etadi."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--model", action="append", help="Faqat shu model (masalan: UserCard); bir necha marta")
+
+    def handle(self, *args, **options):
+        only = {name.lower() for name in options["model"] or []}
+        for model, fields in encrypted_models():
+            if only and model.__name__.lower() not in only:
+                continue
+            self.stdout.write(f"{model._meta.label}: fields={[field.attname for field in fields]}")
+            checkpoint = CHECKPOINT_KEY.format(model._meta.label_lower)
+            self.run_batches(
+                model,
+                self.pks_after_checkpoint(model, checkpoint, options),
+                functools.partial(self.rotate_chunk, fields=fields),
+                options,
+                checkpoint=checkpoint,
+                action="rotated",
+            )
+
+    def rotate_chunk(self, model, pks, fields):
+        """Partiyani lock qilib o'qish, eski kalitdagi qiymatlarni primary'ga o'tkazish, bitta bulk_update"""
+        names = [field.attname for field in fields]
+        with transaction.atomic():
+            rows = (
+                model.objects
+                .select_for_update()
+                .filter(pk__in=pks)
+                .values_list("pk", *names)
+            )
+
+            changed = []
+            for pk, *values in rows:
+                rotated = [rotate_value(value) for value in values]
+                if not any(rotated):
+                    continue
+                obj = model(pk=pk)
+                for field, value, new_value in zip(fields, values, rotated):
+                    # Sealed — ciphertext o'zgarishsiz yoziladi, qayta shifrlanmaydi
+                    token = new_value or value
+                    setattr(obj, field.attname, Value(Sealed(token) if token else token, output_field=field))
+                changed.append(obj)
+
+            if changed:
+                model.objects.bulk_update(changed, names)
+        return len(changed)
@@ -0,0 +1,32 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from users.myid_sessions import poll_due
+
+
+class Command(BaseCommand):
+    help = (
+        "Faol MyID sessiyalarini backoff bilan so'rash: status Redis'ga yoziladi, "
+        "o'zgarishi foydalanuvchiga WebSocket orqali yuboriladi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument("--interval", type=float, default=0.5, help="Navbat bo'sh bo'lganda kutish (sekund)")
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        while True:
+            polled, changed = await poll_due(limit=options["batch_size"])
+            if polled:
+                self.stdout.write(f"polled={polled} changed={changed}")
+                if polled == options["batch_size"]:
+                    continue
+
+            if not options["loop"]:
+                break
+            await asyncio.sleep(options["interval"])
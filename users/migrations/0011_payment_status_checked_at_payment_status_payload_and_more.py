@@ -0,0 +1,27 @@
+# Generated by Django 4.2.10 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_alter_usercard_transaction_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='status_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='status_payload',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'status_checked_at'], name='payment_status_checked_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+# Ustunlar bo'sh qo'shiladi; mavjud kartalar uchun: manage.py backfill_encrypted_fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_payment_status_checked_at_payment_status_payload_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercard',
+            name='masked_pan',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='usercard',
+            name='last4',
+            field=models.CharField(blank=True, default='', max_length=4),
+        ),
+        migrations.AddField(
+            model_name='usercard',
+            name='brand',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='usercard',
+            name='expiry_month',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='usercard',
+            name='expiry_year',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='usercard',
+            name='masked_holder',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='usercard',
+            name='masked_phone',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='usercard',
+            index=models.Index(fields=['user', 'status'], name='usercard_user_status_idx'),
+        ),
+    ]
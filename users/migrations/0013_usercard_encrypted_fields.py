@@ -0,0 +1,42 @@
+# Generated by Django 4.2.10 on 2026-10-19 13:20
+
+from django.db import migrations
+
+import users.fields
+
+# Ikki marta shifrlangan qiymatlar bu yerda emas, manage.py backfill_encrypted_fields bilan tuzatiladi
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_usercard_display_columns'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usercard',
+            name='pan',
+            field=users.fields.EncryptedTextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='usercard',
+            name='expiry',
+            field=users.fields.EncryptedTextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='usercard',
+            name='card_holder',
+            field=users.fields.EncryptedTextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='usercard',
+            name='phone',
+            field=users.fields.EncryptedTextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='usercard',
+            name='card_token',
+            field=users.fields.EncryptedTextField(blank=True, null=True),
+        ),
+    ]
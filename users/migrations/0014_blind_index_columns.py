@@ -0,0 +1,32 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:40
+
+from django.db import migrations
+
+import users.fields
+
+# Mavjud qatorlarning indekslari: manage.py backfill_encrypted_fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_usercard_encrypted_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercard',
+            name='card_token_bidx',
+            field=users.fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='card_token'),
+        ),
+        migrations.AddField(
+            model_name='usercard',
+            name='pan_fingerprint',
+            field=users.fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='pan'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='account_bidx',
+            field=users.fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='account'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.10 on 2026-10-19 15:30
+
+from django.db import migrations, models
+import django_cryptography.fields
+
+import users.fields
+
+# Faqat sxema: eski django_cryptography ustunlari nomi o'zgarmaydi (model'da legacy_*), yangi Fernet
+# ustunlari nullable qo'shiladi — ishlab turgan eski kod uchun xavfsiz. Eski qatorlardan nusxa:
+# `manage.py backfill_encrypted_fields --model payment`, qolgani 0016 da.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_blind_index_columns'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='account',
+            field=django_cryptography.fields.encrypt(models.CharField(db_column='account', max_length=255)),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='store_id',
+            field=django_cryptography.fields.encrypt(models.CharField(db_column='store_id', max_length=255)),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='terminal_id',
+            field=django_cryptography.fields.encrypt(models.CharField(blank=True, db_column='terminal_id', max_length=255, null=True)),
+        ),
+        migrations.RenameField(
+            model_name='payment',
+            old_name='account',
+            new_name='legacy_account',
+        ),
+        migrations.RenameField(
+            model_name='payment',
+            old_name='store_id',
+            new_name='legacy_store_id',
+        ),
+        migrations.RenameField(
+            model_name='payment',
+            old_name='terminal_id',
+            new_name='legacy_terminal_id',
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='account',
+            field=users.fields.EncryptedTextField(db_column='account_new', null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='store_id',
+            field=users.fields.EncryptedTextField(db_column='store_id_new', null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='terminal_id',
+            field=users.fields.EncryptedTextField(blank=True, db_column='terminal_id_new', null=True),
+        ),
+    ]
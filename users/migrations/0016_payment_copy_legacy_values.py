@@ -0,0 +1,60 @@
+# Generated by Django 4.2.10 on 2026-10-19 15:31
+
+import hashlib
+import hmac
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from django.conf import settings
+from django.db import migrations
+
+FIELDS = {'account': 'legacy_account', 'store_id': 'legacy_store_id', 'terminal_id': 'legacy_terminal_id'}
+CHUNK_SIZE = 500
+
+
+# users.utils dan nusxa (migratsiya keyingi o'zgarishlarga bog'lanmasin)
+def unwrap(value, fernet):
+    for _ in range(5):
+        if not isinstance(value, str) or not value.startswith('gAAAAA'):
+            break
+        try:
+            value = fernet.decrypt(value.encode()).decode()
+        except InvalidToken:
+            break
+    return value
+
+
+def blind_index(purpose, value):
+    value = ''.join(str(value).split()) if value is not None else ''
+    if not value:
+        return None
+    message = f'{purpose}:{value}'.encode()
+    return hmac.new(settings.BLIND_INDEX_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def copy_missing(apps, schema_editor):
+    """
+    Yangi ustuni bo'sh qatorlar: backfill_encrypted_fields'dan keyin rollout paytida eski kod yozganlari.
+    Backfill oldin ishga tushirilgan bo'lsa bular bir nechta qator; aks holda butun jadval shu yerda ko'chadi.
+    """
+    Payment = apps.get_model('users', 'Payment')
+    fernet = MultiFernet([Fernet(key) for key in settings.CRYPTO_KEYS])
+    pks = list(Payment.objects.filter(account__isnull=True).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(pks), CHUNK_SIZE):
+        rows = list(Payment.objects.filter(pk__in=pks[start:start + CHUNK_SIZE]).only('pk', *FIELDS.values()))
+        for row in rows:
+            for name, legacy in FIELDS.items():
+                # Yangi ustunga plaintext: EncryptedTextField bulk_update'da shifrlaydi
+                setattr(row, name, unwrap(getattr(row, legacy), fernet))
+            row.account_bidx = blind_index('account', row.account)
+        Payment.objects.bulk_update(rows, [*FIELDS, 'account_bidx'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_payment_encrypted_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_missing, migrations.RunPython.noop),
+    ]
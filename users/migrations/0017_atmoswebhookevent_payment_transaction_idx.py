@@ -0,0 +1,36 @@
+# Generated by Django 4.2.10 on 2026-10-19 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_payment_copy_legacy_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AtmosWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dedup_key', models.CharField(max_length=64, unique=True)),
+                ('transaction_id', models.CharField(max_length=255)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(default='pending', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['status', 'id'], name='atmos_webhook_queue_idx'),
+                    models.Index(fields=['transaction_id'], name='atmos_webhook_tx_idx'),
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['transaction_id'], name='payment_transaction_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.10 on 2026-10-19 17:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import users.models
+
+IDENTITY_FIELDS = (
+    'pinfl', 'passport_seria', 'passport_scan', 'passport_back_scan', 'passport_scan_with_face', 'myid_data',
+)
+
+
+def copy_identity(apps, schema_editor):
+    User = apps.get_model('users', 'AbstractUser')
+    UserIdentity = apps.get_model('users', 'UserIdentity')
+
+    # Faqat biror identity ma'lumoti bor userlar uchun qator yaratiladi
+    has_data = models.Q(myid_data__isnull=False)
+    for name in IDENTITY_FIELDS[:-1]:
+        has_data |= models.Q(**{f'{name}__gt': ''})
+    rows = User.objects.filter(has_data).values_list('id', *IDENTITY_FIELDS)
+
+    batch = []
+    for user_id, *values in rows.iterator(chunk_size=500):
+        batch.append(UserIdentity(user_id=user_id, **dict(zip(IDENTITY_FIELDS, values))))
+        if len(batch) >= 500:
+            UserIdentity.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        UserIdentity.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_atmoswebhookevent_payment_transaction_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserIdentity',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='identity', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('pinfl', models.CharField(blank=True, max_length=14, null=True)),
+                ('passport_seria', models.CharField(blank=True, max_length=50, null=True)),
+                ('passport_scan', models.ImageField(blank=True, null=True, upload_to=users.models.image_create_time)),
+                ('passport_back_scan', models.ImageField(blank=True, null=True, upload_to=users.models.image_create_time)),
+                ('passport_scan_with_face', models.ImageField(blank=True, null=True, upload_to=users.models.image_create_time)),
+                ('myid_data', models.JSONField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(copy_identity, migrations.RunPython.noop),
+    ]
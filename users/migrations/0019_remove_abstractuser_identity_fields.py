@@ -0,0 +1,37 @@
+# Generated by Django 4.2.10 on 2026-10-19 17:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_useridentity'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='abstractuser',
+            name='myid_data',
+        ),
+        migrations.RemoveField(
+            model_name='abstractuser',
+            name='passport_back_scan',
+        ),
+        migrations.RemoveField(
+            model_name='abstractuser',
+            name='passport_scan',
+        ),
+        migrations.RemoveField(
+            model_name='abstractuser',
+            name='passport_scan_with_face',
+        ),
+        migrations.RemoveField(
+            model_name='abstractuser',
+            name='passport_seria',
+        ),
+        migrations.RemoveField(
+            model_name='abstractuser',
+            name='pinfl',
+        ),
+    ]
@@ -7,9 +7,11 @@ from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from job.models import Region, City, CategoryJob, Job
-from users.utils import decrypt_value, encrypt_value
 from django_cryptography.fields import encrypt
 
+from users.fields import BlindIndexField, EncryptedTextField, changed_value
+from users import utils
+
 
 def image_create_time(instance, filename):
     current_date = timezone.now().strftime('%Y/%m/%d')
@@ -71,10 +73,6 @@ class AbstractUser(AbstractBaseUser, PermissionsMixin):
     phone = models.CharField(max_length=25)
     region = models.ForeignKey(Region, on_delete=models.CASCADE, null=True, blank=True)
     city = models.ForeignKey(City, on_delete=models.CASCADE, null=True, blank=True)
-    passport_scan = models.ImageField(upload_to=image_create_time, blank=True, null=True)
-    passport_back_scan = models.ImageField(upload_to=image_create_time, blank=True, null=True)
-    passport_scan_with_face = models.ImageField(upload_to=image_create_time, blank=True, null=True)
-    passport_seria = models.CharField(max_length=50, blank=True, null=True)
     job_category = models.ForeignKey(CategoryJob, on_delete=models.SET_NULL, blank=True, null=True)
     job_id = models.ManyToManyField(Job, blank=True)
 
@@ -95,8 +93,6 @@ class AbstractUser(AbstractBaseUser, PermissionsMixin):
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     point = gis_models.PointField(srid=4326, default=Point(69.279759, 41.311081) )
-    pinfl = models.CharField(max_length=14, null=True, blank=True)
-    myid_data = models.JSONField(blank=True, null=True)
 
 
     objects = UserManager()
@@ -119,6 +115,26 @@ class AbstractUser(AbstractBaseUser, PermissionsMixin):
         ]
 
 
+class UserIdentity(models.Model):
+    """
+    MyID va pasport ma'lumotlari. Har bir autentifikatsiyada o'qiladigan user qatoridan ajratilgan:
+    faqat MeView, MyIDVerifyView va admin yuklaydi.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="identity"
+    )
+    pinfl = models.CharField(max_length=14, null=True, blank=True)
+    passport_seria = models.CharField(max_length=50, blank=True, null=True)
+    passport_scan = models.ImageField(upload_to=image_create_time, blank=True, null=True)
+    passport_back_scan = models.ImageField(upload_to=image_create_time, blank=True, null=True)
+    passport_scan_with_face = models.ImageField(upload_to=image_create_time, blank=True, null=True)
+    myid_data = models.JSONField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Identity: {self.user_id}"
+
+
 class WorkerProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="worker_profile")
 
@@ -139,36 +155,42 @@ class UserCard(models.Model):
     status = models.CharField(max_length=30, default="pending")
 
     card_id = models.CharField(max_length=255, null=True, blank=True)
-    pan = models.TextField(null=True, blank=True)
-    expiry = models.TextField(null=True, blank=True)
-    card_holder = models.TextField(null=True, blank=True)
-    phone = models.TextField(null=True, blank=True)
-    card_token = models.TextField(null=True, blank=True)
+    # Bazada shifrlangan, atributda plaintext (users/fields.py)
+    pan = EncryptedTextField(null=True, blank=True)
+    expiry = EncryptedTextField(null=True, blank=True)
+    card_holder = EncryptedTextField(null=True, blank=True)
+    phone = EncryptedTextField(null=True, blank=True)
+    card_token = EncryptedTextField(null=True, blank=True)
+    # Decrypt qilmasdan tenglik bo'yicha qidirish uchun HMAC (users.utils.blind_index)
+    card_token_bidx = BlindIndexField(source="card_token")
+    # ATMOS saqlaydigan PAN maskalangan — dublikat tekshiruvi uchun emas, faqat card_token_bidx
+    pan_fingerprint = BlindIndexField(source="pan")
+
+    # Ko'rsatish uchun xavfsiz ustunlar (users/cards.py) — karta tasdiqlanganda yoziladi,
+    # ro'yxat va javoblar ularni decrypt qilmasdan beradi
+    masked_pan = models.CharField(max_length=32, blank=True, default="")
+    last4 = models.CharField(max_length=4, blank=True, default="")
+    brand = models.CharField(max_length=20, blank=True, default="")
+    expiry_month = models.PositiveSmallIntegerField(null=True, blank=True)
+    expiry_year = models.PositiveSmallIntegerField(null=True, blank=True)
+    masked_holder = models.CharField(max_length=255, blank=True, default="")
+    masked_phone = models.CharField(max_length=32, blank=True, default="")
 
     created_at = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
-        """Sensitive fieldlarni shifrlash"""
-        if self.pan:
-            self.pan = encrypt_value(self.pan)
-        if self.expiry:
-            self.expiry = encrypt_value(self.expiry)
-        if self.card_holder:
-            self.card_holder = encrypt_value(self.card_holder)
-        if self.phone:
-            self.phone = encrypt_value(self.phone)
-        if self.card_token:
-            self.card_token = encrypt_value(self.card_token)
-        super().save(*args, **kwargs)
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status"], name="usercard_user_status_idx"),
+        ]
 
     def get_decrypted_data(self) -> dict:
         """Decrypted formatda ma’lumot olish"""
         return {
-            "pan": decrypt_value(self.pan),
-            "expiry": decrypt_value(self.expiry),
-            "card_holder": decrypt_value(self.card_holder),
-            "phone": decrypt_value(self.phone),
-            "card_token": decrypt_value(self.card_token),
+            "pan": self.pan or "",
+            "expiry": self.expiry or "",
+            "card_holder": self.card_holder or "",
+            "phone": self.phone or "",
+            "card_token": self.card_token or "",
         }
 
 
@@ -177,9 +199,80 @@ class Payment(models.Model):
     user = models.ForeignKey(AbstractUser, on_delete=models.CASCADE)
     transaction_id = models.CharField(max_length=255)
     amount = models.IntegerField()
-    # Sensitive fields (shifrlash bilan)
-    account = encrypt(models.CharField(max_length=255))
-    store_id = encrypt(models.CharField(max_length=255))
-    terminal_id = encrypt(models.CharField(max_length=255, null=True, blank=True))
-    status = models.CharField(max_length=20, default="draft")  # draft, pre_confirmed, confirmed, canceled
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    # Sensitive fields (shifrlash bilan, users/fields.py — UserCard bilan bir xil kalitlar).
+    # Ustunlar 0015 da qo'shilgan; NOT NULL eski ustunlar o'chirilganda qo'yiladi
+    account = EncryptedTextField(null=True, db_column="account_new")
+    store_id = EncryptedTextField(null=True, db_column="store_id_new")
+    terminal_id = EncryptedTextField(null=True, blank=True, db_column="terminal_id_new")
+    account_bidx = BlindIndexField(source="account")
+    # O'tish davri: eski (django_cryptography + encrypt_value) ustunlar. Rollout paytida ishlab turgan eski
+    # kod ularni o'qiydi, shuning uchun save() ikkalasiga yozadi; yangi ustuni hali bo'sh qator (backfill
+    # qilinmagan yoki eski kod yozgan) eski ustundan o'qiladi. Hamma qator ko'chirilib eski kod qolmagach,
+    # keyingi relizda o'chiriladi
+    legacy_account = encrypt(models.CharField(max_length=255, db_column="account"))
+    legacy_store_id = encrypt(models.CharField(max_length=255, db_column="store_id"))
+    legacy_terminal_id = encrypt(models.CharField(max_length=255, null=True, blank=True, db_column="terminal_id"))
+    status = models.CharField(max_length=20, default="draft")  # draft, pre_applied, confirming, confirmed, cancelled, expired
+    # ATMOS dagi holat oxirgi marta qachon tekshirilgani va uning javobi (reconcile_payments)
+    status_checked_at = models.DateTimeField(null=True, blank=True)
+    status_payload = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "status_checked_at"], name="payment_status_checked_idx"),
+            models.Index(fields=["transaction_id"], name="payment_transaction_idx"),
+        ]
+
+    LEGACY_FIELDS = {"account": "legacy_account", "store_id": "legacy_store_id", "terminal_id": "legacy_terminal_id"}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        for name, legacy in cls.LEGACY_FIELDS.items():
+            if instance.__dict__.get(name) is None and instance.__dict__.get(legacy):
+                # Plaintext tokensiz qoladi: keyingi to'liq save() uni yangi ustunga ham yozadi
+                instance.__dict__[name] = utils.unwrap_value(instance.__dict__[legacy])[0]
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        legacy_fields = []
+        for name, legacy in self.LEGACY_FIELDS.items():
+            if update_fields is not None and name not in update_fields:
+                continue
+            value = changed_value(self, name)
+            if value is not None:
+                # Eski kod formati: decrypt_value(payment.account)
+                setattr(self, legacy, utils.encrypt_value(value))
+                legacy_fields.append(legacy)
+        if update_fields is not None and legacy_fields:
+            kwargs["update_fields"] = [*update_fields, *legacy_fields]
+        super().save(*args, **kwargs)
+
+
+# ATMOS callback'lari: endpoint faqat shu yerga yozadi, process_atmos_webhooks Payment'ga qo'llaydi
+class AtmosWebhookEvent(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSED = "processed"
+    STATUS_IGNORED = "ignored"  # to'lov topilmadi yoki allaqachon yakuniy holatda
+    STATUS_FAILED = "failed"  # summa/invoice mos kelmadi
+    STATUS_CONFLICT = "conflict"  # to'lov lokal bekor qilingan, ATMOS esa pul yechilganini aytmoqda — qo'lda tekshirish
+
+    # ATMOS bir callback'ni qayta yuborsa ikkinchi yozuv yaratilmaydi
+    dedup_key = models.CharField(max_length=64, unique=True)
+    transaction_id = models.CharField(max_length=255)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, default=STATUS_PENDING)
+    error = models.TextField(blank=True, default="")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="atmos_webhook_queue_idx"),
+            models.Index(fields=["transaction_id"], name="atmos_webhook_tx_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_id} | {self.status}"
\ No newline at end of file
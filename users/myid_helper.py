@@ -1,32 +1,119 @@
-import time
 import requests
+from asgiref.sync import sync_to_async
 from config import settings
+from users.http import get_client
+from users.token_manager import TokenManager
 
-_cached_token = None
-_token_expiry = 0
 
-def get_myid_access_token():
-    global _cached_token, _token_expiry
+class MyIDError(requests.RequestException):
+    """MyID token bermadi (HTTP xato yoki noto'g'ri javob)"""
+
+
+class MyIDClient:
+    """
+    MyID API: umumiy keep-alive pool, timeout, circuit breaker va bulkhead
+    (settings.OUTBOUND_PROVIDERS["myid"]). client_credentials tokeni TokenManager orqali Redis'da,
+    muddatidan oldin fonda yangilanadi va jarayonlar orasida bitta so'rov bilan olinadi.
+    Sync metodlar va ``a`` prefiksli async variantlar.
+    """
+
+    TOKEN_EXPIRES_IN_FALLBACK = 3600
+
+    def __init__(self, http=None, refresh_ahead=None):
+        self.http = http or get_client("myid")
+        self.tokens = TokenManager(
+            "myid",
+            self._fetch_token,
+            refresh_ahead=refresh_ahead or getattr(settings, "MYID_TOKEN_REFRESH_AHEAD", 300),
+        )
+
+    def _url(self, path):
+        return f"{(settings.MYID_BASE_URL or '').rstrip('/')}{path}"
+
+    def _fetch_token(self):
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": settings.MYID_CLIENT_ID,
+            "client_secret": settings.MYID_CLIENT_SECRET
+        }
+
+        # Shu yerda json= ishlatiladi, form-data emas
+        res = self.http.post(self._url("/v1/auth/clients/access-token"), json=data)
+        if res.status_code != 200:
+            raise MyIDError(f"Token olishda xatolik: {res.text}")
+
+        try:
+            result = res.json()
+        except ValueError as exc:
+            raise MyIDError("MyID token javobi JSON emas") from exc
+        if not result.get("access_token"):
+            raise MyIDError("MyID token javobida access_token yo'q")
+
+        expires_in = result.get("expires_in") or self.TOKEN_EXPIRES_IN_FALLBACK
+        return {"access_token": result["access_token"], "expires_in": expires_in}, expires_in
+
+    # Token
+
+    def access_token(self):
+        return self.tokens.get()["access_token"]
 
-    now = time.time()
-    if _cached_token and now < _token_expiry:
-        return _cached_token  # Token hali yaroqli
+    async def aaccess_token(self):
+        # Odatda token xotirada: thread'ga o'tmasdan qaytadi
+        token_info = self.tokens.peek()
+        if token_info is None:
+            token_info = await sync_to_async(self.tokens.get)()
+        return token_info["access_token"]
 
-    url = f"{settings.MYID_BASE_URL}/v1/auth/clients/access-token"
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": settings.MYID_CLIENT_ID,
-        "client_secret": settings.MYID_CLIENT_SECRET
-    }
+    def _request(self, method, path, **kwargs):
+        res = self.http.request(method, self._url(path), headers=self._headers(), **kwargs)
+        if res.status_code == 401:
+            # Token MyID tomonida bekor qilingan — yangisini olib bir marta qayta urinamiz
+            self.tokens.invalidate()
+            res = self.http.request(method, self._url(path), headers=self._headers(), **kwargs)
+        return res
 
-    # Shu yerda json= ishlatiladi, form-data emas
-    res = requests.post(url, json=data)
-    if res.status_code != 200:
-        raise Exception(f"Token olishda xatolik: {res.text}")
+    async def _arequest(self, method, path, **kwargs):
+        res = await self.http.arequest(method, self._url(path), headers=await self._aheaders(), **kwargs)
+        if res.status_code == 401:
+            self.tokens.invalidate()
+            res = await self.http.arequest(method, self._url(path), headers=await self._aheaders(), **kwargs)
+        return res
 
-    result = res.json()
-    _cached_token = result.get("access_token")
-    _token_expiry = now + result.get("expires_in", 3600) - 60  # 1 daqiqa xavfsizlik uchun.
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.access_token()}"}
 
-    return _cached_token
+    async def _aheaders(self):
+        return {"Authorization": f"Bearer {await self.aaccess_token()}"}
 
+    # SDK endpointlari
+
+    def create_session(self, body):
+        return self._request("POST", "/v2/sdk/sessions", json=body)
+
+    def session_status(self, session_id):
+        return self._request("GET", f"/v1/sdk/sessions/{session_id}")
+
+    def get_data(self, code):
+        return self._request("GET", "/v1/sdk/data", params={"code": code})
+
+    async def acreate_session(self, body):
+        return await self._arequest("POST", "/v2/sdk/sessions", json=body)
+
+    async def asession_status(self, session_id):
+        return await self._arequest("GET", f"/v1/sdk/sessions/{session_id}")
+
+    async def aget_data(self, code):
+        return await self._arequest("GET", "/v1/sdk/data", params={"code": code})
+
+    def validate_token(self, token):
+        """Foydalanuvchi MyID tokeni (IsMyIDTokenValid)"""
+        res = self.http.get(self._url("/sdk/validate-token"), headers={"Authorization": f"Bearer {token}"})
+        return res.status_code == 200
+
+
+myid_client = MyIDClient()
+myid_http = myid_client.http
+
+
+def get_myid_access_token():
+    return myid_client.access_token()
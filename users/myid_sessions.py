@@ -0,0 +1,164 @@
+"""
+MyID sessiya statusi serverda kuzatiladi: ilova ``MyIDSessionStatusView`` ni so'rasa status Redis'dan
+o'qiladi, MyID'ga har bir so'rov uchun HTTP chaqiruv qilinmaydi.
+
+- ``track`` — sessiya yaratilganda navbatga qo'shiladi (``myid:sessions:due`` zset, score — keyingi poll vaqti);
+- ``watch_myid_sessions`` buyrug'i navbatdan muddati kelganlarini oladi va har biri uchun bitta so'rov yuboradi.
+  Status o'zgarmasa interval ikki barobar oshadi (MYID_SESSION_POLL_MIN .. MYID_SESSION_POLL_MAX);
+- status o'zgarsa ``user_<id>`` guruhiga ``myid_session_update`` hodisasi yuboriladi;
+- yakuniy status yoki MYID_SESSION_TTL tugashi bilan sessiya navbatdan chiqadi, oxirgi holat TTL gacha keshda qoladi.
+"""
+import asyncio
+import logging
+import time
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from client.groups import notify_user
+from config import codec, metrics
+from users.myid_helper import myid_client
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "myid:session:{}"
+DUE_KEY = "myid:sessions:due"
+
+# Shu statuslardan keyin MyID'ni so'rash to'xtatiladi; javobda ``code`` bo'lsa ham sessiya yakunlangan
+FINAL_STATUSES = ("closed", "completed", "accepted", "rejected", "canceled", "cancelled", "expired", "failed")
+
+
+def _settings():
+    return (
+        getattr(settings, "MYID_SESSION_TTL", 600),
+        getattr(settings, "MYID_SESSION_POLL_MIN", 2),
+        getattr(settings, "MYID_SESSION_POLL_MAX", 15),
+    )
+
+
+def is_final(status, data=None):
+    return status in FINAL_STATUSES or bool((data or {}).get("code"))
+
+
+def backoff(attempts):
+    _, poll_min, poll_max = _settings()
+    return min(poll_min * 2 ** attempts, poll_max)
+
+
+def get(session_id):
+    raw = get_redis_connection("default").get(STATE_KEY.format(session_id))
+    return codec.loads(raw) if raw else None
+
+
+def _save(redis, session_id, state):
+    ttl, _, _ = _settings()
+    # Kalit sessiya yaratilgandan TTL o'tguncha yashaydi (kamida bir daqiqa — oxirgi statusni o'qish uchun)
+    expires_in = max(int(state["created_at"] + ttl - time.time()), 60)
+    redis.set(STATE_KEY.format(session_id), codec.dumps(state), ex=expires_in)
+
+
+def track(session_id, user_id=None):
+    """Yangi sessiyani kuzatishga olish; birinchi poll MYID_SESSION_POLL_MIN dan keyin"""
+    redis = get_redis_connection("default")
+    now = time.time()
+    state = {"user_id": user_id, "status": None, "data": None, "attempts": 0, "created_at": now}
+    ttl, poll_min, _ = _settings()
+    if redis.set(STATE_KEY.format(session_id), codec.dumps(state), nx=True, ex=ttl):
+        redis.zadd(DUE_KEY, {session_id: now + poll_min})
+
+
+def record(session_id, status, data, user_id=None):
+    """
+    Status yozish (watcher yoki view'ning to'g'ridan-to'g'ri so'rovi).
+    Qaytaradi: (state, status o'zgardimi)
+    """
+    redis = get_redis_connection("default")
+    state = get(session_id) or {"user_id": user_id, "status": None, "attempts": 0, "created_at": time.time()}
+    if user_id and not state.get("user_id"):
+        state["user_id"] = user_id
+
+    changed = status != state.get("status")
+    state.update(status=status, data=data, attempts=0 if changed else state.get("attempts", 0) + 1)
+    _save(redis, session_id, state)
+
+    if is_final(status, data):
+        redis.zrem(DUE_KEY, session_id)
+    else:
+        redis.zadd(DUE_KEY, {session_id: time.time() + backoff(state["attempts"])})
+    return state, changed
+
+
+def reschedule(session_id, attempts):
+    get_redis_connection("default").zadd(DUE_KEY, {session_id: time.time() + backoff(attempts)})
+
+
+def claim_due(limit=100):
+    """
+    Muddati kelgan sessiyalar. ZREM faqat bitta watcher'da 1 qaytaradi,
+    shuning uchun bir nechta watcher bitta sessiyani ikki marta so'ramaydi.
+    """
+    redis = get_redis_connection("default")
+    claimed = []
+    for member in redis.zrangebyscore(DUE_KEY, "-inf", time.time(), start=0, num=limit):
+        if redis.zrem(DUE_KEY, member):
+            claimed.append(member.decode() if isinstance(member, bytes) else member)
+    return claimed
+
+
+async def poll(session_id):
+    """Bitta sessiya uchun MyID'ga bitta so'rov. Qaytaradi: status o'zgardimi"""
+    state = await sync_to_async(get)(session_id)
+    ttl, _, _ = _settings()
+    if state is None or time.time() - state["created_at"] > ttl:
+        return False  # muddati tugagan — navbatga qaytarilmaydi
+
+    metrics.incr("myid_session_polls")
+    try:
+        res = await myid_client.asession_status(session_id)
+    except requests.RequestException:
+        logger.warning("MyID session %s status request failed", session_id)
+        await sync_to_async(reschedule)(session_id, state["attempts"] + 1)
+        return False
+
+    if res.status_code != 200:
+        logger.warning("MyID session %s status: HTTP %s", session_id, res.status_code)
+        if res.status_code != 404:
+            await sync_to_async(reschedule)(session_id, state["attempts"] + 1)
+        return False
+
+    data = res.json()
+    state, changed = await sync_to_async(record)(session_id, data.get("status"), data)
+    if changed and state.get("user_id"):
+        metrics.incr("myid_session_pushes")
+        await notify_user(state["user_id"], {
+            "type": "myid_session_update",
+            "session_id": session_id,
+            "status": state["status"],
+            "data": data,
+        })
+    return changed
+
+
+async def poll_due(limit=100):
+    """
+    Muddati kelgan sessiyalarni parallel so'rash: bir vaqtda ko'pi bilan MyID client'ining
+    ``max_concurrent`` (OUTBOUND_PROVIDERS["myid"]) ta so'rov. Qaytaradi: (so'ralgan, o'zgargan)
+    """
+    session_ids = await sync_to_async(claim_due)(limit)
+    if not session_ids:
+        return 0, 0
+    # Bulkhead max_concurrent dan ortiq so'rovni kutdirmay rad etadi (ProviderUnavailable) — shundan oshirmaymiz
+    semaphore = asyncio.Semaphore(myid_client.http.max_concurrent)
+
+    async def limited(session_id):
+        async with semaphore:
+            return await poll(session_id)
+
+    results = await asyncio.gather(*(limited(session_id) for session_id in session_ids), return_exceptions=True)
+    for session_id, result in zip(session_ids, results):
+        if isinstance(result, Exception):
+            logger.error("MyID session %s poll failed", session_id, exc_info=result)
+            await sync_to_async(reschedule)(session_id, 1)
+    return len(session_ids), sum(result is True for result in results)
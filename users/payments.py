@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import Payment
+from users.service import AtmosService
+
+logger = logging.getLogger(__name__)
+
+DRAFT = "draft"
+PRE_APPLIED = "pre_applied"
+CONFIRMING = "confirming"  # ConfirmPaymentView ATMOS javobini kutmoqda
+CONFIRMED = "confirmed"
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+
+# "pre_confirmed" — eski yozuvlar uchun
+PENDING_STATUSES = (DRAFT, PRE_APPLIED, CONFIRMING, "pre_confirmed")
+FINAL_STATUSES = (CONFIRMED, CANCELLED, EXPIRED)
+
+_CANCELLED_STATES = {"cancelled", "canceled", "reversed", "reverse", "declined", "failed", "error"}
+
+
+def remote_status(data):
+    """
+    ATMOS ``/merchant/pay/status`` javobidan lokal status.
+    ``None`` — ATMOS hali yakuniy holat bermagan (yoki javob xato).
+    """
+    if not isinstance(data, dict) or data.get("result", {}).get("code") != "OK":
+        return None
+
+    store_transaction = data.get("store_transaction") or {}
+    if store_transaction.get("confirmed") is True:
+        return CONFIRMED
+
+    state = str(store_transaction.get("status_code") or store_transaction.get("status") or "").lower()
+    if state in _CANCELLED_STATES:
+        return CANCELLED
+    return None
+
+
+def next_status(payment, data, code, now=None):
+    """ATMOS javobi va yozuv yoshiga qarab yangi status (o'zgarmasa — joriy status)"""
+    if payment.status in FINAL_STATUSES or code != 200:
+        return payment.status
+
+    status = remote_status(data)
+    if status:
+        return status
+
+    now = now or timezone.now()
+    abandon_after = timedelta(seconds=getattr(settings, "PAYMENT_ABANDON_AFTER", 60 * 60 * 24))
+    if payment.created_at and payment.created_at < now - abandon_after:
+        return EXPIRED
+    return payment.status
+
+
+def is_fresh(payment, now=None):
+    """
+    Polling endpoint ATMOS ga bormasdan lokal yozuvdan javob bera oladimi.
+    Lokal status o'zgarishlari (confirm, cancel, webhook) ``status_payload`` ni tozalaydi,
+    shuning uchun saqlangan payload doim joriy statusga mos ATMOS javobi.
+    """
+    if payment.status_payload is None or payment.status_checked_at is None:
+        return False
+    if payment.status in FINAL_STATUSES:
+        return True
+    now = now or timezone.now()
+    fresh_for = getattr(settings, "PAYMENT_STATUS_FRESH_SECONDS", 15)
+    return payment.status_checked_at >= now - timedelta(seconds=fresh_for)
+
+
+def record_statuses(results):
+    """
+    ``[(payment, data, code), ...]`` natijalarini bazaga partiyalab yozish:
+    - status_checked_at va status_payload — bitta bulk_update
+    - status — (eski, yangi) juftligi bo'yicha bitta shartli UPDATE, shunda shu orada
+      foydalanuvchi oqimi (confirm/cancel) o'zgartirgan qatorlar ustidan yozilmaydi
+    """
+    now = timezone.now()
+    checked = []
+    transitions = defaultdict(list)
+
+    for payment, data, code in results:
+        if code == 200 and isinstance(data, dict):
+            payment.status_payload = data
+        payment.status_checked_at = now
+        checked.append(payment)
+
+        status = next_status(payment, data, code, now)
+        if status != payment.status:
+            transitions[(payment.status, status)].append(payment.pk)
+
+    changed = 0
+    with transaction.atomic():
+        Payment.objects.bulk_update(checked, ["status_checked_at", "status_payload"])
+        for (old_status, new_status), ids in transitions.items():
+            changed += Payment.objects.filter(pk__in=ids, status=old_status).update(status=new_status)
+    return changed
+
+
+def pending_payments(min_age, recheck_after, now=None):
+    now = now or timezone.now()
+    return (
+        Payment.objects
+        .filter(status__in=PENDING_STATUSES, created_at__lte=now - timedelta(seconds=min_age))
+        .filter(Q(status_checked_at__isnull=True) | Q(status_checked_at__lte=now - timedelta(seconds=recheck_after)))
+        .order_by("status_checked_at", "id")
+        .only("id", "transaction_id", "status", "created_at", "status_checked_at", "status_payload")
+    )
+
+
+async def check_many(payments, concurrency):
+    """ATMOS holatlarini bir vaqtda ko'pi bilan ``concurrency`` ta so'rov bilan tekshirish"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(payment):
+        async with semaphore:
+            try:
+                data, code = await AtmosService.acheck_status(payment.transaction_id)
+            except Exception:
+                logger.exception("ATMOS check_status failed for payment %s", payment.pk)
+                data, code = None, 0
+            return payment, data, code
+
+    return await asyncio.gather(*(check(payment) for payment in payments))
@@ -1,82 +1,32 @@
 # services/atmos/service.py
 import requests
-import time
 import logging
+from asgiref.sync import sync_to_async
 from config import settings
-from typing import Optional
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from django.core.cache import cache
+from users.http import ProviderUnavailable, get_client
+from users.token_manager import TokenManager
 
 logger = logging.getLogger(__name__)
 
+# ATMOS bilan barcha so'rovlar uchun bitta keep-alive pool (sync va async),
+# timeout, circuit breaker va bulkhead — settings.OUTBOUND_PROVIDERS["atmos"]
+atmos_http = get_client("atmos")
+
 
 # ATMOS API uchun umumiy class
 class AtmosAPI:
     TOKEN_CACHE_KEY = "atmos_access_token"
     TOKEN_EXPIRES_IN_FALLBACK = 3500  # fallback if provider doesn't return expires_in
-    TIMEOUT = 5  # seconds for HTTP requests
-    _SESSION: Optional[requests.Session] = None
-    _CACHE_LOCK_KEY = "atmos_token_lock"
-    _CACHE_LOCK_TTL = 10  # seconds
+    TOKEN_REFRESH_AHEAD = getattr(settings, "ATMOS_TOKEN_REFRESH_AHEAD", 300)  # seconds before expiry
+    TIMEOUT = atmos_http.timeout  # seconds for HTTP requests
 
     @classmethod
     def _get_session(cls) -> requests.Session:
-        if cls._SESSION is None:
-            session = requests.Session()
-            retries = Retry(
-                total=3,
-                backoff_factor=0.5,
-                status_forcelist=(500, 502, 503, 504),
-                allowed_methods=frozenset(["POST", "GET", "PUT", "DELETE", "OPTIONS"])
-            )
-            adapter = HTTPAdapter(max_retries=retries, pool_maxsize=10, pool_connections=10)
-            session.mount("https://", adapter)
-            session.mount("http://", adapter)
-            cls._SESSION = session
-        return cls._SESSION
-
-    @classmethod
-    def _acquire_lock(cls) -> bool:
-        try:
-            return cache.add(cls._CACHE_LOCK_KEY, "1", timeout=cls._CACHE_LOCK_TTL)
-        except Exception:
-            logger.warning("Cache lock acquisition failed.")
-            return False
+        return atmos_http.session
 
     @classmethod
-    def _release_lock(cls) -> None:
-        try:
-            cache.delete(cls._CACHE_LOCK_KEY)
-        except Exception:
-            logger.warning("Cache lock release failed.")
-
-    @classmethod
-    def get_access_token(cls) -> dict:
-        """
-        Return cached token info or fetch new one from ATMOS.
-        Returns dict:
-        {
-            "access_token": "...",
-            "token_type": "...",
-            "expires_in": 3600,
-            "scope": "..."
-        }
-        """
-        # 1) Check cache
-        token_data = cache.get(cls.TOKEN_CACHE_KEY)
-        if token_data:
-            return token_data
-
-        # 2) Acquire lock
-        lock_acquired = cls._acquire_lock()
-        if not lock_acquired:
-            time.sleep(0.5)
-            token_data = cache.get(cls.TOKEN_CACHE_KEY)
-            if token_data:
-                return token_data
-
-        session = cls._get_session()
+    def _fetch_token(cls):
+        """ATMOS /token dan yangi token. Qaytaradi: (token_info, expires_in)"""
         url = f"{settings.ATMOS_BASE_URL.rstrip('/')}/token"
 
         payload = {
@@ -86,30 +36,22 @@ class AtmosAPI:
         }
 
         try:
-            response = session.post(url, data=payload, timeout=cls.TIMEOUT, verify=True)
+            response = atmos_http.post(url, data=payload, verify=True)
         except requests.RequestException as exc:
             logger.exception("ATMOS token request failed at network level")
-            if lock_acquired:
-                cls._release_lock()
             raise Exception("Failed to connect to ATMOS for token") from exc
 
         try:
             data = response.json()
         except ValueError:
             logger.error("ATMOS token response is not valid JSON; status=%s text=%s", response.status_code, response.text[:1000])
-            if lock_acquired:
-                cls._release_lock()
             raise Exception("Invalid response from ATMOS token endpoint")
 
         if response.status_code != 200 or "access_token" not in data:
             logger.error("ATMOS token fetch failed; status=%s, body=%s", response.status_code, data)
-            if lock_acquired:
-                cls._release_lock()
             raise Exception("ATMOS token fetch failed")
 
-        # compute TTL for cache
         expires_in = data.get("expires_in") or cls.TOKEN_EXPIRES_IN_FALLBACK
-        ttl = max(int(expires_in) - 5, 60)
 
         token_info = {
             "access_token": data["access_token"],
@@ -117,25 +59,44 @@ class AtmosAPI:
             "expires_in": expires_in,
             "scope": data.get("scope"),
         }
+        return token_info, expires_in
 
-        try:
-            cache.set(cls.TOKEN_CACHE_KEY, token_info, ttl)
-        except Exception:
-            logger.warning("Failed to cache token; continuing without cache.")
-
-        if lock_acquired:
-            cls._release_lock()
-
-        return token_info
+    @classmethod
+    def get_access_token(cls) -> dict:
+        """
+        Return cached token info; it is refreshed in the background before it expires.
+        Returns dict:
+        {
+            "access_token": "...",
+            "token_type": "...",
+            "expires_in": 3600,
+            "scope": "..."
+        }
+        """
+        return atmos_tokens.get()
 
     @classmethod
-    def make_headers(cls) -> dict:
-        token_info = cls.get_access_token()
+    def _headers(cls, token_info) -> dict:
         return {
             "Authorization": f"Bearer {token_info['access_token']}",
             "Content-Type": "application/json",
         }
 
+    @classmethod
+    def make_headers(cls) -> dict:
+        return cls._headers(cls.get_access_token())
+
+    @classmethod
+    async def amake_headers(cls) -> dict:
+        # Odatda token xotirada: thread'ga o'tmasdan qaytadi
+        token_info = atmos_tokens.peek()
+        if token_info is None:
+            token_info = await sync_to_async(cls.get_access_token)()
+        return cls._headers(token_info)
+
+
+atmos_tokens = TokenManager("atmos", AtmosAPI._fetch_token, refresh_ahead=AtmosAPI.TOKEN_REFRESH_AHEAD)
+
 
 class AtmosService:
     """
@@ -148,50 +109,53 @@ class AtmosService:
     def send_request(method, url, payload=None):
         headers = AtmosAPI.make_headers()
 
-        # Retry strategy
-        retry = Retry(
-            total=3,
-            backoff_factor=0.3,
-            status_forcelist=[500, 502, 503, 504],
-            allowed_methods=["POST", "GET"]
-        )
-
-        adapter = HTTPAdapter(max_retries=retry)
-        session = requests.Session()
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
-
         try:
             if method == "POST":
-                response = session.post(
-                    url,
-                    json=payload,
-                    headers=headers,
-                    timeout=AtmosAPI.TIMEOUT
-                )
+                response = atmos_http.post(url, json=payload, headers=headers)
             else:
-                response = session.get(
-                    url,
-                    headers=headers,
-                    timeout=AtmosAPI.TIMEOUT
-                )
-
-            # Log API response
-            logger.info("ATMOS API [%s] %s → %s", method, url, response.status_code)
+                response = atmos_http.get(url, headers=headers)
+        except ProviderUnavailable as e:
+            logger.warning("ATMOS unavailable: %s", e)
+            return {"error": "ATMOS temporarily unavailable"}, 503
+        except requests.RequestException as e:
+            logger.exception("ATMOS Request Failed: %s", str(e))
+            return {"error": "ATMOS connection error"}, 500
 
-            # Validate response structure
-            try:
-                data = response.json()
-            except Exception:
-                logger.error("Invalid JSON from ATMOS: %s", response.text)
-                return {"error": "Invalid JSON response"}, 500
+        return AtmosService._parse_response(method, url, response)
 
-            return data, response.status_code
+    @staticmethod
+    async def asend_request(method, url, payload=None):
+        """send_request ning async varianti: javob kutilayotganda thread band qilinmaydi"""
+        headers = await AtmosAPI.amake_headers()
 
+        try:
+            if method == "POST":
+                response = await atmos_http.apost(url, json=payload, headers=headers)
+            else:
+                response = await atmos_http.aget(url, headers=headers)
+        except ProviderUnavailable as e:
+            logger.warning("ATMOS unavailable: %s", e)
+            return {"error": "ATMOS temporarily unavailable"}, 503
         except requests.RequestException as e:
             logger.exception("ATMOS Request Failed: %s", str(e))
             return {"error": "ATMOS connection error"}, 500
 
+        return AtmosService._parse_response(method, url, response)
+
+    @staticmethod
+    def _parse_response(method, url, response):
+        # Log API response
+        logger.info("ATMOS API [%s] %s → %s", method, url, response.status_code)
+
+        # Validate response structure
+        try:
+            data = response.json()
+        except Exception:
+            logger.error("Invalid JSON from ATMOS: %s", response.text)
+            return {"error": "Invalid JSON response"}, 500
+
+        return data, response.status_code
+
     # Specific methods
     @staticmethod
     def pre_apply(payload):
@@ -217,3 +181,28 @@ class AtmosService:
     def cancel_transaction(payload):
         url = f"{settings.ATMOS_BASE_URL.rstrip('/')}/merchant/pay/reverse"
         return AtmosService.send_request("POST", url, payload)
+
+    # Async variantlar
+    @staticmethod
+    async def apre_apply(payload):
+        url = f"{settings.ATMOS_BASE_URL.rstrip('/')}/merchant/pay/pre-apply"
+        return await AtmosService.asend_request("POST", url, payload)
+
+    @staticmethod
+    async def aapply(payload):
+        url = f"{settings.ATMOS_BASE_URL.rstrip('/')}/merchant/pay/apply"
+        return await AtmosService.asend_request("POST", url, payload)
+
+    @staticmethod
+    async def acheck_status(order_id):
+        url = f"{settings.ATMOS_BASE_URL.rstrip('/')}/merchant/pay/status/{order_id}"
+        return await AtmosService.asend_request("GET", url)
+
+    @staticmethod
+    async def aconfirm_payment(payload):
+        return await AtmosService.aapply(payload)
+
+    @staticmethod
+    async def acancel_transaction(payload):
+        url = f"{settings.ATMOS_BASE_URL.rstrip('/')}/merchant/pay/reverse"
+        return await AtmosService.asend_request("POST", url, payload)
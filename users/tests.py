@@ -1,3 +1,430 @@
-from django.test import TestCase
+from contextlib import asynccontextmanager
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+
+from config import settings as config_settings
+from users import authentication, fake_atmos, utils
+from users.models import AtmosWebhookEvent, Payment, UserCard, UserIdentity
+from users.myid_helper import myid_client
+from users.service import atmos_http, atmos_tokens
+from users.tokens import RoleRefreshToken
+from users.webhooks import process_pending
+
+User = get_user_model()
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+STORE_ID = 7001
+AMOUNT = 10000
+CARD_NUMBER = "8600000000000001"
+
+
+class CryptoCalls:
+    """users.utils.encrypt_value / decrypt_value chaqiruvlarini sanash (asl funksiya ishlaydi)"""
+
+    def __enter__(self):
+        self.patchers = [
+            mock.patch.object(utils, "encrypt_value", wraps=utils.encrypt_value),
+            mock.patch.object(utils, "decrypt_value", wraps=utils.decrypt_value),
+        ]
+        self.encrypt, self.decrypt = (patcher.start() for patcher in self.patchers)
+        return self
+
+    def __exit__(self, *exc_info):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    @property
+    def counts(self):
+        return self.encrypt.call_count, self.decrypt.call_count
+
+
+@asynccontextmanager
+async def running_atmos(**config):
+    """Soxta ATMOS'ni bo'sh portda ishga tushirish; users.service shu manzilga murojaat qiladi"""
+    fake, runner = await fake_atmos.start(port=0, **config)
+    base_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    try:
+        with mock.patch.object(config_settings, "ATMOS_BASE_URL", base_url):
+            yield fake
+    finally:
+        await atmos_http.aclose()
+        await runner.cleanup()
+        atmos_tokens.invalidate()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PaymentFlowTests(TestCase):
+    """To'lov oqimi async view'lar orqali soxta ATMOS (users/fake_atmos.py) bilan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone="998900000001", full_name="Test Client", role="client")
+
+    def setUp(self):
+        atmos_tokens.invalidate()
+        token = str(RoleRefreshToken.for_user(self.user).access_token)
+        self.client = AsyncClient(headers={"authorization": f"Bearer {token}"})
+
+    async def post(self, path, data):
+        return await self.client.post(path, data, content_type="application/json")
+
+    async def create_payment(self):
+        response = await self.post("/users/payment/create/", {
+            "amount": AMOUNT, "account": "998901234567", "store_id": str(STORE_ID),
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["transaction_id"]
+
+    async def pre_apply(self, transaction_id):
+        return await self.post("/users/payment/pre-confirm/", {
+            "card_number": CARD_NUMBER, "expiry": "2812", "store_id": STORE_ID,
+            "amount": AMOUNT, "transaction_id": transaction_id,
+        })
+
+    async def confirm(self, transaction_id):
+        return await self.post("/users/payment/confirm/", {
+            "transaction_id": transaction_id, "store_id": STORE_ID, "otp": "111111",
+        })
+
+    async def payment(self, transaction_id):
+        return await Payment.objects.aget(transaction_id=transaction_id)
+
+    async def test_pre_apply_confirm_status_cancel(self):
+        async with running_atmos() as fake:
+            transaction_id = await self.create_payment()
+            self.assertEqual((await self.payment(transaction_id)).status, "draft")
+
+            response = await self.pre_apply(transaction_id)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual((await self.payment(transaction_id)).status, "pre_applied")
+
+            response = await self.confirm(transaction_id)
+            self.assertEqual(response.status_code, 200, response.content)
+            payment = await self.payment(transaction_id)
+            self.assertEqual(payment.status, "confirmed")
+            self.assertEqual(payment.account, "998901234567")
+            self.assertIsNone(payment.status_payload)
+
+            # Confirm'dan keyin birinchi so'rov ATMOS'dan yangi holatni oladi va saqlaydi
+            response = await self.client.get(f"/users/payment/{transaction_id}/info/")
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertIs(response.json()["store_transaction"]["confirmed"], True)
+            self.assertIsNotNone((await self.payment(transaction_id)).status_payload)
+
+            # Keyingisi lokal yozuvdan — ATMOS'ga so'rov yuborilmaydi
+            requests_before = fake.stats["requests"]
+            response = await self.client.get(f"/users/payment/{transaction_id}/info/")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(fake.stats["requests"], requests_before)
+
+            response = await self.post("/users/payment/cancel/", {"transaction_id": transaction_id})
+            self.assertEqual(response.status_code, 200, response.content)
+            payment = await self.payment(transaction_id)
+            self.assertEqual(payment.status, "cancelled")
+            self.assertIsNone(payment.status_payload)
+            self.assertEqual(fake.transactions[int(transaction_id)]["status"], "reversed")
+
+    async def test_declined_confirm_releases_payment(self):
+        async with running_atmos() as fake:
+            transaction_id = await self.create_payment()
+            response = await self.pre_apply(transaction_id)
+            self.assertEqual(response.status_code, 200, response.content)
+
+            fake.config["decline_rate"] = 1.0
+            response = await self.confirm(transaction_id)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual((await self.payment(transaction_id)).status, "pre_applied")
+
+            # ATMOS tiklangach foydalanuvchi qayta urinishi mumkin
+            fake.config["decline_rate"] = 0.0
+            response = await self.confirm(transaction_id)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual((await self.payment(transaction_id)).status, "confirmed")
+
+    async def bind_card(self, card_number):
+        response = await self.post("/users/bind-card/init/", {"card_number": card_number, "expiry": "2812"})
+        self.assertEqual(response.status_code, 200, response.content)
+        return await self.post("/users/card/bind/confirm/", {
+            "transaction_id": response.json()["transaction_id"], "otp": "111111",
+        })
+
+    async def test_cards_with_same_masked_pan_are_not_duplicates(self):
+        # ATMOS PAN'ni maskalab qaytaradi: BIN va oxirgi 4 raqami bir xil ikki karta
+        async with running_atmos():
+            response = await self.bind_card("8600123411110001")
+            self.assertEqual(response.status_code, 200, response.content)
+            response = await self.bind_card("8600123422220001")
+            self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(await UserCard.objects.filter(user=self.user, status="verified").acount(), 2)
+
+    async def test_confirm_requires_pre_apply(self):
+        async with running_atmos():
+            transaction_id = await self.create_payment()
+            response = await self.confirm(transaction_id)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual((await self.payment(transaction_id)).status, "draft")
+
+
+CARD_DATA = {
+    "pan": "8600123412341234",
+    "expiry": "2812",
+    "card_holder": "TEST CARDHOLDER",
+    "phone": "998901234567",
+    "card_token": "token-abc",
+}
+
+
+class EncryptedFieldTests(TestCase):
+    """EncryptedTextField: o'zgargan maydon uchun bitta encrypt, o'qilgan maydon uchun bitta decrypt"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone="998900000002", full_name="Card Owner", role="client")
+
+    def create_card(self):
+        return UserCard.objects.create(user=self.user, transaction_id="tx-1", status="verified", **CARD_DATA)
+
+    def raw(self, model, pk, field):
+        return model.objects.filter(pk=pk).values_list(field, flat=True).get()
+
+    def test_create_encrypts_each_field_once(self):
+        with CryptoCalls() as calls:
+            card = self.create_card()
+        self.assertEqual(calls.counts, (len(CARD_DATA), 0))
+
+        for name, value in CARD_DATA.items():
+            stored = self.raw(UserCard, card.pk, name)
+            self.assertNotEqual(stored, value)
+            self.assertEqual(utils.decrypt_value(stored), value)
+
+    def test_load_decrypts_lazily_once_per_field(self):
+        card = self.create_card()
+
+        with CryptoCalls() as calls:
+            card = UserCard.objects.get(pk=card.pk)
+            self.assertEqual(calls.counts, (0, 0))
+            self.assertEqual(card.pan, CARD_DATA["pan"])
+            self.assertEqual(card.pan, CARD_DATA["pan"])
+            self.assertEqual(calls.counts, (0, 1))
+            self.assertEqual(card.get_decrypted_data(), CARD_DATA)
+        self.assertEqual(calls.counts, (0, len(CARD_DATA)))
+
+    def test_save_without_changes_does_not_reencrypt(self):
+        card = self.create_card()
+        stored = {name: self.raw(UserCard, card.pk, name) for name in CARD_DATA}
+
+        with CryptoCalls() as calls:
+            card = UserCard.objects.get(pk=card.pk)
+            card.status = "deleted"
+            card.save()
+            # O'qilgan va o'sha qiymat qayta berilgan maydon ham qayta shifrlanmaydi
+            card.pan = card.pan
+            card.save()
+        self.assertEqual(calls.counts, (0, 1))
+        self.assertEqual({name: self.raw(UserCard, card.pk, name) for name in CARD_DATA}, stored)
+
+    def test_changed_field_encrypted_once(self):
+        card = self.create_card()
+        token_before = self.raw(UserCard, card.pk, "card_token")
+
+        with CryptoCalls() as calls:
+            card = UserCard.objects.get(pk=card.pk)
+            card.pan = "8600999988887777"
+            card.save()
+            card.save()
+        self.assertEqual(calls.counts, (1, 0))
+        self.assertEqual(utils.decrypt_value(self.raw(UserCard, card.pk, "pan")), "8600999988887777")
+        self.assertEqual(self.raw(UserCard, card.pk, "card_token"), token_before)
+        self.assertEqual(card.pan_fingerprint, utils.blind_index("pan", "8600999988887777"))
+
+    def test_payment_fields(self):
+        with CryptoCalls() as calls:
+            payment = Payment.objects.create(
+                user=self.user, transaction_id="100001", amount=AMOUNT,
+                account="998901234567", store_id=str(STORE_ID), terminal_id=None,
+            )
+        # account va store_id: yangi ustun + eski kod uchun legacy_* (dual-write)
+        self.assertEqual(calls.counts, (4, 0))
+
+        with CryptoCalls() as calls:
+            payment = Payment.objects.get(pk=payment.pk)
+            payment.status = "confirmed"
+            payment.save(update_fields=["status"])
+            self.assertEqual(payment.account, "998901234567")
+            payment.save()
+        self.assertEqual(calls.counts, (0, 1))
+        self.assertEqual(
+            Payment.objects.filter(account_bidx=utils.blind_index("account", "998901234567")).count(), 1
+        )
+
+    def test_payment_legacy_columns(self):
+        payment = Payment.objects.create(
+            user=self.user, transaction_id="100002", amount=AMOUNT, account="998901234567", store_id=str(STORE_ID),
+        )
+        # Rollout paytidagi eski kod legacy ustundan decrypt_value(payment.account) qiladi
+        legacy = Payment.objects.filter(pk=payment.pk).values_list("legacy_account", flat=True).get()
+        self.assertEqual(utils.decrypt_value(legacy), "998901234567")
+
+        # Eski kod yozgan (yangi ustunlari bo'sh) qator legacy ustundan o'qiladi va saqlanganda ko'chadi
+        Payment.objects.filter(pk=payment.pk).update(account=None, store_id=None, account_bidx=None)
+        payment = Payment.objects.get(pk=payment.pk)
+        self.assertEqual((payment.account, payment.store_id), ("998901234567", str(STORE_ID)))
+        payment.save()
+        self.assertEqual(utils.decrypt_value(self.raw(Payment, payment.pk, "account")), "998901234567")
+        self.assertEqual(self.raw(Payment, payment.pk, "account_bidx"), utils.blind_index("account", "998901234567"))
+
+
+class WebhookConflictTests(TestCase):
+    """Lokal yakuniy statusdagi to'lovga kelgan ATMOS callback'i"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone="998900000003", full_name="Webhook Client", role="client")
+
+    def payment_with_callback(self, transaction_id, status):
+        payment = Payment.objects.create(
+            user=self.user, transaction_id=transaction_id, amount=AMOUNT,
+            account="998901234567", store_id=str(STORE_ID), status=status,
+        )
+        event = AtmosWebhookEvent.objects.create(
+            dedup_key=transaction_id, transaction_id=transaction_id,
+            payload={"store_id": STORE_ID, "transaction_id": transaction_id,
+                     "invoice": "998901234567", "amount": AMOUNT},
+        )
+        return payment, event
+
+    def test_paid_callback_confirms_expired_payment(self):
+        payment, event = self.payment_with_callback("200001", "expired")
+        self.assertEqual(process_pending(), (1, 1))
+
+        payment.refresh_from_db()
+        event.refresh_from_db()
+        self.assertEqual(payment.status, "confirmed")
+        self.assertEqual(event.status, AtmosWebhookEvent.STATUS_PROCESSED)
+
+    def test_paid_callback_for_cancelled_payment_is_conflict(self):
+        payment, event = self.payment_with_callback("200002", "cancelled")
+        with self.assertLogs("users.webhooks", level="ERROR"):
+            self.assertEqual(process_pending(), (1, 0))
+
+        payment.refresh_from_db()
+        event.refresh_from_db()
+        self.assertEqual(payment.status, "cancelled")
+        self.assertEqual(event.status, AtmosWebhookEvent.STATUS_CONFLICT)
+        self.assertTrue(event.error)
+
+    def test_duplicate_callback_for_confirmed_payment_is_ignored(self):
+        payment, event = self.payment_with_callback("200003", "confirmed")
+        self.assertEqual(process_pending(), (1, 0))
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, AtmosWebhookEvent.STATUS_IGNORED)
+
+
+MYID_RESPONSE = {"data": {"profile": {"common_data": {
+    "pinfl": "12345678901234", "first_name": "Ali", "last_name": "Valiyev",
+    "pass_data": "AA1234567", "birth_date": "01.01.1990",
+}}}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IdentityTests(TestCase):
+    """MyID ma'lumotlari user qatorida emas, UserIdentity jadvalida"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone="998900000004", full_name="Test Client", role="client")
+
+    def setUp(self):
+        self.headers = {"authorization": f"Bearer {RoleRefreshToken.for_user(self.user).access_token}"}
+
+    async def test_verify_writes_identity(self):
+        response_mock = mock.Mock(status_code=200, json=mock.Mock(return_value=MYID_RESPONSE))
+        with mock.patch.object(myid_client, "aget_data", mock.AsyncMock(return_value=response_mock)):
+            response = await AsyncClient(headers=self.headers).post(
+                "/users/verify/", {"code": "myid-code"}, content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["user"]["pinfl"], "12345678901234")
+
+        identity = await UserIdentity.objects.aget(user_id=self.user.pk)
+        self.assertEqual((identity.pinfl, identity.passport_seria), ("12345678901234", "AA1234567"))
+        self.assertEqual(identity.myid_data, MYID_RESPONSE)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertEqual((user.full_name, user.is_verified), ("Ali Valiyev", True))
+
+    def test_me_reads_identity(self):
+        User.objects.filter(pk=self.user.pk).update(is_verified=True)
+        UserIdentity.objects.create(
+            user=self.user, pinfl="12345678901234", passport_seria="AA1234567", myid_data=MYID_RESPONSE,
+        )
+        response = self.client.get("/users/my-data-view/", headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(data["user"]["pinfl"], "12345678901234")
+        self.assertEqual(data["user"]["passport_seria"], "AA1234567")
+        self.assertEqual(data["user"]["birth_date"], "01.01.1990")
+        self.assertEqual(data["myid_data"], MYID_RESPONSE)
+
+
+class IdentityMigrationTests(TransactionTestCase):
+    """0018: mavjud identity ustunlari UserIdentity'ga ko'chiriladi"""
+
+    migrate_from = [("users", "0017_atmoswebhookevent_payment_transaction_idx")]
+    migrate_to = [("users", "0018_useridentity")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_copies_identity_columns(self):
+        apps = self.migrate(self.migrate_from)
+        OldUser = apps.get_model("users", "AbstractUser")
+        with_data = OldUser.objects.create(
+            phone="998900000005", full_name="Identity", role="client",
+            pinfl="12345678901234", passport_seria="AA1234567", myid_data=MYID_RESPONSE,
+        )
+        OldUser.objects.create(phone="998900000006", full_name="No identity", role="client")
+
+        apps = self.migrate(self.migrate_to)
+        identities = apps.get_model("users", "UserIdentity").objects.all()
+        self.assertEqual([identity.user_id for identity in identities], [with_data.pk])
+        identity = identities[0]
+        self.assertEqual((identity.pinfl, identity.passport_seria), ("12345678901234", "AA1234567"))
+        self.assertEqual(identity.myid_data, MYID_RESPONSE)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AuthenticationTests(TestCase):
+    """ClaimsJWTAuthentication: keshdan to'liq user va har so'rovdagi is_active tekshiruvi"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone="998900000007", full_name="Test Client", role="client")
+
+    def setUp(self):
+        authentication.invalidate_user(self.user.pk)
+        self.headers = {"authorization": f"Bearer {RoleRefreshToken.for_user(self.user).access_token}"}
+
+    def test_cached_user_has_no_deferred_fields(self):
+        authentication.load_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = authentication.load_user(self.user.pk)
+            self.assertEqual(user.get_deferred_fields(), {"password"})
+            self.assertEqual((user.full_name, user.phone, user.status), ("Test Client", "998900000007", "idle"))
+
+    def test_inactive_user_rejected_when_view_does_not_load_user(self):
+        self.assertEqual(self.client.get("/users/bind-card/list/", headers=self.headers).status_code, 200)
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+        self.assertEqual(self.client.get("/users/bind-card/list/", headers=self.headers).status_code, 401)
@@ -0,0 +1,202 @@
+import logging
+import random
+import threading
+import time
+
+from django.core.cache import cache
+
+from config import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Bitta jarayon ichida bajarilayotgan token so'rovi; qolgan threadlar uning natijasini kutadi"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class TokenManager:
+    """
+    Tashqi provider (ATMOS, MyID) uchun client_credentials tokeni.
+
+    - Token jarayon xotirasida va umumiy keshda saqlanadi; oddiy so'rov tarmoqqa bormaydi.
+    - Muddati tugashiga ``refresh_ahead`` sekund qolganda token fonda yangilanadi
+      (timer yoki shu oynaga tushgan birinchi so'rov), so'rovlar eski tokenni ishlatishda davom etadi.
+    - Bitta jarayonda bir vaqtning o'zida faqat bitta yangilash (single-flight).
+    - Jarayonlar orasida ``cache.add`` lock: lockni olmagan jarayon amaldagi tokenni ishlatadi.
+      Hech bir thread ``sleep`` qilmaydi.
+
+    ``fetch()`` provider'dan yangi token oladi va ``(token_info: dict, expires_in: int)`` qaytaradi.
+    """
+
+    def __init__(self, name, fetch, refresh_ahead=300, lock_ttl=10, wait_timeout=10):
+        self.name = name
+        self.fetch = fetch
+        self.cache_key = f"{name}_access_token"
+        self.lock_key = f"{name}_token_lock"
+        self.refresh_ahead = refresh_ahead
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+
+        self._entry = None  # {"token": {...}, "expires_at": float}
+        self._flight = None
+        self._flight_lock = threading.Lock()
+        self._timer = None
+
+    # Public API
+
+    def get(self):
+        """Yaroqli token_info; token umuman bo'lmasa (birinchi so'rov) yangisi olinadi"""
+        entry = self._valid_entry()
+        if entry is None:
+            return self._refresh(blocking=True)["token"]
+
+        if self._needs_refresh(entry):
+            self._refresh(blocking=False)
+        return entry["token"]
+
+    def peek(self):
+        """Faqat xotiradagi yaroqli token (tarmoq va keshsiz), yo'q bo'lsa None — async kod uchun"""
+        entry = self._entry
+        if entry is None or entry["expires_at"] <= time.time():
+            return None
+        if self._needs_refresh(entry):
+            self._refresh(blocking=False)
+        return entry["token"]
+
+    def invalidate(self):
+        """Provider tokenni rad etsa (401): xotira va keshdagi nusxani o'chirish"""
+        self._entry = None
+        try:
+            cache.delete(self.cache_key)
+        except Exception:
+            logger.warning("%s: token cache delete failed", self.name)
+
+    # Internal
+
+    def _needs_refresh(self, entry):
+        return entry["expires_at"] - time.time() <= self.refresh_ahead
+
+    def _valid_entry(self):
+        now = time.time()
+        entry = self._entry
+        if entry and entry["expires_at"] > now:
+            return entry
+
+        entry = self._read_shared()
+        if entry and entry["expires_at"] > now:
+            self._adopt(entry)
+            return entry
+        return None
+
+    def _read_shared(self):
+        try:
+            entry = cache.get(self.cache_key)
+        except Exception:
+            logger.warning("%s: token cache read failed", self.name)
+            return None
+
+        if not entry:
+            return None
+        if "expires_at" not in entry:
+            # Eski formatdagi yozuv: yaroqli, lekin darhol fonda yangilanadi
+            return {"token": entry, "expires_at": time.time() + self.refresh_ahead}
+        return entry
+
+    def _adopt(self, entry):
+        self._entry = entry
+        self._schedule(entry["expires_at"])
+
+    def _schedule(self, expires_at):
+        """Keyingi yangilash uchun timer; jarayonlar bir vaqtda urilmasligi uchun jitter bilan"""
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = expires_at - time.time() - self.refresh_ahead * random.uniform(0.5, 1.0)
+        if delay <= 0:
+            return
+        self._timer = threading.Timer(delay, self._refresh, kwargs={"blocking": False})
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh(self, blocking):
+        with self._flight_lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+
+        if leader:
+            if blocking:
+                self._run_flight(flight)
+            else:
+                threading.Thread(target=self._run_flight, args=(flight,), daemon=True).start()
+                return None
+        elif not blocking:
+            return None
+        else:
+            # Yangilash shu jarayonda allaqachon ketmoqda — faqat uning natijasini kutamiz
+            flight.done.wait(self.wait_timeout)
+
+        if flight.error is not None:
+            raise flight.error
+        if flight.result is None:
+            raise Exception(f"{self.name} token refresh timed out")
+        return flight.result
+
+    def _run_flight(self, flight):
+        try:
+            flight.result = self._fetch_shared()
+        except Exception as exc:
+            logger.exception("%s token refresh failed", self.name)
+            metrics.incr(f"{self.name}_token_refresh_errors")
+            flight.error = exc
+        finally:
+            with self._flight_lock:
+                self._flight = None
+            flight.done.set()
+
+    def _fetch_shared(self):
+        # Boshqa jarayon allaqachon yangilagan bo'lishi mumkin
+        shared = self._read_shared()
+        if shared and not self._needs_refresh(shared):
+            self._adopt(shared)
+            return shared
+
+        lock_acquired = self._acquire_lock()
+        if not lock_acquired:
+            current = shared if shared and shared["expires_at"] > time.time() else self._entry
+            if current and current["expires_at"] > time.time():
+                # Boshqa jarayon yangilamoqda; hozircha amaldagi token yetarli
+                return current
+            # Yaroqli token umuman yo'q: kutmasdan o'zimiz olamiz
+
+        try:
+            token_info, expires_in = self.fetch()
+            metrics.incr(f"{self.name}_token_refresh")
+            entry = {"token": token_info, "expires_at": time.time() + int(expires_in)}
+            try:
+                cache.set(self.cache_key, entry, max(int(expires_in) - 5, 60))
+            except Exception:
+                logger.warning("%s: failed to cache token; continuing without cache.", self.name)
+            self._adopt(entry)
+            return entry
+        finally:
+            if lock_acquired:
+                self._release_lock()
+
+    def _acquire_lock(self):
+        try:
+            return cache.add(self.lock_key, "1", timeout=self.lock_ttl)
+        except Exception:
+            logger.warning("%s: cache lock acquisition failed.", self.name)
+            return False
+
+    def _release_lock(self):
+        try:
+            cache.delete(self.lock_key)
+        except Exception:
+            logger.warning("%s: cache lock release failed.", self.name)
@@ -0,0 +1,15 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    ``role`` claimi bilan refresh token. Undan olingan access token ham
+    ``user_id`` va ``role`` ni olib yuradi, shuning uchun WebSocket va permission
+    tekshiruvlari foydalanuvchini bazadan o'qimasdan ishlaydi.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["role"] = user.role
+        return token
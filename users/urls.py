@@ -3,7 +3,7 @@ from django.urls import path
 from users.views import MyIDCreateSessionView, MyIDSessionStatusView, MyIDVerifyView, MyIDGetTokenView, \
     MyIDClientCredentialsView, MeView, BindCardInitView, BindCardConfirmView, BindCardListView, BindCardDeleteView, \
     CreatePaymentTransactionView, PreApplyView, TestAtmosTokenView, ConfirmPaymentView, GetTransactionInfoView, \
-    CancelTransactionView
+    CancelTransactionView, AtmosWebhookView
 
 urlpatterns = [
     path("get-token/", MyIDGetTokenView.as_view(), name="myid-get-token"),
@@ -37,6 +37,9 @@ urlpatterns = [
     # Bu endpoint orqali mavjud tranzaksiyani bekor qilish mumkin
     path("payment/cancel/", CancelTransactionView.as_view(), name="payment_cancel"),
 
+    # ATMOS to'lov callback'i (webhook)
+    path("atmos/callback/", AtmosWebhookView.as_view(), name="atmos_callback"),
+
     # GET ATMOS token
     path("atmos-test-token/", TestAtmosTokenView.as_view(), name="atmos_test_token"),
 
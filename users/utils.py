@@ -1,8 +1,12 @@
-from cryptography.fernet import Fernet
+import hashlib
+import hmac
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from config import settings
 
-# 32 byte secret base64 bilan
-fernet = Fernet(settings.CRYPTO_KEY)
+# 32 byte secret base64 bilan. Shifrlash CRYPTO_KEYS[0] bilan, decrypt — istalgan kalit bilan
+primary_fernet = Fernet(settings.CRYPTO_KEYS[0])
+fernet = MultiFernet([Fernet(key) for key in settings.CRYPTO_KEYS])
 
 def encrypt_value(value):
     if value is None:
@@ -14,3 +18,51 @@ def decrypt_value(value: str) -> str:
     if not value:
         return ""
     return fernet.decrypt(value.encode()).decode()
+
+
+# Fernet token'i: base64(0x80 versiya bayti + vaqt) — shu bilan boshlanmagan qiymat plaintext
+FERNET_PREFIX = "gAAAAA"
+
+
+def unwrap_value(value):
+    """
+    Eski kod bir necha marta shifrlagan qiymatdan plaintext (har qavatda decrypt).
+    Qaytaradi: (qiymat, olib tashlangan qavatlar)
+    """
+    layers = 0
+    while isinstance(value, str) and value.startswith(FERNET_PREFIX) and layers < 5:
+        try:
+            value = decrypt_value(value)
+        except InvalidToken:
+            break
+        layers += 1
+    return value, layers
+
+
+def rotate_value(value):
+    """
+    Eski kalit bilan shifrlangan qiymatni primary kalitga o'tkazish.
+    Allaqachon primary kalit bilan shifrlangan yoki bo'sh bo'lsa None.
+    """
+    if not value:
+        return None
+    token = value.encode()
+    try:
+        primary_fernet.decrypt(token)
+        return None
+    except InvalidToken:
+        return fernet.rotate(token).decode()
+
+
+def blind_index(purpose, value):
+    """
+    Deterministik HMAC-SHA256 (hex) — shifrlangan qiymatni decrypt qilmasdan tenglik bo'yicha qidirish.
+    ``purpose`` (ustun nomi) har xil ustunlardagi bir xil qiymatlarni bog'lab bo'lmasligi uchun.
+    """
+    if value is None:
+        return None
+    value = "".join(str(value).split())
+    if not value:
+        return None
+    message = f"{purpose}:{value}".encode()
+    return hmac.new(settings.BLIND_INDEX_KEY.encode(), message, hashlib.sha256).hexdigest()
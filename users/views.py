@@ -1,56 +1,59 @@
 import logging
 import requests
+from asgiref.sync import sync_to_async
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.throttling import UserRateThrottle
 from django.db import transaction
 
-from .utils import decrypt_value, encrypt_value
-
 logger = logging.getLogger(__name__)
 from rest_framework import status, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from config import settings
-from rest_framework_simplejwt.tokens import RefreshToken
-
-from .models import UserCard, Payment
-from .myid_helper import get_myid_access_token
+from config.async_views import AsyncAPIView, AsyncGenericAPIView
+from config.idempotency import idempotent
+from .tokens import RoleRefreshToken
+from .utils import blind_index
+
+from .cards import display_data, display_fields
+from .models import AtmosWebhookEvent, UserCard, UserIdentity, Payment
+from .http import ProviderUnavailable
+from . import myid_sessions
+from .myid_helper import myid_client
+from .payments import is_fresh, record_statuses
 from .serializer import (
     MyIDSessionCreateSerializer,
     MyIDVerifySerializer,
     MyIDSessionStatusSerializer, BindCardInitSerializer, BindCardConfirmSerializer, BindCardDeleteSerializer,
     CreatePaymentSerializer, PreApplySerializer, ConfirmPaymentSerializer, CancelTransactionSerializer
 )
-from .service import AtmosService, AtmosAPI
+from .service import AtmosService, AtmosAPI, atmos_http
+from .webhooks import build_event, verify
 
 
 # Access tokenni olish uchun (agar alohida test qilmoqchi bo‘lsangiz)
-class MyIDGetTokenView(APIView):
-    def get(self, request):
+class MyIDGetTokenView(AsyncAPIView):
+    async def get(self, request):
         try:
-            token = get_myid_access_token()
+            token = await myid_client.aaccess_token()
             return Response({"access_token": token}, status=200)
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
 
 # Session yaratish (foydalanuvchi ma’lumotlari asosida)
-class MyIDCreateSessionView(APIView):
+class MyIDCreateSessionView(AsyncAPIView):
     """
      Sessiya yaratish — MyID orqali shaxsni tasdiqlashni boshlash
     """
     permission_classes = [AllowAny]
 
-    def post(self, request):
+    async def post(self, request):
         serializer = MyIDSessionCreateSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         data = serializer.validated_data
 
-        access_token = get_myid_access_token()
-
-        url = f"{settings.MYID_BASE_URL}/v2/sdk/sessions"
-        headers = {"Authorization": f"Bearer {access_token}"}
         body = {
             "phone_number": data.get("phone_number"),
             "birth_date": str(data.get("birth_date")) if data.get("birth_date") else None,
@@ -59,7 +62,11 @@ class MyIDCreateSessionView(APIView):
             "pinfl": data.get("pinfl"),
         }
 
-        res = requests.post(url, json=body, headers=headers)
+        try:
+            res = await myid_client.acreate_session(body)
+        except requests.RequestException:
+            logger.exception("MyID create session failed")
+            return Response({"detail": "MyID vaqtincha ishlamayapti"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         if res.status_code != 200:
             return Response({
                 "detail": "Session yaratishda xatolik",
@@ -67,6 +74,9 @@ class MyIDCreateSessionView(APIView):
             }, status=res.status_code)
 
         session_id = res.json().get("session_id")
+        if session_id:
+            # Status endi serverda kuzatiladi (watch_myid_sessions), o'zgarishi WebSocket orqali yuboriladi
+            await sync_to_async(myid_sessions.track)(session_id, getattr(request.user, "id", None))
 
         return Response({
             "message": "Session created successfully",
@@ -76,20 +86,26 @@ class MyIDCreateSessionView(APIView):
 
 
 #  Session statusni tekshirish (session_id orqali)
-class MyIDSessionStatusView(APIView):
+class MyIDSessionStatusView(AsyncAPIView):
 
     permission_classes = [AllowAny]
 
-    def post(self, request):
+    async def post(self, request):
         serializer = MyIDSessionStatusSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         session_id = serializer.validated_data["session_id"]
 
-        access_token = get_myid_access_token()
-        url = f"{settings.MYID_BASE_URL}/v1/sdk/sessions/{session_id}"
-        headers = {"Authorization": f"Bearer {access_token}"}
+        # Watcher yozgan status — MyID'ga so'rov yuborilmaydi
+        state = await sync_to_async(myid_sessions.get)(session_id)
+        if state and state["status"] is not None:
+            return Response({"status": state["status"], "data": state["data"]}, status=200)
 
-        res = requests.get(url, headers=headers)
+        # Sessiya hali so'ralmagan yoki kuzatuvda yo'q (masalan, deploydan oldin yaratilgan)
+        try:
+            res = await myid_client.asession_status(session_id)
+        except requests.RequestException:
+            logger.exception("MyID session status failed")
+            return Response({"detail": "MyID vaqtincha ishlamayapti"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
         if res.status_code != 200:
             return Response({
@@ -98,33 +114,32 @@ class MyIDSessionStatusView(APIView):
                 "myid_response": res.text
             }, status=res.status_code)
 
+        data = res.json()
+        await sync_to_async(myid_sessions.record)(session_id, data.get("status"), data, getattr(request.user, "id", None))
         return Response({
-            "status": res.json().get("status"),
-            "data": res.json()
+            "status": data.get("status"),
+            "data": data
         }, status=200)
 
 
 
-class MyIDVerifyView(APIView):
+class MyIDVerifyView(AsyncAPIView):
     """
     Foydalanuvchini MyID orqali tasdiqlash
     """
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         serializer = MyIDVerifySerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         code = serializer.validated_data["code"]
 
-        # MyID tokenni olish
-        access_token = get_myid_access_token()
-        if not access_token:
-            return Response({"detail": "MyID tokenni olishda xatolik"}, status=400)
-
-        # MyID API’dan ma’lumot olish
-        url = f"{settings.MYID_BASE_URL}/v1/sdk/data?code={code}"
-        headers = {"Authorization": f"Bearer {access_token}"}
-        res = requests.get(url, headers=headers)
+        # MyID API’dan ma’lumot olish (token MyIDClient ichida)
+        try:
+            res = await myid_client.aget_data(code)
+        except requests.RequestException:
+            logger.exception("MyID data request failed")
+            return Response({"detail": "MyID vaqtincha ishlamayapti"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         if res.status_code != 200:
             return Response({
                 "detail": "MyID ma'lumot olishda xatolik",
@@ -149,24 +164,27 @@ class MyIDVerifyView(APIView):
 
         # Foydalanuvchini olish va yangilash
         user = request.user
-        user.pinfl = pinfl
         user.full_name = f"{first_name} {last_name}"
-        user.passport_seria = passport_number
-        user.birth_date = birth_date
         user.is_verified = True
-        user.myid_data = response_data  # ✅ ENG MUHIM QO‘SHIMCHA
-        user.save()
+        await user.asave()
+
+        # MyID javobi va pasport ma'lumotlari alohida jadvalda (user qatori yengil qoladi)
+        identity, _ = await UserIdentity.objects.aupdate_or_create(user=user, defaults={
+            "pinfl": pinfl,
+            "passport_seria": passport_number,
+            "myid_data": response_data,
+        })
 
         # Tokenlar
-        refresh = RefreshToken.for_user(user)
+        refresh = RoleRefreshToken.for_user(user)
 
         return Response({
             "message": "User verified successfully",
             "user": {
                 "id": user.id,
                 "full_name": user.full_name,
-                "pinfl": user.pinfl,
-                "passport_seria": user.passport_seria,
+                "pinfl": identity.pinfl,
+                "passport_seria": identity.passport_seria,
                 "birth_date": birth_date,
                 "phone": user.phone,
                 "is_verified": user.is_verified
@@ -175,7 +193,7 @@ class MyIDVerifyView(APIView):
                 "refresh": str(refresh),
                 "access": str(refresh.access_token)
             },
-            "myid_data": user.myid_data  # endi bazadan olinadi
+            "myid_data": identity.myid_data
         }, status=200)
 
 
@@ -205,13 +223,15 @@ class MeView(APIView):
             return Response({"detail": "Foydalanuvchi tasdiqlanmagan"}, status=403)
 
         # Tokenlar yaratish
-        refresh = RefreshToken.for_user(user)
+        refresh = RoleRefreshToken.for_user(user)
+
+        identity = UserIdentity.objects.filter(user=user).first() or UserIdentity(user=user)
 
         # Tug‘ilgan sana (MyID dagidek bo‘lishi uchun)
         birth_date = None
-        if user.myid_data:
+        if identity.myid_data:
             birth_date = (
-                user.myid_data.get("data", {})
+                identity.myid_data.get("data", {})
                 .get("profile", {})
                 .get("common_data", {})
                 .get("birth_date")
@@ -221,8 +241,8 @@ class MeView(APIView):
         user_data = {
             "id": user.id,
             "full_name": user.full_name,
-            "pinfl": user.pinfl,
-            "passport_seria": user.passport_seria or "",
+            "pinfl": identity.pinfl,
+            "passport_seria": identity.passport_seria or "",
             "birth_date": birth_date,
             "phone": user.phone,
             "is_verified": user.is_verified,
@@ -237,7 +257,7 @@ class MeView(APIView):
                     "refresh": str(refresh),
                     "access": str(refresh.access_token),
                 },
-                "myid_data": user.myid_data,  # JSONField dan to‘g‘ridan-to‘g‘ri
+                "myid_data": identity.myid_data,
             },
             status=200,
         )
@@ -264,32 +284,34 @@ class CardBindThrottle(UserRateThrottle):
     rate = "5/min"  # User 1 daqiqada faqat 5 marta init qilishi mumkin
 
 
-class BindCardInitView(generics.GenericAPIView):
+class BindCardInitView(AsyncGenericAPIView):
     serializer_class = BindCardInitSerializer
     permission_classes = [IsAuthenticated]
     throttle_classes = [CardBindThrottle]
 
-    def post(self, request):
+    async def post(self, request):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
 
         payload = serializer.validated_data
 
         # Prevent duplicate card binding attempts
-        if UserCard.objects.filter(user=request.user, status="pending").exists():
+        if await UserCard.objects.filter(user=request.user, status="pending").aexists():
             return Response(
                 {"error": "Sizda hali tugallanmagan karta tasdiqlash jarayoni mavjud"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         # Call ATMOS API through safe service layer
-        result, code = AtmosService.send_request(
+        result, code = await AtmosService.asend_request(
             method="POST",
             url=f"{settings.ATMOS_BASE_URL.rstrip('/')}/partner/bind-card/init",
             payload=payload
         )
 
         # If ATMOS failed
+        if code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         if code != 200 or result.get("result", {}).get("code") != "OK":
             logger.warning("BindCardInit ERROR: %s", result)
             return Response({"error": result}, status=status.HTTP_400_BAD_REQUEST)
@@ -303,7 +325,7 @@ class BindCardInitView(generics.GenericAPIView):
             )
 
         # Create pending record safely
-        UserCard.objects.create(
+        await UserCard.objects.acreate(
             user=request.user,
             transaction_id=transaction_id,
             status="pending"
@@ -325,23 +347,24 @@ class BindCardInitView(generics.GenericAPIView):
         )
 
 # Bind Card confirm views
-class BindCardConfirmView(generics.GenericAPIView):
+class BindCardConfirmView(AsyncGenericAPIView):
     serializer_class = BindCardConfirmSerializer
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        # validate_transaction_id bazaga murojaat qiladi
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         payload = serializer.validated_data
 
         transaction_id = payload.get("transaction_id")
 
         # 1) Transaction ID userga tegishli ekanligini tekshirish
-        user_card = UserCard.objects.filter(
+        user_card = await UserCard.objects.filter(
             user=request.user,
             transaction_id=transaction_id,
             status="pending",
-        ).first()
+        ).afirst()
 
         if not user_card:
             return Response(
@@ -350,12 +373,14 @@ class BindCardConfirmView(generics.GenericAPIView):
             )
 
         # 2) ATMOS orqali confirm qilish
-        result, code = AtmosService.send_request(
+        result, code = await AtmosService.asend_request(
             method="POST",
             url=f"{settings.ATMOS_BASE_URL.rstrip('/')}/partner/bind-card/confirm",
             payload=payload
         )
 
+        if code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         if code != 200 or result.get("result", {}).get("code") != "OK":
             logger.warning("BindCardConfirm API error for user_id=%s, tx=%s", request.user.id, transaction_id)
             return Response({"error": result}, status=status.HTTP_400_BAD_REQUEST)
@@ -371,43 +396,38 @@ class BindCardConfirmView(generics.GenericAPIView):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
 
-        # 4) Duplicate card token check (shifrlangan token bilan)
-        encrypted_token = encrypt_value(card_data.get("card_token"))
-        if UserCard.objects.filter(
+        # 4) Duplicate card check — card_token blind index'i bo'yicha, decrypt qilinmaydi.
+        # PAN bo'yicha emas: ATMOS maskalangan PAN qaytaradi, BIN va oxirgi 4 raqami bir xil
+        # boshqa kartalar ham dublikat bo'lib chiqardi
+        card_token = card_data.get("card_token")
+        if await UserCard.objects.filter(
+            card_token_bidx=blind_index("card_token", card_token),
             user=request.user,
-            card_token=encrypted_token,
             status="verified"
-        ).exists():
+        ).aexists():
             return Response(
                 {"error": "Bu karta allaqachon qo‘shilgan"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # 5) Save encrypted data safely
-        user_card.pan = encrypt_value(card_data.get("pan"))
-        user_card.card_token = encrypted_token
-        user_card.expiry = encrypt_value(card_data.get("expiry"))
-        user_card.card_holder = encrypt_value(card_data.get("card_holder", ""))
-        user_card.phone = encrypt_value(card_data.get("phone", ""))
+        # 5) Save — EncryptedTextField saqlashda bir marta shifrlaydi
+        user_card.pan = card_data.get("pan")
+        user_card.card_token = card_token
+        user_card.expiry = card_data.get("expiry")
+        user_card.card_holder = card_data.get("card_holder", "")
+        user_card.phone = card_data.get("phone", "")
+        for field, value in display_fields(card_data).items():
+            setattr(user_card, field, value)
         user_card.status = "verified"
-        user_card.save()
+        await user_card.asave()
 
         logger.info(
             "Card verified for user_id=%s tx=%s", request.user.id, transaction_id
         )
 
-        # 6) Response uchun masked card tayyorlash
-        full_pan = decrypt_value(user_card.pan)
-        masked_card = f"{'*' * (len(full_pan) - 4)}{full_pan[-4:]}"  # ****1234
-
-        decrypted = {
-            "masked_card": masked_card,
-            "expiry": decrypt_value(user_card.expiry),
-            "card_holder": decrypt_value(user_card.card_holder),
-        }
-
+        # 6) Response — display ustunlaridan (decrypt qilinmaydi)
         return Response(
-            {"message": "Karta muvaffaqiyatli tasdiqlandi", **decrypted},
+            {"message": "Karta muvaffaqiyatli tasdiqlandi", **display_data(user_card)},
             status=status.HTTP_200_OK,
         )
 
@@ -424,48 +444,32 @@ class BindCardListView(generics.ListAPIView):
 
     def get_queryset(self):
         # Faqat verified va userga tegishli kartalar
+        # Shifrlangan ustunlar o'qilmaydi — faqat display ustunlari (user, status indeksi bo'yicha)
         return UserCard.objects.filter(
             user=self.request.user,
             status="verified"
-        ).only("card_id", "pan", "expiry", "card_holder", "phone")  # DB-da pan shifrlangan
+        ).only(
+            "card_id", "masked_pan", "last4", "brand", "expiry_month", "expiry_year", "masked_holder", "masked_phone",
+        ).order_by("id")
 
     def list(self, request, *args, **kwargs):
         page = self.paginate_queryset(self.get_queryset())
-        data = []
-
-        for card in page:
-            # 1) Panni decrypt qilish va masked_card tayyorlash
-            full_pan = decrypt_value(card.pan)
-            masked_card = f"{'*' * (len(full_pan) - 4)}{full_pan[-4:]}"  # ****1234
-
-            # 2) Boshqa maydonlarni decrypt qilish
-            decrypted_expiry = decrypt_value(card.expiry)
-            decrypted_holder = decrypt_value(card.card_holder)
-            decrypted_phone = decrypt_value(card.phone)
-
-            data.append({
-                "card_id": card.card_id,
-                "masked_card": masked_card,
-                "expiry": decrypted_expiry,
-                "card_holder": decrypted_holder,
-                "phone": decrypted_phone,
-            })
-
+        data = [display_data(card) for card in page]
         return self.get_paginated_response({"cards": data})
 
 # Card delete views
-class BindCardDeleteView(generics.GenericAPIView):
+class BindCardDeleteView(AsyncGenericAPIView):
     serializer_class = BindCardDeleteSerializer
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         payload = serializer.validated_data
 
         # 1) Ownership va status tekshiruvi
         try:
-            user_card = UserCard.objects.get(
+            user_card = await UserCard.objects.aget(
                 user=request.user,
                 card_id=payload["card_id"],
                 status="verified"
@@ -478,15 +482,17 @@ class BindCardDeleteView(generics.GenericAPIView):
 
         # 2) ATMOS API chaqiruv (token va pan shifrlangan)
         url = f"{settings.ATMOS_BASE_URL.rstrip('/')}/partner/remove-card"
-        headers = AtmosAPI.make_headers()
+        headers = await AtmosAPI.amake_headers()
         body = {
             "id": user_card.card_id,
-            "token": decrypt_value(user_card.card_token)  # tokenni decrypt qilib yuboramiz
+            "token": user_card.card_token  # faqat shu yerda decrypt qilinadi
         }
 
         try:
-            response = requests.post(url, json=body, headers=headers, timeout=AtmosAPI.TIMEOUT)
+            response = await atmos_http.apost(url, json=body, headers=headers)
             data = response.json()
+        except ProviderUnavailable:
+            return Response({"error": "ATMOS temporarily unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except requests.RequestException:
             logger.exception("BindCardDelete failed for user_id=%s card_id=%s", request.user.id, user_card.card_id)
             return Response({"error": "ATMOS API request failed"}, status=status.HTTP_400_BAD_REQUEST)
@@ -498,27 +504,29 @@ class BindCardDeleteView(generics.GenericAPIView):
             logger.warning("BindCardDelete API error for user_id=%s card_id=%s: %s", request.user.id, user_card.card_id, data)
             return Response({"error": data}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 3) Atomic update — sensitive ma'lumotlarni tozalash va statusni o'zgartirish
-        with transaction.atomic():
-            user_card.status = "deleted"
-            user_card.card_token = None
-            user_card.pan = None
-            user_card.expiry = None
-            user_card.card_holder = None
-            user_card.phone = None
-            user_card.save()
+        # 3) Sensitive ma'lumotlarni tozalash va statusni o'zgartirish (bitta UPDATE)
+        user_card.status = "deleted"
+        user_card.card_token = None
+        user_card.pan = None
+        user_card.expiry = None
+        user_card.card_holder = None
+        user_card.phone = None
+        user_card.masked_holder = ""
+        user_card.masked_phone = ""
+        await user_card.asave()
 
         return Response({"message": "Karta muvaffaqiyatli o‘chirildi"}, status=status.HTTP_200_OK)
 
 
 # Payment create views
-class CreatePaymentTransactionView(generics.GenericAPIView):
+class CreatePaymentTransactionView(AsyncGenericAPIView):
     serializer_class = CreatePaymentSerializer
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    @idempotent()
+    async def post(self, request):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         payload = serializer.validated_data
 
         # 1) Basic validation
@@ -527,11 +535,10 @@ class CreatePaymentTransactionView(generics.GenericAPIView):
 
         # 2) ATMOS API call
         try:
-            response = requests.post(
+            response = await atmos_http.apost(
                 f"{settings.ATMOS_BASE_URL.rstrip('/')}/merchant/pay/create",
                 json=payload,
-                headers=AtmosAPI.make_headers(),
-                timeout=AtmosAPI.TIMEOUT
+                headers=await AtmosAPI.amake_headers(),
             )
             try:
                 data = response.json()
@@ -539,6 +546,8 @@ class CreatePaymentTransactionView(generics.GenericAPIView):
                 logger.exception("ATMOS CreatePaymentTransaction JSON parse failed")
                 return Response({"error": "Invalid response from ATMOS API"}, status=status.HTTP_502_BAD_GATEWAY)
 
+        except ProviderUnavailable:
+            return Response({"error": "ATMOS temporarily unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except requests.RequestException:
             logger.exception("ATMOS CreatePaymentTransaction request failed for user %s", request.user.id)
             return Response({"error": "ATMOS API request failed"}, status=status.HTTP_502_BAD_GATEWAY)
@@ -554,22 +563,12 @@ class CreatePaymentTransactionView(generics.GenericAPIView):
             return Response({"error": "ATMOS returned no transaction_id"}, status=status.HTTP_502_BAD_GATEWAY)
 
         # 4) Save payment with encryption
-        with transaction.atomic():
-            if Payment.objects.filter(transaction_id=transaction_id).exists():
-                return Response({"error": "Transaction already exists"}, status=status.HTTP_409_CONFLICT)
-
-            payment = Payment.objects.create(
-                user=request.user,
-                transaction_id=transaction_id,
-                amount=payload.get("amount"),
-                account=encrypt_value(payload.get("account")),
-                store_id=encrypt_value(payload.get("store_id")),
-                terminal_id=encrypt_value(payload.get("terminal_id")),
-                status="draft"
-            )
+        payment = await sync_to_async(self.save_payment)(request.user, transaction_id, payload)
+        if payment is None:
+            return Response({"error": "Transaction already exists"}, status=status.HTTP_409_CONFLICT)
 
         # 5) Mask sensitive account for response
-        full_account = decrypt_value(payment.account)
+        full_account = str(payment.account or "")
         masked_account = f"{'*' * (len(full_account) - 4)}{full_account[-4:]}"  # ****1234
 
         return Response(
@@ -584,14 +583,33 @@ class CreatePaymentTransactionView(generics.GenericAPIView):
 
 
 
+    @staticmethod
+    def save_payment(user, transaction_id, payload):
+        """Qaytaradi: yangi Payment yoki None (transaction_id allaqachon mavjud)"""
+        with transaction.atomic():
+            if Payment.objects.filter(transaction_id=transaction_id).exists():
+                return None
+
+            return Payment.objects.create(
+                user=user,
+                transaction_id=transaction_id,
+                amount=payload.get("amount"),
+                account=payload.get("account"),
+                store_id=payload.get("store_id"),
+                terminal_id=payload.get("terminal_id"),
+                status="draft"
+            )
+
+
 # PreApply, Confirm, Cancel va GetTransactionInfo
-class PreApplyView(generics.GenericAPIView):
+class PreApplyView(AsyncGenericAPIView):
     serializer_class = PreApplySerializer
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    @idempotent()
+    async def post(self, request):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         payload = serializer.validated_data
 
         if payload["amount"] <= 0:
@@ -602,7 +620,7 @@ class PreApplyView(generics.GenericAPIView):
 
         # ATMOS PRE-APPLY
         try:
-            result, code = AtmosService.pre_apply(payload)
+            result, code = await AtmosService.apre_apply(payload)
         except Exception as e:
             logger.exception("ATMOS PreApply failed")
             return Response(
@@ -610,6 +628,8 @@ class PreApplyView(generics.GenericAPIView):
                 status=status.HTTP_502_BAD_GATEWAY
             )
 
+        if code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         if code != 200 or result.get("result", {}).get("code") != "OK":
             return Response(
                 {"error": result},
@@ -620,11 +640,20 @@ class PreApplyView(generics.GenericAPIView):
         atmos_tx_id = result.get("transaction_id") or payload["transaction_id"]
 
         # DB UPDATE
+        error = await sync_to_async(self.mark_pre_applied)(request.user, payload["transaction_id"])
+        if error:
+            return error
+
+        return Response(result, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def mark_pre_applied(user, transaction_id):
+        """draft -> pre_applied; xato bo'lsa Response qaytaradi"""
         with transaction.atomic():
             payment = (
                 Payment.objects
                 .select_for_update()
-                .filter(transaction_id=payload["transaction_id"], user=request.user)
+                .filter(transaction_id=transaction_id, user=user)
                 .order_by("-id")
                 .first()
             )
@@ -643,17 +672,16 @@ class PreApplyView(generics.GenericAPIView):
 
             payment.status = "pre_applied"
             payment.save()
-
-        return Response(result, status=status.HTTP_200_OK)
+        return None
 
 
-class ConfirmPaymentView(generics.GenericAPIView):
+class ConfirmPaymentView(AsyncGenericAPIView):
     serializer_class = ConfirmPaymentSerializer
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         payload = serializer.validated_data
 
         transaction_id = payload.get("transaction_id")
@@ -663,76 +691,105 @@ class ConfirmPaymentView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # DB LOCK
-        with transaction.atomic():
-            payment = (
-                Payment.objects
-                .select_for_update()
-                .filter(transaction_id=transaction_id, user=request.user)
-                .order_by("-id")
-                .first()
-            )
+        payment = await (
+            Payment.objects
+            .filter(transaction_id=transaction_id, user=request.user)
+            .order_by("-id")
+            .afirst()
+        )
 
-            if not payment:
-                return Response(
-                    {"error": "Payment not found"},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+        if not payment:
+            return Response(
+                {"error": "Payment not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-            # STATUS CHECK
-            if payment.status == "confirmed":
-                return Response(
-                    {"error": "Payment already confirmed"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        # STATUS CHECK
+        if payment.status == "confirmed":
+            return Response(
+                {"error": "Payment already confirmed"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            if payment.status != "pre_applied":
-                return Response(
-                    {"error": f"Invalid payment state: {payment.status}"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        # CLAIM: pre_applied -> confirming shartli UPDATE bilan. ATMOS javobini kutish
+        # paytida qator lock qilinmaydi, parallel confirm esa "confirming" holatini ko'radi.
+        claimed = await (
+            Payment.objects
+            .filter(pk=payment.pk, status="pre_applied")
+            .aupdate(status="confirming", status_payload=None)
+        )
+        if not claimed:
+            await payment.arefresh_from_db(fields=["status"])
+            return Response(
+                {"error": f"Invalid payment state: {payment.status}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            # ATMOS CONFIRM
-            try:
-                result, code = AtmosService.confirm_payment(payload)
-            except Exception:
-                logger.exception("ATMOS Confirm failed")
-                return Response(
-                    {"error": "ATMOS Confirm failed"},
-                    status=status.HTTP_502_BAD_GATEWAY
-                )
+        # ATMOS CONFIRM
+        try:
+            result, code = await AtmosService.aconfirm_payment(payload)
+        except Exception:
+            logger.exception("ATMOS Confirm failed")
+            await self.release(payment)
+            return Response(
+                {"error": "ATMOS Confirm failed"},
+                status=status.HTTP_502_BAD_GATEWAY
+            )
 
-            if code != 200 or result.get("result", {}).get("code") != "OK":
-                return Response(
-                    {"error": result},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        if code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            await self.release(payment)
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if code != 200 or result.get("result", {}).get("code") != "OK":
+            await self.release(payment)
+            return Response(
+                {"error": result},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            # FINAL CONFIRM
-            payment.status = "confirmed"
+        # FINAL CONFIRM. Eski ATMOS javobi (pending) endi noto'g'ri — GetTransactionInfo qayta so'raydi
+        payment.status = "confirmed"
+        payment.status_payload = None
+        update_fields = ["status", "status_payload"]
 
-            if "account" in payload:
-                payment.account = encrypt_value(str(payload["account"]))
-            if "store_id" in payload:
-                payment.store_id = encrypt_value(str(payload["store_id"]))
-            if "terminal_id" in payload:
-                payment.terminal_id = encrypt_value(str(payload["terminal_id"]))
+        if "account" in payload:
+            payment.account = str(payload["account"])
+            update_fields += ["account", "account_bidx"]
+        if "store_id" in payload:
+            payment.store_id = str(payload["store_id"])
+            update_fields.append("store_id")
+        if "terminal_id" in payload:
+            payment.terminal_id = str(payload["terminal_id"])
+            update_fields.append("terminal_id")
 
-            payment.save()
+        await payment.asave(update_fields=update_fields)
 
         return Response(result, status=status.HTTP_200_OK)
 
+    @staticmethod
+    async def release(payment):
+        """ATMOS tasdiqlamadi: confirming -> pre_applied, foydalanuvchi qayta urinishi mumkin"""
+        await (
+            Payment.objects
+            .filter(pk=payment.pk, status="confirming")
+            .aupdate(status="pre_applied", status_payload=None)
+        )
+
 
-class GetTransactionInfoView(generics.GenericAPIView):
+class GetTransactionInfoView(AsyncGenericAPIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, order_id):
+    async def get(self, request, order_id):
         # Business validation: check if transaction exists
-        if not Payment.objects.filter(transaction_id=order_id, user=request.user).exists():
+        payment = await Payment.objects.filter(transaction_id=order_id, user=request.user).order_by("-id").afirst()
+        if not payment:
             return Response({"error": "Transaction not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        # Yakuniy yoki yaqinda tekshirilgan holat — ATMOS ga bormasdan (reconcile_payments yangilab turadi)
+        if is_fresh(payment):
+            return Response(payment.status_payload, status=status.HTTP_200_OK)
+
         try:
-            result, code = AtmosService.check_status(order_id)
+            result, code = await AtmosService.acheck_status(order_id)
         except requests.RequestException as e:
             logger.exception("ATMOS check_status request failed for user %s, transaction %s", request.user.id, order_id)
             return Response({"error": "ATMOS API request failed"}, status=status.HTTP_502_BAD_GATEWAY)
@@ -743,29 +800,33 @@ class GetTransactionInfoView(generics.GenericAPIView):
             logger.exception("GetTransactionInfo failed for user %s, transaction %s", request.user.id, order_id)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        if code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         if code != 200:
             logger.warning("ATMOS check_status returned HTTP %s for user %s, transaction %s", code, request.user.id, order_id)
             return Response({"error": "ATMOS API returned error", "details": result}, status=status.HTTP_400_BAD_REQUEST)
 
+        await sync_to_async(record_statuses)([(payment, result, code)])
+
         return Response(result, status=status.HTTP_200_OK)
 
 
-class CancelTransactionView(generics.GenericAPIView):
+class CancelTransactionView(AsyncGenericAPIView):
     serializer_class = CancelTransactionSerializer
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         payload = serializer.validated_data
 
         # Business validation: check if transaction exists for this user
         transaction_id = payload.get("transaction_id")
-        if not Payment.objects.filter(transaction_id=transaction_id, user=request.user).exists():
+        if not await Payment.objects.filter(transaction_id=transaction_id, user=request.user).aexists():
             return Response({"error": "Transaction not found"}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            result, code = AtmosService.cancel_transaction(payload)
+            result, code = await AtmosService.acancel_transaction(payload)
         except requests.RequestException as e:
             logger.exception(
                 "ATMOS cancel_transaction request failed for user %s, transaction %s",
@@ -785,6 +846,8 @@ class CancelTransactionView(generics.GenericAPIView):
             )
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        if code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         if code != 200:
             logger.warning(
                 "ATMOS cancel_transaction returned HTTP %s for user %s, transaction %s",
@@ -793,6 +856,30 @@ class CancelTransactionView(generics.GenericAPIView):
             return Response({"error": "ATMOS API returned error", "details": result}, status=status.HTTP_400_BAD_REQUEST)
 
         # Optionally update Payment model status
-        Payment.objects.filter(transaction_id=transaction_id, user=request.user).update(status="cancelled")
+        await Payment.objects.filter(transaction_id=transaction_id, user=request.user).aupdate(
+            status="cancelled", status_payload=None
+        )
 
         return Response(result, status=status.HTTP_200_OK)
+
+
+class AtmosWebhookView(AsyncAPIView):
+    """
+    ATMOS callback: imzo tekshiriladi, event inbox'ga bitta INSERT bilan yoziladi va darhol javob
+    qaytadi. Payment statusini process_atmos_webhooks o'zgartiradi.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    async def post(self, request):
+        payload = request.data.dict() if hasattr(request.data, "dict") else request.data
+
+        if not isinstance(payload, dict) or not verify(payload):
+            logger.warning("ATMOS webhook rejected: invalid sign")
+            return Response({"status": 0, "message": "Invalid sign"}, status=status.HTTP_403_FORBIDDEN)
+
+        # Qayta yuborilgan callback dedup_key bo'yicha e'tiborsiz qoldiriladi
+        await AtmosWebhookEvent.objects.abulk_create([build_event(payload)], ignore_conflicts=True)
+
+        return Response({"status": 1, "message": "Успешно"}, status=status.HTTP_200_OK)
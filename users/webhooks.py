@@ -0,0 +1,128 @@
+import hashlib
+import hmac
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import AtmosWebhookEvent, Payment
+from config import metrics
+from users.payments import CANCELLED, CONFIRMED, EXPIRED, PENDING_STATUSES
+from users.utils import blind_index
+
+logger = logging.getLogger(__name__)
+
+SIGNED_FIELDS = ("store_id", "transaction_id", "invoice", "amount")
+
+# Callback — ATMOS pulni yechgani haqida. Lokal ``expired`` (javob kutilmay qolgan) ustidan yoziladi
+CONFIRMABLE_STATUSES = (*PENDING_STATUSES, EXPIRED)
+
+
+def signature(payload):
+    """ATMOS callback imzosi: sha256(store_id + transaction_id + invoice + amount + api_key)"""
+    message = "".join(str(payload.get(field, "")) for field in SIGNED_FIELDS) + (settings.ATMOS_CALLBACK_API_KEY or "")
+    return hashlib.sha256(message.encode()).hexdigest()
+
+
+def verify(payload):
+    if not settings.ATMOS_CALLBACK_API_KEY or not isinstance(payload, dict):
+        return False
+    if any(payload.get(field) in (None, "") for field in SIGNED_FIELDS):
+        return False
+    if settings.ATMOS_STORE_ID and str(payload["store_id"]) != str(settings.ATMOS_STORE_ID):
+        return False
+    return hmac.compare_digest(str(payload.get("sign", "")).lower(), signature(payload))
+
+
+def dedup_key(payload):
+    return hashlib.sha256(f"{payload['transaction_id']}:{payload.get('sign', '')}".encode()).hexdigest()
+
+
+def build_event(payload):
+    return AtmosWebhookEvent(
+        dedup_key=dedup_key(payload),
+        transaction_id=str(payload["transaction_id"]),
+        payload=payload,
+    )
+
+
+def check(event, payment):
+    """Qaytaradi: (event status, xato matni)"""
+    if payment is None:
+        return AtmosWebhookEvent.STATUS_IGNORED, "payment not found"
+
+    payload = event.payload
+    try:
+        amount = int(payload["amount"])
+    except (TypeError, ValueError):
+        return AtmosWebhookEvent.STATUS_FAILED, f"invalid amount {payload.get('amount')!r}"
+    if amount != payment.amount:
+        return AtmosWebhookEvent.STATUS_FAILED, f"amount mismatch: {amount} != {payment.amount}"
+
+    # invoice — create'da yuborilgan account; decrypt qilmasdan blind index bilan solishtiriladi
+    if payment.account_bidx and blind_index("account", payload.get("invoice")) != payment.account_bidx:
+        return AtmosWebhookEvent.STATUS_FAILED, "invoice mismatch"
+
+    if payment.status == CANCELLED:
+        return AtmosWebhookEvent.STATUS_CONFLICT, "paid callback for a locally cancelled payment"
+    if payment.status not in CONFIRMABLE_STATUSES:
+        return AtmosWebhookEvent.STATUS_IGNORED, f"payment already {payment.status}"
+    return AtmosWebhookEvent.STATUS_PROCESSED, ""
+
+
+def process_pending(batch_size=100):
+    """
+    Navbatdagi callback'larni Payment'ga qo'llash. Bir nechta worker parallel ishlashi mumkin
+    (SKIP LOCKED); status shartli UPDATE bilan o'zgaradi, shuning uchun qayta ishlash xavfsiz.
+    Lokal ``expired`` to'lov tasdiqlanadi; lokal ``cancelled`` to'lovga kelgan callback ``conflict``
+    bo'lib qoladi (log + metrika) — pul qaytarilishi qo'lda tekshiriladi.
+    Qaytaradi: (ko'rilgan eventlar, tasdiqlangan to'lovlar)
+    """
+    with transaction.atomic():
+        events = list(
+            AtmosWebhookEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=AtmosWebhookEvent.STATUS_PENDING)
+            .order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0, 0
+
+        payments = {}
+        for payment in (
+            Payment.objects
+            .filter(transaction_id__in={event.transaction_id for event in events})
+            .only("id", "transaction_id", "amount", "account_bidx", "status")
+            .order_by("id")
+        ):
+            payments[payment.transaction_id] = payment  # eng oxirgisi (views ham -id bo'yicha oladi)
+
+        now = timezone.now()
+        confirm_ids = set()
+        for event in events:
+            event.status, event.error = check(event, payments.get(event.transaction_id))
+            event.processed_at = now
+            if event.status == AtmosWebhookEvent.STATUS_PROCESSED:
+                payment = payments[event.transaction_id]
+                if payment.status == EXPIRED:
+                    logger.warning("ATMOS webhook %s confirms expired payment %s", event.pk, payment.pk)
+                    metrics.incr("atmos_webhook_expired_confirmed")
+                confirm_ids.add(payment.pk)
+            elif event.status == AtmosWebhookEvent.STATUS_CONFLICT:
+                logger.error("ATMOS webhook %s conflicts with payment %s: %s",
+                             event.pk, payments[event.transaction_id].pk, event.error)
+                metrics.incr("atmos_webhook_conflicts")
+            elif event.status == AtmosWebhookEvent.STATUS_FAILED:
+                logger.warning("ATMOS webhook %s rejected: %s", event.pk, event.error)
+
+        confirmed = 0
+        if confirm_ids:
+            confirmed = (
+                Payment.objects
+                .filter(pk__in=confirm_ids, status__in=CONFIRMABLE_STATUSES)
+                .update(status=CONFIRMED, status_checked_at=now, status_payload=None)
+            )
+        AtmosWebhookEvent.objects.bulk_update(events, ["status", "error", "processed_at"])
+
+    return len(events), confirmed
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from users.models import WorkerProfile
+from users.models import UserIdentity, WorkerProfile
 from worker.models import WorkerNews, WorkerImage
 from django.contrib.auth import get_user_model, forms
 from django.contrib.gis.admin import OSMGeoAdmin
@@ -15,6 +15,13 @@ class WorkerImageInline(admin.TabularInline):
     extra = 1
 
 
+class UserIdentityInline(admin.StackedInline):
+    model = UserIdentity
+    can_delete = False
+    extra = 0
+    readonly_fields = ['updated_at']
+
+
 @admin.register(User)
 class ProfileAdmin(OSMGeoAdmin):  # GIS xarita widgeti uchun OSMGeoAdmin ishlatamiz
     list_display = ['id', 'full_name', 'status', 'role', 'gender', 'phone', 'is_superuser']
@@ -22,8 +29,8 @@ class ProfileAdmin(OSMGeoAdmin):  # GIS xarita widgeti uchun OSMGeoAdmin ishlata
     search_fields = ['id', 'full_name_uz', 'phone']
     fields = ['full_name_uz', 'full_name_ru', 'full_name_en',
               'description_uz', 'description_ru', 'description_en',
-              'role', 'gender', 'point', 'status', 'is_worker_active', 'is_verified', "myid_data"]
-    inlines = [WorkerImageInline]
+              'role', 'gender', 'point', 'status', 'is_worker_active', 'is_verified']
+    inlines = [UserIdentityInline, WorkerImageInline]
     # Xarita o'lchamlari
     map_width = 1100
     map_height = 600
@@ -4,8 +4,7 @@ from rest_framework import generics, status
 from rest_framework.generics import UpdateAPIView, RetrieveAPIView, ListAPIView
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated, BasePermission  # Foydalanuvchi autentifikatsiyasi
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
+from users.tokens import RoleRefreshToken
 from django.db.models import Q, Case, IntegerField, When
 
 from client.models import Order
@@ -36,8 +35,7 @@ class WorkerRegistrationView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         worker = serializer.save()
 
-        refresh = RefreshToken.for_user(worker)
-        refresh['role'] = worker.role
+        refresh = RoleRefreshToken.for_user(worker)
 
         return Response({
             "refresh": str(refresh),
@@ -58,8 +56,7 @@ class WorkerLoginView(generics.GenericAPIView):
         if worker.role != 'worker':
             return Response({"error": "Only workers can login here."}, status=status.HTTP_403_FORBIDDEN)
 
-        refresh = RefreshToken.for_user(worker)
-        refresh['role'] = worker.role
+        refresh = RoleRefreshToken.for_user(worker)
 
         return Response({
             "refresh": str(refresh),
@@ -271,37 +268,14 @@ class WorkerNewsDetailView(APIView):
 
 
 class WorkerActiveView(APIView):
-    authentication_classes = []  # Avto-auth o‘chiriladi
-    permission_classes = []      # Permission ham
-
-    def authenticate_user(self, request):
-        jwt_authenticator = JWTAuthentication()
-        try:
-            user, validated_token = jwt_authenticator.authenticate(request)
-            return user
-        except Exception:
-            return None
+    permission_classes = [IsAuthenticated, IsWorker]
 
     def get(self, request):
-        user = self.authenticate_user(request)
-        if not user:
-            return Response({"detail": "Invalid or missing token"}, status=status.HTTP_401_UNAUTHORIZED)
-
-        if user.role != "worker":
-            return Response({"detail": "Only workers can access this endpoint."}, status=status.HTTP_403_FORBIDDEN)
-
-        serializer = WorkerActiveSerializer(user)
+        serializer = WorkerActiveSerializer(request.user)
         return Response(serializer.data)
 
     def post(self, request):
-        user = self.authenticate_user(request)
-        if not user:
-            return Response({"detail": "Invalid or missing token"}, status=status.HTTP_401_UNAUTHORIZED)
-
-        if user.role != "worker":
-            return Response({"detail": "Only workers can update this."}, status=status.HTTP_403_FORBIDDEN)
-
-        serializer = WorkerActiveSerializer(user, data=request.data, partial=True)
+        serializer = WorkerActiveSerializer(request.user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)